@@ -0,0 +1,278 @@
+"""Análises de receita e utilização da frota, calculadas sobre colunas.
+
+As reservas são copiadas uma única vez para colunas (um vetor por campo, com os
+veículos trocados por índices inteiros e as datas por ordinais) e cada métrica
+vira operações sobre os vetores inteiros: somas por veículo com bincount, a
+receita de cada dia por uma soma acumulada de diferenças (cada reserva só marca
+o dia em que começa e o dia em que termina), médias por máscaras. Com NumPy
+instalado as operações são vetorizadas; sem ele as mesmas contas percorrem as
+colunas com laços.
+
+A receita é a das diárias efetivamente pagas (total menos os descontos de cupom
+e da forma de pagamento), distribuída igualmente pelos dias da reserva. O caução
+não entra: ele é devolvido ou retido na devolução.
+"""
+from array import array
+from datetime import date, timedelta
+from reserva import Reserva
+from exceptions import DadosInvalidosError
+
+try:
+    import numpy as np
+except ImportError:  # NumPy é opcional: sem ele as métricas percorrem as colunas com laços
+    np = None
+
+ESTADOS = (Reserva.PENDENTE, Reserva.PAGA, Reserva.FINALIZADA) # código do estado = posição
+_PAGA = 1 # códigos >= _PAGA: pagamento recebido
+
+JANELA_UTILIZACAO_DIAS = 90
+MESES_RECEITA = 12
+
+
+class ColunasReservas:
+    """Reservas em colunas paralelas; 'placas' e 'modelos' traduzem o índice da coluna 'veiculo'."""
+    CAMPOS = (('veiculo', 'i'), ('inicio', 'i'), ('dias', 'i'), ('total', 'd'),
+              ('desconto_cupom', 'd'), ('desconto_pagamento', 'd'), ('estado', 'b'), ('avaliacao', 'b'))
+
+    def __init__(self, placas, modelos, **colunas):
+        self.placas = placas
+        self.modelos = modelos
+        for campo, tipo in self.CAMPOS:
+            coluna = colunas.get(campo, array(tipo))
+            if np is not None:
+                # Sem cópia: o vetor NumPy usa a mesma memória do array
+                coluna = np.frombuffer(coluna, dtype=tipo) if coluna else np.empty(0, dtype=tipo)
+            setattr(self, campo, coluna)
+
+    @classmethod
+    def carregar(cls, reservas, veiculos=()):
+        """Colunas a partir de Reservas (e dos Veiculos, para incluir os que nunca foram reservados)."""
+        indices, placas, modelos = {}, [], []
+
+        def indice(placa, modelo):
+            i = indices.get(placa)
+            if i is None:
+                i = indices[placa] = len(placas)
+                placas.append(placa)
+                modelos.append(modelo)
+            return i
+
+        for veiculo in veiculos:
+            indice(veiculo.placa, veiculo.modelo)
+        reservas = reservas if isinstance(reservas, list) else list(reservas)
+        # Uma compreensão por coluna, lendo os slots direto: bem mais rápido que um laço com append
+        colunas = {
+            'veiculo': [indice(r._placa, r._modelo) for r in reservas],
+            'inicio': [r._inicio.toordinal() for r in reservas],
+            'dias': [r._dias for r in reservas],
+            'total': [r._total for r in reservas],
+            'desconto_cupom': [r._desconto_cupom for r in reservas],
+            'desconto_pagamento': [r._desconto_pagamento for r in reservas],
+            'estado': [2 if r._finalizada else int(r._pago) for r in reservas], # posição em ESTADOS
+            'avaliacao': [r._avaliacao or 0 for r in reservas],
+        }
+        return cls(placas, modelos, **{campo: array(tipo, colunas[campo]) for campo, tipo in cls.CAMPOS})
+
+    def __len__(self):
+        return len(self.dias)
+
+
+def _periodo(inicio, fim):
+    if not inicio < fim:
+        raise DadosInvalidosError("O fim do período deve ser depois do início.")
+    return inicio.toordinal(), fim.toordinal()
+
+
+class AnaliticaFrota:
+    def __init__(self, colunas):
+        self._c = colunas
+
+    @classmethod
+    def de_gerenciadores(cls, ger_res, ger_vei):
+        return cls(ColunasReservas.carregar(ger_res.reservas, ger_vei.iter_todos_veiculos()))
+
+    def __len__(self):
+        return len(self._c)
+
+    # --- Utilização ---
+
+    def _dias_ocupados(self, inicio, fim):
+        # Dias de cada veículo ocupados dentro de [inicio, fim)
+        c, (i, f) = self._c, _periodo(inicio, fim)
+        if np is not None:
+            dias = np.clip(c.inicio + c.dias, i, f) - np.clip(c.inicio, i, f)
+            return np.bincount(c.veiculo, weights=dias, minlength=len(c.placas)), f - i
+        ocupados = [0.0] * len(c.placas)
+        for veiculo, comeco, dias in zip(c.veiculo, c.inicio, c.dias):
+            ocupados[veiculo] += max(min(comeco + dias, f) - max(comeco, i), 0)
+        return ocupados, f - i
+
+    def utilizacao_por_veiculo(self, inicio, fim) -> dict:
+        """{placa: fração dos dias de [inicio, fim) em que o veículo esteve reservado}."""
+        ocupados, periodo = self._dias_ocupados(inicio, fim)
+        return {placa: float(dias) / periodo for placa, dias in zip(self._c.placas, ocupados)}
+
+    def utilizacao_por_modelo(self, inicio, fim) -> dict:
+        """{modelo: fração dos dias-veículo do modelo ocupados em [inicio, fim)}."""
+        ocupados, periodo = self._dias_ocupados(inicio, fim)
+        somas = {}
+        for modelo, dias in zip(self._c.modelos, ocupados):
+            soma = somas.setdefault(modelo, [0.0, 0])
+            soma[0] += float(dias)
+            soma[1] += 1
+        return {modelo: dias / (quantidade * periodo) for modelo, (dias, quantidade) in somas.items()}
+
+    # --- Receita ---
+
+    def receita_por_dia(self, inicio, fim) -> list:
+        """[(data, receita)] para cada dia de [inicio, fim)."""
+        c, (i, f) = self._c, _periodo(inicio, fim)
+        if np is not None:
+            validas = (c.estado >= _PAGA) & (c.dias > 0)
+            por_dia = (c.total - c.desconto_cupom - c.desconto_pagamento)[validas] / c.dias[validas]
+            comeco = np.clip(c.inicio[validas], i, f) - i
+            termino = np.clip(c.inicio[validas] + c.dias[validas], i, f) - i
+            # Cada reserva soma seu valor diário no dia em que entra no período e subtrai no dia em que sai
+            diferencas = (np.bincount(comeco, weights=por_dia, minlength=f - i + 1)
+                          - np.bincount(termino, weights=por_dia, minlength=f - i + 1))
+            valores = np.cumsum(diferencas[:f - i]).tolist()
+        else:
+            diferencas = [0.0] * (f - i + 1)
+            for comeco, dias, total, cupom, pagamento, estado in zip(
+                    c.inicio, c.dias, c.total, c.desconto_cupom, c.desconto_pagamento, c.estado):
+                if estado < _PAGA or dias <= 0:
+                    continue
+                por_dia = (total - cupom - pagamento) / dias
+                diferencas[min(max(comeco, i), f) - i] += por_dia
+                diferencas[min(max(comeco + dias, i), f) - i] -= por_dia
+            valores, acumulado = [], 0.0
+            for diferenca in diferencas[:f - i]:
+                acumulado += diferenca
+                valores.append(acumulado)
+        return [(date.fromordinal(i + k), max(valor, 0.0)) for k, valor in enumerate(valores)]
+
+    def receita_por_mes(self, inicio, fim) -> list:
+        """[(primeiro dia do mês, receita)] dos meses que cruzam [inicio, fim)."""
+        meses = {}
+        for dia, valor in self.receita_por_dia(inicio, fim):
+            mes = dia.replace(day=1)
+            meses[mes] = meses.get(mes, 0.0) + valor
+        return sorted(meses.items())
+
+    def ticket_medio(self) -> dict:
+        """{'pagas', 'receita', 'ticket_medio'}: diárias efetivamente pagas por reserva paga."""
+        c = self._c
+        if np is not None:
+            pagas = c.estado >= _PAGA
+            quantidade = int(np.count_nonzero(pagas))
+            receita = float((c.total - c.desconto_cupom - c.desconto_pagamento)[pagas].sum())
+        else:
+            quantidade, receita = 0, 0.0
+            for total, cupom, pagamento, estado in zip(c.total, c.desconto_cupom, c.desconto_pagamento, c.estado):
+                if estado >= _PAGA:
+                    quantidade += 1
+                    receita += total - cupom - pagamento
+        return {'pagas': quantidade, 'receita': receita, 'ticket_medio': receita / quantidade if quantidade else 0.0}
+
+    def descontos(self) -> dict:
+        """Quanto das diárias das reservas pagas deixou de entrar por cupons e pela forma de pagamento."""
+        c = self._c
+        if np is not None:
+            pagas = c.estado >= _PAGA
+            bruto = float(c.total[pagas].sum())
+            cupom = float(c.desconto_cupom[pagas].sum())
+            pagamento = float(c.desconto_pagamento[pagas].sum())
+            com_cupom = int(np.count_nonzero(c.desconto_cupom[pagas] > 0))
+        else:
+            bruto = cupom = pagamento = 0.0
+            com_cupom = 0
+            for total, desc_cupom, desc_pagamento, estado in zip(
+                    c.total, c.desconto_cupom, c.desconto_pagamento, c.estado):
+                if estado >= _PAGA:
+                    bruto += total
+                    cupom += desc_cupom
+                    pagamento += desc_pagamento
+                    com_cupom += desc_cupom > 0
+        return {'diarias': bruto, 'cupom': cupom, 'pagamento': pagamento, 'reservas_com_cupom': com_cupom,
+                'fracao': (cupom + pagamento) / bruto if bruto else 0.0}
+
+    # --- Avaliações ---
+
+    def avaliacoes_por_veiculo(self) -> dict:
+        """{placa: (nota média, quantidade de avaliações)} dos veículos avaliados."""
+        c = self._c
+        if np is not None:
+            avaliadas = c.avaliacao > 0
+            quantidades = np.bincount(c.veiculo[avaliadas], minlength=len(c.placas))
+            somas = np.bincount(c.veiculo[avaliadas], weights=c.avaliacao[avaliadas], minlength=len(c.placas))
+            quantidades, somas = quantidades.tolist(), somas.tolist()
+        else:
+            quantidades, somas = [0] * len(c.placas), [0.0] * len(c.placas)
+            for veiculo, nota in zip(c.veiculo, c.avaliacao):
+                if nota > 0:
+                    quantidades[veiculo] += 1
+                    somas[veiculo] += nota
+        return {placa: (soma / quantidade, quantidade)
+                for placa, soma, quantidade in zip(c.placas, somas, quantidades) if quantidade}
+
+    def resumo(self, hoje=None) -> dict:
+        """Principais métricas: utilização por modelo nos últimos JANELA_UTILIZACAO_DIAS dias,
+        receita dos últimos MESES_RECEITA meses, ticket médio e descontos."""
+        hoje = hoje or date.today()
+        inicio_meses = hoje.replace(day=1)
+        for _ in range(MESES_RECEITA - 1):
+            inicio_meses = (inicio_meses - timedelta(days=1)).replace(day=1)
+        amanha = hoje + timedelta(days=1)
+        return {'reservas': len(self),
+                'utilizacao_por_modelo': self.utilizacao_por_modelo(amanha - timedelta(days=JANELA_UTILIZACAO_DIAS),
+                                                                    amanha),
+                'receita_por_mes': self.receita_por_mes(inicio_meses, amanha),
+                'ticket': self.ticket_medio(), 'descontos': self.descontos()}
+
+
+# --- Relatórios interativos (menu de Relatórios Gerenciais) ---
+
+def _ultimos_dias(dias):
+    amanha = date.today() + timedelta(days=1)
+    return amanha - timedelta(days=dias), amanha
+
+
+def relatorio_utilizacao(ger_res, ger_vei):
+    analitica = AnaliticaFrota.de_gerenciadores(ger_res, ger_vei)
+    inicio, fim = _ultimos_dias(JANELA_UTILIZACAO_DIAS)
+    print(f"\n=== UTILIZAÇÃO DA FROTA (últimos {JANELA_UTILIZACAO_DIAS} dias) ===")
+    por_modelo = analitica.utilizacao_por_modelo(inicio, fim)
+    if not por_modelo:
+        print("Nenhum veículo cadastrado na frota.")
+        return
+    for modelo, taxa in sorted(por_modelo.items(), key=lambda item: -item[1]):
+        print(f"- {modelo}: {taxa:.1%}")
+    print("\nVeículos mais utilizados:")
+    por_veiculo = analitica.utilizacao_por_veiculo(inicio, fim)
+    for placa, taxa in sorted(por_veiculo.items(), key=lambda item: -item[1])[:10]:
+        print(f"- {placa}: {taxa:.1%}")
+
+
+def relatorio_receita(ger_res, ger_vei):
+    analitica = AnaliticaFrota.de_gerenciadores(ger_res, ger_vei)
+    resumo = analitica.resumo()
+    print(f"\n=== RECEITA DAS DIÁRIAS (últimos {MESES_RECEITA} meses) ===")
+    for mes, valor in resumo['receita_por_mes']:
+        print(f"- {mes.strftime('%m/%Y')}: R${valor:.2f}")
+    ticket, descontos = resumo['ticket'], resumo['descontos']
+    print(f"\nReservas pagas: {ticket['pagas']} | Receita: R${ticket['receita']:.2f} | "
+          f"Ticket médio: R${ticket['ticket_medio']:.2f}")
+    print(f"Descontos concedidos: R${descontos['cupom'] + descontos['pagamento']:.2f} "
+          f"({descontos['fracao']:.1%} das diárias) | Cupons: R${descontos['cupom']:.2f} "
+          f"em {descontos['reservas_com_cupom']} reserva(s) | Forma de pagamento: R${descontos['pagamento']:.2f}")
+
+
+def relatorio_avaliacoes(ger_res, ger_vei):
+    analitica = AnaliticaFrota.de_gerenciadores(ger_res, ger_vei)
+    print("\n=== AVALIAÇÕES POR VEÍCULO ===")
+    avaliacoes = analitica.avaliacoes_por_veiculo()
+    if not avaliacoes:
+        print("Nenhuma avaliação registrada.")
+        return
+    for placa, (media, quantidade) in sorted(avaliacoes.items(), key=lambda item: (-item[1][0], item[0])):
+        print(f"- {placa}: {media:.1f} ({quantidade} avaliação(ões))")
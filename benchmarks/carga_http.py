@@ -0,0 +1,110 @@
+"""Teste de carga local do servidor HTTP/JSON (servidor.py).
+
+Sobe o servidor numa thread própria, cadastra uma frota de teste e abre N
+conexões keep-alive que repetem o ciclo reservar -> pagar -> devolver, além
+de consultas de relatório. Ao final informa requisições por segundo e as
+latências p50/p99.
+
+Uso (a partir da raiz do projeto):  python -m benchmarks.carga_http [--conexoes 50] [--segundos 10]
+"""
+import argparse
+import asyncio
+import json
+import threading
+import time
+from servidor import ServidorLocadora
+from servicos import ServicoLocadora
+
+
+def _percentil(valores, p):
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p))]
+
+
+def _subir_servidor(porta):
+    pronto = threading.Event()
+    estado = {}
+
+    def rodar():
+        laco = asyncio.new_event_loop()
+        asyncio.set_event_loop(laco)
+        servidor = ServidorLocadora(ServicoLocadora(notificar=False))
+        estado['tcp'] = laco.run_until_complete(servidor.iniciar('127.0.0.1', porta))
+        estado['porta'] = estado['tcp'].sockets[0].getsockname()[1]
+        estado['laco'] = laco
+        pronto.set()
+        laco.run_forever()
+
+    threading.Thread(target=rodar, daemon=True).start()
+    pronto.wait()
+    return estado
+
+
+async def _requisicao(leitor, escritor, metodo, caminho, corpo=None):
+    dados = json.dumps(corpo).encode('utf-8') if corpo is not None else b''
+    escritor.write(f"{metodo} {caminho} HTTP/1.1\r\nHost: localhost\r\n"
+                   f"Content-Length: {len(dados)}\r\n\r\n".encode('latin-1') + dados)
+    await escritor.drain()
+    status = int((await leitor.readline()).split()[1])
+    tamanho = 0
+    while True:
+        linha = await leitor.readline()
+        if linha in (b'\r\n', b''):
+            break
+        if linha.lower().startswith(b'content-length:'):
+            tamanho = int(linha.split(b':')[1])
+    resposta = await leitor.readexactly(tamanho) if tamanho else b''
+    return status, json.loads(resposta) if resposta else None
+
+
+async def _cliente(porta, indice, fim, latencias, erros):
+    leitor, escritor = await asyncio.open_connection('127.0.0.1', porta)
+
+    async def medir(metodo, caminho, corpo=None):
+        inicio = time.perf_counter()
+        status, resposta = await _requisicao(leitor, escritor, metodo, caminho, corpo)
+        latencias.append(time.perf_counter() - inicio)
+        if status >= 400:
+            erros.append((status, resposta))
+        return resposta
+
+    cpf = f"{indice:011d}"
+    placa = f"CAR{indice:04d}"
+    await medir('POST', '/clientes', {'nome': 'Cliente Carga', 'cpf': cpf})
+    await medir('POST', '/veiculos', {'modelo': 'Fiat Mobi', 'placa': placa, 'ano': '2022', 'valor': 95.5})
+    while time.perf_counter() < fim:
+        reserva = await medir('POST', '/reservas', {'cpf': cpf, 'placa': placa, 'dias': 3})
+        await medir('POST', f"/reservas/{reserva['id']}/pagamento", {'forma': 'pix'})
+        await medir('POST', f"/reservas/{reserva['id']}/devolucao", {'nota': 5})
+        await medir('GET', '/relatorios/frota')
+    escritor.close()
+
+
+async def _carga(porta, conexoes, segundos):
+    latencias, erros = [], []
+    inicio = time.perf_counter()
+    fim = inicio + segundos
+    await asyncio.gather(*(_cliente(porta, i, fim, latencias, erros) for i in range(conexoes)))
+    duracao = time.perf_counter() - inicio
+    return {
+        'conexoes': conexoes,
+        'requisicoes': len(latencias),
+        'erros': len(erros),
+        'rps': round(len(latencias) / duracao, 1),
+        'p50_ms': round(_percentil(latencias, 0.50) * 1000, 3),
+        'p99_ms': round(_percentil(latencias, 0.99) * 1000, 3),
+    }
+
+
+if __name__ == '__main__':
+    argumentos = argparse.ArgumentParser(description="Teste de carga do servidor HTTP/JSON")
+    argumentos.add_argument('--conexoes', type=int, default=50)
+    argumentos.add_argument('--segundos', type=float, default=10.0)
+    opcoes = argumentos.parse_args()
+
+    servidor = _subir_servidor(0)
+    resultado = asyncio.run(_carga(servidor['porta'], opcoes.conexoes, opcoes.segundos))
+    for chave, valor in resultado.items():
+        print(f"{chave:>12}: {valor}")
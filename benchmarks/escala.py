@@ -0,0 +1,199 @@
+"""Mede como as operações mais usadas escalam com o tamanho da base.
+
+Para cada tamanho N monta uma base sintética do zero — N clientes (cadastrados
+pela ClienteFactory), N veículos (pelo VeiculoBuilder) e N reservas (pelo
+Gerenciar_Reserva: um terço pendentes, um terço pagas e um terço devolvidas) —
+e cronometra o cadastro com verificação de CPF duplicado, a busca do login, a
+listagem dos disponíveis, o ciclo reservar -> pagar -> devolver, as
+estatísticas de utilização, o controle de pagamentos e a atualização do GPS.
+
+Cada execução acrescenta uma linha JSON ao arquivo de resultados (com data,
+commit e versão do Python), e a saída mostra a variação em relação à execução
+anterior com os mesmos tamanhos. Uso (a partir da raiz do projeto):
+
+    python -m benchmarks.escala [--tamanhos 1000,10000,100000,1000000] [--saida resultados_escala.jsonl]
+"""
+import argparse
+import contextlib
+import gc
+import io
+import json
+import platform
+import random
+import subprocess
+import time
+from datetime import datetime
+from unittest import mock
+import veiculos
+from clientes import GerenciarCliente, Singleton
+from exceptions import CpfJaCadastradoError
+from reserva import Gerenciar_Reserva, PagamentoPixStrategy
+from veiculos import GerenciarVeiculo
+
+TAMANHOS = (1_000, 10_000, 100_000, 1_000_000)
+ARQUIVO_RESULTADOS = 'resultados_escala.jsonl'
+AMOSTRA = 10_000  # operações cronometradas por tamanho nas medições individuais
+REPETICOES = 3    # relatórios e listagens: vale a melhor de algumas execuções
+
+
+def _novos_gerenciadores():
+    # Os gerenciadores são Singletons: cada tamanho começa com instâncias novas e vazias
+    for classe in (GerenciarCliente, GerenciarVeiculo, Gerenciar_Reserva):
+        Singleton._instances.pop(classe, None)
+    gc.collect()
+    return GerenciarCliente(), GerenciarVeiculo(), Gerenciar_Reserva()
+
+
+def _medida(operacoes, segundos):
+    return {'ops': operacoes, 'segundos': round(segundos, 6),
+            'us_op': round(segundos / operacoes * 1e6, 3) if operacoes else None}
+
+
+def _cronometrar(funcao, itens):
+    inicio = time.perf_counter()
+    for item in itens:
+        funcao(item)
+    return _medida(len(itens), time.perf_counter() - inicio)
+
+
+def _melhor_de(funcao, repeticoes=REPETICOES):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return _medida(1, min(tempos))
+
+
+def _cpf(i):
+    return f"{i:011d}"
+
+
+def _placa(i):
+    return f"V{i:06d}"
+
+
+def medir(tamanho, amostra=AMOSTRA, semente=0):
+    """Monta a base com 'tamanho' registros de cada tipo e devolve {operação: medida}."""
+    aleatorio = random.Random(semente)
+    ger_cli, ger_vei, ger_res = _novos_gerenciadores()
+    amostra = min(amostra, tamanho)
+    resultado = {}
+
+    # --- Base sintética (o próprio cadastro é medido) ---
+    resultado['cadastro_cliente'] = _cronometrar(
+        lambda i: ger_cli.registrar_cliente('Cliente Teste', _cpf(i)), range(tamanho))
+    resultado['cadastro_veiculo'] = _cronometrar(
+        lambda i: ger_vei.registrar_veiculo('Fiat Mobi', _placa(i), 2022, 80 + i % 120), range(tamanho))
+
+    clientes, frota = ger_cli.clientes, ger_vei.veiculos
+    estrategia = PagamentoPixStrategy()
+
+    def reservar(i):
+        reserva = ger_res.criar_reserva(clientes[i], frota[i], 1 + i % 7)
+        if i % 3:
+            reserva.pagar(estrategia)
+        if i % 3 == 2:
+            reserva.devolver(frota[i])
+    resultado['carga_reservas'] = _cronometrar(reservar, range(tamanho))
+
+    # --- Operações medidas sobre a base pronta ---
+    def cadastro_duplicado(cpf):
+        try:
+            ger_cli.registrar_cliente('Cliente Teste', cpf)
+        except CpfJaCadastradoError:
+            pass
+        else:
+            raise AssertionError(f"CPF {cpf} deveria ter sido recusado")
+    resultado['cadastro_duplicado'] = _cronometrar(
+        cadastro_duplicado, [_cpf(aleatorio.randrange(tamanho)) for _ in range(amostra)])
+    resultado['busca_login'] = _cronometrar(
+        ger_cli.buscar_por_cpf, [_cpf(aleatorio.randrange(tamanho)) for _ in range(amostra)])
+
+    disponiveis = list(ger_vei)
+    ciclos = aleatorio.sample(disponiveis, min(amostra, len(disponiveis)))
+
+    def ciclo(veiculo):
+        reserva = ger_res.criar_reserva(aleatorio.choice(clientes), veiculo, 3)
+        reserva.pagar(estrategia)
+        reserva.devolver(veiculo)
+    resultado['reservar_pagar_devolver'] = _cronometrar(ciclo, ciclos)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        resultado['listar_disponiveis'] = _melhor_de(ger_vei.listar_veiculos)
+        resultado['estatisticas_utilizacao'] = _melhor_de(ger_vei.estatisticas_utilizacao)
+        with mock.patch('builtins.input', return_value='n'): # só o resumo, sem a listagem paginada
+            resultado['controle_pagamentos'] = _melhor_de(ger_res.controle_pagamentos)
+        # Primeira leitura vai à API para a frota inteira; a segunda sai do cache dos adapters
+        resultado['gps_atualizacao'] = _melhor_de(ger_vei.atualizar_localizacoes, 1)
+        resultado['gps_atualizacao_cache'] = _melhor_de(ger_vei.atualizar_localizacoes)
+        resultado['gps_passo_frota'] = _melhor_de(veiculos.GPS_COMPARTILHADO.step_all)
+
+    _novos_gerenciadores() # libera a base antes do próximo tamanho
+    return resultado
+
+
+def _commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _execucao_anterior(caminho, tamanhos):
+    """Última execução gravada em 'caminho' com os mesmos tamanhos (ou None)."""
+    anterior = None
+    try:
+        with open(caminho, encoding='utf-8') as f:
+            for linha in f:
+                if not linha.strip():
+                    continue
+                execucao = json.loads(linha)
+                if sorted(execucao['resultados'], key=int) == [str(t) for t in tamanhos]:
+                    anterior = execucao
+    except FileNotFoundError:
+        pass
+    return anterior
+
+
+def executar(tamanhos=TAMANHOS, caminho=ARQUIVO_RESULTADOS, amostra=AMOSTRA):
+    tamanhos = sorted(tamanhos)
+    anterior = _execucao_anterior(caminho, tamanhos)
+    execucao = {
+        'data': datetime.now().isoformat(timespec='seconds'),
+        'commit': _commit(),
+        'python': platform.python_version(),
+        'numpy': veiculos.np is not None,
+        'amostra': amostra,
+        'resultados': {},
+    }
+    for tamanho in tamanhos:
+        medidas = medir(tamanho, amostra)
+        execucao['resultados'][str(tamanho)] = medidas
+        _imprimir(tamanho, medidas, anterior and anterior['resultados'][str(tamanho)])
+
+    with open(caminho, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(execucao) + '\n')
+    return execucao
+
+
+def _imprimir(tamanho, medidas, anteriores):
+    print(f"\n=== {tamanho} registros ===")
+    for operacao, medida in medidas.items():
+        linha = f"{operacao:>24}: {medida['us_op']:>14.3f} us/op ({medida['ops']} op, {medida['segundos']:.3f} s)"
+        antes = (anteriores or {}).get(operacao)
+        if antes and antes['us_op']:
+            linha += f"  {medida['us_op'] / antes['us_op'] - 1:+.0%} vs anterior"
+        print(linha)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tamanhos', default=','.join(map(str, TAMANHOS)),
+                        help="quantidades de clientes/veículos/reservas, separadas por vírgula")
+    parser.add_argument('--saida', default=ARQUIVO_RESULTADOS, help="arquivo JSONL com o histórico das execuções")
+    parser.add_argument('--amostra', type=int, default=AMOSTRA, help="operações por medição individual")
+    argumentos = parser.parse_args()
+    executar([int(t) for t in argumentos.tamanhos.split(',')], argumentos.saida, argumentos.amostra)
+    print(f"\nResultados acrescentados a {argumentos.saida}")
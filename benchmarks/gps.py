@@ -0,0 +1,52 @@
+"""Compara passos por segundo da simulação de GPS da frota inteira.
+
+"laço" reproduz o modelo anterior (dicionário de dicionários, um carro por vez
+com random.uniform); "step_all" é ExternalGpsService.step_all(), vetorizado
+quando o NumPy está instalado.
+
+Uso (a partir da raiz do projeto):  python -m benchmarks.gps [veiculos] [passos]
+"""
+import contextlib
+import io
+import random
+import sys
+import time
+import veiculos
+from veiculos import ExternalGpsService
+
+
+def _passos_por_segundo(passo, passos):
+    inicio = time.perf_counter()
+    for _ in range(passos):
+        passo()
+    return passos / (time.perf_counter() - inicio)
+
+
+def _laco_anterior(quantidade):
+    locations = {f"GPS{i:06d}": {"lat": random.uniform(-23.5, -23.6), "lon": random.uniform(-46.6, -46.7)}
+                 for i in range(quantidade)}
+
+    def passo():
+        for location in locations.values():
+            location['lat'] += random.uniform(-0.01, 0.01)
+            location['lon'] += random.uniform(-0.01, 0.01)
+    return passo
+
+
+def medir(quantidade=20_000, passos=20):
+    gps = ExternalGpsService()
+    with contextlib.redirect_stdout(io.StringIO()):
+        gps.fetch_coords_batch(f"GPS{i:06d}" for i in range(quantidade))
+    return {
+        'veiculos': quantidade,
+        'numpy': veiculos.np is not None,
+        'laco_passos_s': round(_passos_por_segundo(_laco_anterior(quantidade), passos), 1),
+        'step_all_passos_s': round(_passos_por_segundo(gps.step_all, passos), 1),
+    }
+
+
+if __name__ == '__main__':
+    quantidade = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    passos = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    for chave, valor in medir(quantidade, passos).items():
+        print(f"{chave:>18}: {valor}")
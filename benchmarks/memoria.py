@@ -0,0 +1,47 @@
+"""Mede o custo médio em bytes por objeto de Cliente, Veiculo e Reserva.
+
+Uso (a partir da raiz do projeto):  python -m benchmarks.memoria [quantidade]
+"""
+import sys
+import tracemalloc
+from clientes import ClienteFactory
+from veiculos import VeiculoBuilder
+from reserva import Reserva
+
+
+def _bytes_por_objeto(criar, quantidade):
+    tracemalloc.start()
+    antes = tracemalloc.take_snapshot()
+    objetos = [criar(i) for i in range(quantidade)]
+    depois = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    total = sum(s.size_diff for s in depois.compare_to(antes, 'filename'))
+    # Desconta a própria lista que guarda os objetos
+    total -= sys.getsizeof(objetos)
+    return total / quantidade
+
+
+def _criar_reserva(i):
+    reserva = Reserva()
+    reserva._cpf = f"{i:011d}"
+    reserva._placa = f"AAA{i % 10000:04d}"
+    reserva._dias = 3
+    reserva._total = 300.0
+    return reserva
+
+
+def medir(quantidade=20_000):
+    fabrica = ClienteFactory()
+    return {
+        'Cliente': _bytes_por_objeto(lambda i: fabrica.criar_usuario('Cliente Teste', f"{i:011d}"), quantidade),
+        'Veiculo': _bytes_por_objeto(
+            lambda i: VeiculoBuilder().com_modelo('Fiat Mobi').com_placa(f"AAA{i:04d}")
+                                      .com_ano('2022').com_valor(95.5).build(), quantidade),
+        'Reserva': _bytes_por_objeto(_criar_reserva, quantidade),
+    }
+
+
+if __name__ == '__main__':
+    quantidade = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    for classe, media in medir(quantidade).items():
+        print(f"{classe:<8} {media:8.1f} bytes/objeto")
@@ -0,0 +1,97 @@
+"""Latência de reserva com um canal de notificação lento, síncrono x despacho em segundo plano,
+e envios economizados pelo agrupamento por destinatário.
+
+Uso (a partir da raiz do projeto):  python -m benchmarks.notificacoes [reservas] [atraso_s]
+"""
+import contextlib
+import io
+import sys
+import threading
+import time
+from clientes import GerenciarCliente
+from veiculos import GerenciarVeiculo
+from reserva import Gerenciar_Reserva, INotificationSender
+from servicos import ServicoLocadora
+from despacho import DespachanteAssincrono, EnvioAgrupado
+
+
+class SenderLento(INotificationSender):
+    """Canal falso (benchmark e testes): demora 'atraso' segundos por envio e falha nas primeiras 'falhas' tentativas."""
+    def __init__(self, atraso=0.2, falhas=0):
+        self._atraso = atraso
+        self._falhas_restantes = falhas
+        self._trava = threading.Lock()
+        self.recebidas = []
+
+    def send(self, message: str, destinatario=None):
+        time.sleep(self._atraso)
+        with self._trava:
+            if self._falhas_restantes > 0:
+                self._falhas_restantes -= 1
+                raise ConnectionError("provedor indisponível")
+            self.recebidas.append(message)
+
+    def send_batch(self, envios: list):
+        # Um lote custa uma única ida ao provedor
+        time.sleep(self._atraso)
+        with self._trava:
+            if self._falhas_restantes > 0:
+                self._falhas_restantes -= 1
+                raise ConnectionError("provedor indisponível")
+            self.recebidas.extend(message for message, _ in envios)
+
+
+def _latencia_media(servico, prefixo, quantidade):
+    tempos = []
+    for i in range(quantidade):
+        placa = f"{prefixo}{i:04d}"
+        servico.cadastrar_veiculo('Fiat Mobi', placa, '2022', 95.5)
+        inicio = time.perf_counter()
+        servico.reservar('00000000001', placa, 3)
+        tempos.append(time.perf_counter() - inicio)
+    return sum(tempos) / len(tempos)
+
+
+def medir(quantidade=20, atraso=0.1):
+    ger_res = Gerenciar_Reserva()
+    servico = ServicoLocadora(GerenciarCliente(), GerenciarVeiculo(), ger_res)
+    if not GerenciarCliente().existe_cpf('00000000001'):
+        servico.cadastrar_cliente('Cliente Teste', '00000000001')
+    canais_originais = ger_res.canais_confirmacao, ger_res.canais_pagamento
+
+    lento = SenderLento(atraso)
+    ger_res.canais_confirmacao, ger_res.canais_pagamento = [lento], []
+    with contextlib.redirect_stdout(io.StringIO()):
+        sincrono = _latencia_media(servico, 'SIN', quantidade)
+
+        despachante = DespachanteAssincrono(SenderLento(atraso))
+        ger_res.canais_confirmacao = [despachante]
+        assincrono = _latencia_media(servico, 'ASS', quantidade)
+        inicio = time.perf_counter()
+        despachante.fechar()
+        esvaziar = time.perf_counter() - inicio
+
+        # Todas as reservas são do mesmo cliente: dentro da janela viram um único resumo
+        agrupado = EnvioAgrupado(SenderLento(atraso), janela=60.0)
+        ger_res.canais_confirmacao = [agrupado]
+        _latencia_media(servico, 'AGR', quantidade)
+        agrupado.fechar()
+
+    ger_res.canais_confirmacao, ger_res.canais_pagamento = canais_originais
+    return {
+        'reservas': quantidade,
+        'atraso_canal_ms': atraso * 1000,
+        'sincrono_ms': round(sincrono * 1000, 3),
+        'assincrono_ms': round(assincrono * 1000, 3),
+        'entregues_assinc': despachante.enviadas,
+        'esvaziar_fila_ms': round(esvaziar * 1000, 1),
+        'envios_agrupado': agrupado.enviadas,
+        'economizados': agrupado.economizadas,
+    }
+
+
+if __name__ == '__main__':
+    quantidade = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    atraso = float(sys.argv[2]) if len(sys.argv) > 2 else 0.1
+    for chave, valor in medir(quantidade, atraso).items():
+        print(f"{chave:>17}: {valor}")
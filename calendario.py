@@ -0,0 +1,153 @@
+"""Calendário de ocupação da frota por datas.
+
+Cada veículo com reservas tem um CalendarioVeiculo: períodos [início, fim) em
+listas paralelas ordenadas e sem sobreposição, então "está livre entre D1 e D2?"
+é uma busca binária. A AgendaFrota guarda só os calendários não vazios (veículos
+ociosos nem entram na conta) e lembra as consultas recentes de "quem está
+ocupado no período", descartando apenas as que cruzam um período alterado.
+"""
+import threading
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from exceptions import VeiculoIndisponivelError, DadosInvalidosError
+
+
+class CalendarioVeiculo:
+    __slots__ = ('_inicios', '_fins', '_chaves')
+
+    def __init__(self):
+        self._inicios = []
+        self._fins = []
+        self._chaves = []
+
+    def __len__(self):
+        return len(self._inicios)
+
+    def conflito(self, inicio, fim, ignorar=None):
+        """Chave do primeiro período que cruza [inicio, fim), ou None."""
+        # Sem sobreposição os fins também ficam ordenados: começa no primeiro que termina depois de 'inicio'
+        i = bisect_right(self._fins, inicio)
+        while i < len(self._inicios) and self._inicios[i] < fim:
+            if self._chaves[i] is not ignorar:
+                return self._chaves[i]
+            i += 1 # no máximo uma volta extra, a do próprio período ignorado
+        return None
+
+    def livre(self, inicio, fim, ignorar=None) -> bool:
+        return self.conflito(inicio, fim, ignorar) is None
+
+    def inserir(self, inicio, fim, chave):
+        i = bisect_left(self._inicios, inicio)
+        self._inicios.insert(i, inicio)
+        self._fins.insert(i, fim)
+        self._chaves.insert(i, chave)
+
+    def remover(self, inicio, chave) -> bool:
+        i = bisect_left(self._inicios, inicio)
+        while i < len(self._inicios) and self._inicios[i] == inicio:
+            if self._chaves[i] is chave:
+                del self._inicios[i], self._fins[i], self._chaves[i]
+                return True
+            i += 1
+        return False
+
+    def periodos(self) -> list:
+        return list(zip(self._inicios, self._fins, self._chaves))
+
+
+class AgendaFrota:
+    def __init__(self, tamanho_cache=256):
+        self._calendarios = {}  # placa -> CalendarioVeiculo (só veículos com algum período)
+        self._periodos = {}     # chave -> (placa, início, fim)
+        self._cache = OrderedDict() # (início, fim) -> frozenset das placas ocupadas
+        self._tamanho_cache = tamanho_cache
+        self._trava = threading.Lock()
+
+    def __contains__(self, chave):
+        return chave in self._periodos
+
+    @staticmethod
+    def _validar(inicio, fim):
+        if not inicio < fim:
+            raise DadosInvalidosError("O fim do período deve ser depois do início.")
+
+    def _indisponivel(self, placa, chave_conflito):
+        _, inicio, fim = self._periodos[chave_conflito]
+        return VeiculoIndisponivelError(f"O veículo {placa} já está reservado de "
+                                        f"{inicio.strftime('%d/%m/%Y')} a {fim.strftime('%d/%m/%Y')}.")
+
+    def reservar(self, placa, inicio, fim, chave):
+        """Ocupa [inicio, fim) no calendário do veículo; VeiculoIndisponivelError se cruzar outro período."""
+        self._validar(inicio, fim)
+        with self._trava:
+            calendario = self._calendarios.get(placa)
+            if calendario is not None:
+                conflito = calendario.conflito(inicio, fim)
+                if conflito is not None:
+                    raise self._indisponivel(placa, conflito)
+            else:
+                calendario = self._calendarios[placa] = CalendarioVeiculo()
+            calendario.inserir(inicio, fim, chave)
+            self._periodos[chave] = (placa, inicio, fim)
+            self._invalidar(inicio, fim)
+
+    def mover(self, chave, inicio, fim):
+        """Troca o período de uma chave já agendada (ex: mudança na quantidade de dias)."""
+        self._validar(inicio, fim)
+        with self._trava:
+            placa, inicio_anterior, fim_anterior = self._periodos[chave]
+            calendario = self._calendarios[placa]
+            conflito = calendario.conflito(inicio, fim, ignorar=chave)
+            if conflito is not None:
+                raise self._indisponivel(placa, conflito)
+            calendario.remover(inicio_anterior, chave)
+            calendario.inserir(inicio, fim, chave)
+            self._periodos[chave] = (placa, inicio, fim)
+            self._invalidar(min(inicio, inicio_anterior), max(fim, fim_anterior))
+
+    def liberar(self, chave) -> bool:
+        with self._trava:
+            periodo = self._periodos.pop(chave, None)
+            if periodo is None:
+                return False
+            placa, inicio, fim = periodo
+            calendario = self._calendarios[placa]
+            calendario.remover(inicio, chave)
+            if not calendario:
+                del self._calendarios[placa] # volta a ser um veículo ocioso
+            self._invalidar(inicio, fim)
+            return True
+
+    def _invalidar(self, inicio, fim):
+        # Só as consultas cujo período cruza o alterado podem ter mudado
+        for consulta in [c for c in self._cache if c[0] < fim and inicio < c[1]]:
+            del self._cache[consulta]
+
+    # --- Consultas ---
+
+    def livre(self, placa, inicio, fim) -> bool:
+        with self._trava:
+            calendario = self._calendarios.get(placa)
+            return calendario is None or calendario.livre(inicio, fim)
+
+    def ocupados(self, inicio, fim) -> frozenset:
+        """Placas com algum período cruzando [inicio, fim)."""
+        self._validar(inicio, fim)
+        consulta = (inicio, fim)
+        with self._trava:
+            ocupadas = self._cache.get(consulta)
+            if ocupadas is not None:
+                self._cache.move_to_end(consulta)
+                return ocupadas
+            ocupadas = frozenset(placa for placa, calendario in self._calendarios.items()
+                                 if not calendario.livre(inicio, fim))
+            self._cache[consulta] = ocupadas
+            if len(self._cache) > self._tamanho_cache:
+                self._cache.popitem(last=False)
+            return ocupadas
+
+    def periodos(self, placa) -> list:
+        """[(início, fim, chave)] do veículo, em ordem de data."""
+        with self._trava:
+            calendario = self._calendarios.get(placa)
+            return calendario.periodos() if calendario is not None else []
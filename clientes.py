@@ -1,25 +1,82 @@
 import os
+import threading
 from abc import ABC, abstractmethod
-import copy
-from exceptions import CpfJaCadastradoError
+from bisect import bisect_left, insort
+from itertools import islice
+from functools import wraps
+from contextlib import nullcontext
+from exceptions import CpfJaCadastradoError, DadosInvalidosError
+from validacoes import validar_nome, validar_cpf
+from paginacao import TAMANHO_PAGINA, Pagina, chave_de_ordenacao, exibir_paginado, percorrer, validar_limite
 
 class Singleton:
     _instances = {}
+    _lock = threading.RLock()
 
     def __new__(cls, *args, **kwargs):
-        if cls not in cls._instances:
-            instancia = super().__new__(cls)
-            cls._instances[cls] = instancia
-        return cls._instances[cls]
+        # Double-checked locking: a trava só é usada enquanto a instância não existe
+        instancia = cls._instances.get(cls)
+        if instancia is None:
+            with Singleton._lock:
+                instancia = cls._instances.get(cls)
+                if instancia is None:
+                    instancia = super().__new__(cls)
+                    cls._instances[cls] = instancia
+        return instancia
+
+    def __init_subclass__(cls, **kwargs):
+        # O __init__ roda a cada chamada de GerenciarX(); aqui ele passa a rodar uma
+        # vez só, conferindo '_initialized' de novo sob a trava contra corrida entre threads.
+        super().__init_subclass__(**kwargs)
+        inicializar = cls.__dict__.get('__init__')
+        if inicializar is None:
+            return
+
+        @wraps(inicializar)
+        def __init__(self, *args, **kwargs):
+            if getattr(self, '_initialized', False):
+                return
+            with Singleton._lock:
+                if not getattr(self, '_initialized', False):
+                    inicializar(self, *args, **kwargs)
+        cls.__init__ = __init__
+
+class TravasPorChave:
+    """Lock striping: um conjunto fixo de travas, escolhidas pelo hash da chave."""
+    def __init__(self, quantidade=64):
+        self._travas = tuple(threading.Lock() for _ in range(quantidade))
+
+    def __call__(self, chave):
+        return self._travas[hash(chave) % len(self._travas)]
+
+class Persistente:
+    """Base dos gerenciadores que podem gravar seu estado num repositório (persistencia.py)."""
+    _repositorio = None
+
+    @property
+    def repositorio(self):
+        return self._repositorio
+
+    def _transacao(self):
+        # Agrupa as escritas de uma operação numa única transação do repositório
+        if self._repositorio is None:
+            return nullcontext()
+        return self._repositorio.transacao()
 
 class Pessoa:
+    __slots__ = ('_nome', '_cpf')
+
     def __init__(self, nome='', cpf=''):
         self._nome = nome
         self._cpf = cpf
 
-    # Prototype
+    # Prototype: todos os atributos são imutáveis (str/int) e as permissões
+    # pertencem à classe, então copiar os slots equivale ao antigo deepcopy.
     def clone(self):
-        return copy.deepcopy(self)
+        novo = object.__new__(type(self))
+        novo._nome = self._nome
+        novo._cpf = self._cpf
+        return novo
 
     @property
     def cpf(self):
@@ -37,36 +94,46 @@ class Pessoa:
             print("Nome inválido")
 
 class Cliente(Pessoa):
-    def __init__(self, nome='', cpf=''):
-        super().__init__(nome, cpf)
-        self.permissoes = [
-            'reservar_veiculo',
-            'ver_historico',
-            'avaliar_aluguel',
-            'relatar_incidente',
-            'devolver_veiculo'
-        ]
+    __slots__ = ()
+
+    # Imutável e compartilhada por todas as instâncias (não é copiada no clone)
+    permissoes = frozenset({
+        'reservar_veiculo',
+        'ver_historico',
+        'avaliar_aluguel',
+        'relatar_incidente',
+        'devolver_veiculo'
+    })
 
     def __str__(self):
         return f"Cliente: {self.nome} | CPF: {self.cpf}"
 
 
 class Admin(Pessoa):
+    __slots__ = ('cargo', 'nivel_acesso')
+
+    permissoes = frozenset({
+        'cadastrar_cliente',
+        'cadastrar_veiculo',
+        'listar_veiculos',
+        'reservar_veiculo',
+        'efetuar_pagamento',
+        'registrar_manutencao',
+        'relatar_incidente',
+        'devolver_veiculo',
+        'relatorios_gerenciais'
+    })
+
     def __init__(self, nome='', cpf='', cargo='Administrador', nivel_acesso=1):
         super().__init__(nome, cpf)
         self.cargo = cargo
         self.nivel_acesso = nivel_acesso
-        self.permissoes = [
-            'cadastrar_cliente',
-            'cadastrar_veiculo',
-            'listar_veiculos',
-            'reservar_veiculo',
-            'efetuar_pagamento',
-            'registrar_manutencao',
-            'relatar_incidente',
-            'devolver_veiculo',
-            'relatorios_gerenciais'
-        ]
+
+    def clone(self):
+        novo = super().clone()
+        novo.cargo = self.cargo
+        novo.nivel_acesso = self.nivel_acesso
+        return novo
 
     def __str__(self):
         return (f"Administrador: {self.nome} | CPF: {self.cpf} | "
@@ -100,41 +167,230 @@ class AdminFactory(AbstractUsuarioFactory):
         return novo_admin
     
 
-class GerenciarCliente(Singleton):
+class GerenciarCliente(Singleton, Persistente):
     def __init__(self):
-        if hasattr(self, '_initialized'):
-            return
-        self.clientes = []
+        self._clientes = {}  # Índice principal: CPF -> Cliente (mantém a ordem de cadastro)
+        self._por_nome = {}  # Índice secundário: nome normalizado -> {CPF: Cliente}
+        # Chaves de cada ordenação de ORDENACOES, em ordem: as consultas andam por elas a partir do cursor
+        self._ordenados = {ordenar_por: [] for ordenar_por in self.ORDENACOES}
+        self._todos_carregados = True
+        # Protege só os índices; nunca é mantida durante uma gravação no repositório
+        self._trava = threading.RLock()
         self._initialized = True
 
+    def conectar_repositorio(self, repositorio):
+        # Os clientes ficam no repositório e só entram nos índices quando consultados
+        self._repositorio = repositorio
+        for cliente in self._clientes.values():
+            repositorio.salvar_cliente(cliente)
+        self._todos_carregados = False
+
+    @property
+    def clientes(self):
+        self._carregar_todos()
+        with self._trava:
+            return list(self._clientes.values())
+
+    def _carregar_todos(self):
+        if self._todos_carregados:
+            return
+        # Lidos antes de tomar a trava: as transações do repositório tomam a trava dos
+        # gerenciadores por dentro, então ler o repositório segurando a nossa inverteria a ordem
+        gravados = list(self._repositorio.carregar_clientes())
+        with self._trava:
+            if self._todos_carregados:
+                return
+            carregados = {}
+            for cliente in gravados:
+                carregados[cliente.cpf] = self._clientes.get(cliente.cpf) or cliente
+            for cliente in self._clientes.values(): # cadastrados depois da leitura
+                carregados.setdefault(cliente.cpf, cliente)
+            self._clientes = {}
+            self._por_nome = {}
+            for ordenados in self._ordenados.values():
+                ordenados.clear()
+            for cliente in carregados.values():
+                self._indexar(cliente, ordenar=False)
+            self._ordenar_indices()
+            self._todos_carregados = True
+
+    @staticmethod
+    def _normalizar_nome(nome):
+        return ' '.join(nome.split()).casefold()
+
+    def _indexar(self, cliente, ordenar=True):
+        # Chamado sob self._trava; com ordenar=False, quem chama ordena as listas no fim do lote
+        self._clientes[cliente.cpf] = cliente
+        chave = self._normalizar_nome(cliente.nome)
+        self._por_nome.setdefault(chave, {})[cliente.cpf] = cliente
+        for ordenar_por, chave_ordem in self.ORDENACOES.items():
+            if ordenar:
+                insort(self._ordenados[ordenar_por], chave_ordem(cliente))
+            else:
+                self._ordenados[ordenar_por].append(chave_ordem(cliente))
+
+    def _ordenar_indices(self):
+        # No lugar (uma consulta pode estar andando pela lista); o sort junta a parte já ordenada e o lote
+        for ordenados in self._ordenados.values():
+            ordenados.sort()
+
+    def _desindexar(self, cliente):
+        chave = self._normalizar_nome(cliente.nome)
+        mesmo_nome = self._por_nome.get(chave)
+        if mesmo_nome is not None:
+            mesmo_nome.pop(cliente.cpf, None)
+            if not mesmo_nome:
+                del self._por_nome[chave]
+        for ordenar_por, chave_ordem in self.ORDENACOES.items():
+            ordenados = self._ordenados[ordenar_por]
+            i = bisect_left(ordenados, chave_ordem(cliente))
+            if i < len(ordenados) and ordenados[i] == chave_ordem(cliente):
+                del ordenados[i]
+
+    def adicionar_cliente(self, cliente):
+        # A busca (que pode ler o repositório) vem antes da trava, como em _carregar_todos;
+        # sob a trava só se confere o índice em memória
+        if self.existe_cpf(cliente.cpf):
+            raise CpfJaCadastradoError("CPF já cadastrado! Por favor, utilize outro CPF.")
+        with self._trava:
+            if cliente.cpf in self._clientes:
+                raise CpfJaCadastradoError("CPF já cadastrado! Por favor, utilize outro CPF.")
+            self._indexar(cliente)
+        if self._repositorio is not None:
+            self._repositorio.salvar_cliente(cliente)
+
+    def adicionar_clientes(self, clientes):
+        # Tudo ou nada: os duplicados são verificados antes de qualquer alteração nos índices
+        novos = {}
+        for cliente in clientes:
+            # Fora da trava: traz do repositório os CPFs que já estão gravados (ver _carregar_todos)
+            if cliente.cpf in novos or self.existe_cpf(cliente.cpf):
+                raise CpfJaCadastradoError(f"CPF {cliente.cpf} já cadastrado!")
+            novos[cliente.cpf] = cliente
+        with self._trava:
+            for cpf in novos: # cadastrados por outra thread depois da verificação
+                if cpf in self._clientes:
+                    raise CpfJaCadastradoError(f"CPF {cpf} já cadastrado!")
+
+            for cliente in novos.values():
+                self._indexar(cliente, ordenar=False)
+            self._ordenar_indices()
+        if self._repositorio is not None:
+            with self._transacao():
+                for cliente in novos.values():
+                    self._repositorio.salvar_cliente(cliente)
+        return list(novos.values())
+
+    def remover_cliente(self, cpf):
+        self.buscar_por_cpf(cpf) # traz o cliente do repositório, se preciso, antes da trava
+        with self._trava:
+            cliente = self._clientes.pop(cpf, None)
+            if cliente is None:
+                return None
+            self._desindexar(cliente)
+        if self._repositorio is not None:
+            self._repositorio.remover_cliente(cpf)
+        return cliente
+
+    def buscar_por_cpf(self, cpf):
+        cliente = self._clientes.get(cpf)
+        if cliente is None and not self._todos_carregados:
+            cliente = self._repositorio.buscar_cliente(cpf)
+            if cliente is not None:
+                with self._trava:
+                    # Outra thread pode ter carregado o mesmo cliente nesse meio tempo
+                    if cpf not in self._clientes:
+                        self._indexar(cliente)
+                    cliente = self._clientes[cpf]
+        return cliente
+
+    def existe_cpf(self, cpf):
+        return self.buscar_por_cpf(cpf) is not None
+
+    def buscar_por_nome(self, nome):
+        if not self._todos_carregados:
+            encontrados = list(self._repositorio.buscar_clientes_por_nome(nome))
+            with self._trava:
+                for cliente in encontrados:
+                    if cliente.cpf not in self._clientes:
+                        self._indexar(cliente)
+        with self._trava:
+            return list(self._por_nome.get(self._normalizar_nome(nome), {}).values())
+
+    # Chaves de ordenação das consultas; o CPF desempata, então cada chave identifica um cliente (cursor)
+    ORDENACOES = {
+        'nome': lambda c: (GerenciarCliente._normalizar_nome(c.nome), c.cpf),
+        'cpf': lambda c: c.cpf,
+    }
+    # CPF a partir da chave de cada ordenação (as listas de _ordenados guardam só as chaves)
+    _CPF_DA_CHAVE = {'nome': lambda chave: chave[1], 'cpf': lambda chave: chave}
+
+    def consultar(self, nome=None, filtro=None, ordenar_por='nome', decrescente=False,
+                  depois_de=None, limite=None):
+        """Gerador sobre os clientes, na ordem pedida; 'nome' filtra por trecho do nome (sem diferenciar maiúsculas).
+
+        'depois_de' é o cursor de uma Pagina (ver paginar) e 'limite', o máximo de clientes devolvidos.
+        """
+        chave_de_ordenacao(self.ORDENACOES, ordenar_por)
+        validar_limite(limite)
+        trecho = self._normalizar_nome(nome) if nome else None
+        self._carregar_todos()
+        # Anda pelo índice já ordenado, um bloco por vez sob a trava, até completar o limite
+        cpf_da_chave = self._CPF_DA_CHAVE[ordenar_por]
+        clientes = percorrer(self._ordenados[ordenar_por], self._trava,
+                             lambda chave: self._clientes[cpf_da_chave(chave)], depois_de, decrescente)
+        if trecho is not None:
+            clientes = (c for c in clientes if trecho in self._normalizar_nome(c.nome))
+        if filtro is not None:
+            clientes = filter(filtro, clientes)
+        yield from islice(clientes, limite)
+
+    def paginar(self, limite=TAMANHO_PAGINA, **criterios) -> Pagina:
+        """Uma página de consultar(**criterios); o cursor dela, passado em depois_de, traz a seguinte."""
+        chave = chave_de_ordenacao(self.ORDENACOES, criterios.get('ordenar_por', 'nome'))
+        return Pagina.de(list(self.consultar(limite=limite + 1, **criterios)), limite, chave)
+
+    def registrar_cliente(self, nome, cpf):
+        """Valida os dados, cria o cliente pela fábrica e o cadastra."""
+        novo_cliente = ClienteFactory().criar_usuario(validar_nome(nome), validar_cpf(cpf))
+        self.adicionar_cliente(novo_cliente)
+        return novo_cliente
+
+    def registrar_clientes(self, dados):
+        """Valida, cria e cadastra vários clientes a partir de pares (nome, cpf): tudo ou nada.
+
+        O lote entra nos índices numa única atualização e no repositório numa única transação.
+        """
+        fabrica = ClienteFactory()
+        novos = []
+        for linha, (nome, cpf) in enumerate(dados, 1):
+            try:
+                novos.append(fabrica.criar_usuario(validar_nome(nome), validar_cpf(cpf)))
+            except DadosInvalidosError as e:
+                raise DadosInvalidosError(f"Registro {linha} ({cpf}): {e}") from e
+        return self.adicionar_clientes(novos)
+
     def cadastrar_cliente(self):
         while True:
-            nome = input("Nome: ")
-            if not nome.replace(' ', '').isalpha():
-                print("Nome inválido! Digite apenas letras e espaços.")
-            else:
+            try:
+                nome = validar_nome(input("Nome: "))
                 break
+            except DadosInvalidosError as e:
+                print(e)
 
         while True:
-            cpf = input("CPF: ")
-            if len(cpf) != 11 or not cpf.isdigit():
-                print("CPF inválido! Deve conter 11 dígitos numéricos.")
-            else:
+            try:
+                cpf = validar_cpf(input("CPF: "))
                 break
+            except DadosInvalidosError as e:
+                print(e)
 
-        if cpf in [c.cpf for c in self.clientes]:
-            raise CpfJaCadastradoError("CPF já cadastrado! Por favor, utilize outro CPF.")
-        
-        novo_cliente = ClienteFactory().criar_usuario(nome, cpf)
-        self.clientes.append(novo_cliente)
+        self.registrar_cliente(nome, cpf)
         print("\nCliente cadastrado com sucesso! \n")
 
     def listar_clientes(self):
         os.system('cls' if os.name == 'nt' else 'clear')
         print("\n=== LISTA DE CLIENTES CADASTRADOS ===\n")
-        if not self.clientes:
-            print("Nenhum cliente cadastrado.\n")
-            return
-
-        for idx, c in enumerate(self.clientes, 1):
-            print(f"{idx} - Nome: {c.nome} | CPF: {c.cpf}")
\ No newline at end of file
+        exibir_paginado(lambda cursor: self.paginar(depois_de=cursor),
+                        lambda idx, c: f"{idx} - Nome: {c.nome} | CPF: {c.cpf}",
+                        vazio="Nenhum cliente cadastrado.\n")
\ No newline at end of file
@@ -1,8 +1,12 @@
 # comandos.py
 
 from abc import ABC, abstractmethod
-from datetime import datetime
+from datetime import date, datetime, timedelta
 from exceptions import AppError, ReservaNaoPagaError, VeiculoIndisponivelError, CpfJaCadastradoError
+from reserva import Reserva
+from paginacao import exibir_paginado
+from validacoes import validar_data
+import analitica
 
 # Padrão Composite:
 class IRelatorioComponent(ABC):
@@ -96,8 +100,8 @@ class AdminExibirContratoCommand(ICommand):
         self._ger_cli = ger_cli
     def execute(self):
         cpf = input("Digite o CPF do cliente para exibir contrato(s): ").strip()
-        contratos = [r for r in self._ger_res.reservas if r.cpf == cpf]
-        cliente = next((c for c in self._ger_cli.clientes if c.cpf == cpf), None)
+        contratos = self._ger_res.buscar_reservas(cpf=cpf)
+        cliente = self._ger_cli.buscar_por_cpf(cpf)
         if cliente and contratos:
             for r in contratos:
                 r.exibir_contrato(cliente)
@@ -109,7 +113,7 @@ class RegistrarManutencaoCommand(ICommand):
         self._ger_vei = ger_vei
     def execute(self):
         placa = input("Digite a placa do veículo: ").strip().upper()
-        veic = next((v for v in self._ger_vei.veiculos if v.placa == placa), None)
+        veic = self._ger_vei.buscar_por_placa(placa)
         if veic:
             veic.registrar_manutencao()
         else:
@@ -127,7 +131,7 @@ class ListarManutencoesCommand(ICommand):
         self._ger_vei = ger_vei
     def execute(self):
         placa = input("Digite a placa para listar manutenções: ").strip().upper()
-        veic = next((v for v in self._ger_vei.veiculos if v.placa == placa), None)
+        veic = self._ger_vei.buscar_por_placa(placa)
         if veic:
             veic.listar_manutencoes()
         else:
@@ -146,8 +150,16 @@ class RelatoriosGerenciaisCommand(ICommand):
         grupo_frota.add(RelatorioLeaf("Estatísticas da frota", ger_vei.estatisticas_utilizacao))
         grupo_frota.add(RelatorioLeaf("Histórico geral de manutenções", ger_vei.historico_manutencoes))
         rel_pagamentos = RelatorioLeaf("Controle de pagamentos", ger_res.controle_pagamentos)
+        grupo_analises = RelatorioComposite("Análises de Receita e Utilização")
+        grupo_analises.add(RelatorioLeaf("Utilização por modelo e veículo",
+                                         lambda: analitica.relatorio_utilizacao(ger_res, ger_vei)))
+        grupo_analises.add(RelatorioLeaf("Receita, ticket médio e descontos",
+                                         lambda: analitica.relatorio_receita(ger_res, ger_vei)))
+        grupo_analises.add(RelatorioLeaf("Avaliações por veículo",
+                                         lambda: analitica.relatorio_avaliacoes(ger_res, ger_vei)))
         self._menu_relatorios.add(grupo_frota)
         self._menu_relatorios.add(rel_pagamentos)
+        self._menu_relatorios.add(grupo_analises)
         
     def execute(self):
         self._menu_relatorios.execute()
@@ -163,7 +175,7 @@ class RastrearVeiculoCommand(ICommand):
         self._ger_vei = ger_vei
     def execute(self):
         placa = input("Digite a placa do veículo para rastrear: ").strip().upper()
-        veic = next((v for v in self._ger_vei.veiculos if v.placa == placa), None)
+        veic = self._ger_vei.buscar_por_placa(placa)
         if veic:
             veic.simular_movimentacao()
             print(f"Localização atual do {veic.modelo} ({veic.placa}): {veic.localizacao}")
@@ -179,24 +191,30 @@ class ReservarVeiculoCommand(ICommand):
     def __init__(self, ger_res, ger_vei, usuario):
         self._ger_res, self._ger_vei, self._usuario = ger_res, ger_vei, usuario
     def execute(self):
-        self._ger_vei.listar_veiculos()
-        veiculos_disp = [v for v in self._ger_vei.veiculos if v.disponivel]
-        if not veiculos_disp: return
         try:
+            texto = input("Data de retirada (dd/mm/aaaa, Enter para hoje): ").strip()
+            inicio = validar_data(texto).date() if texto else date.today()
+            dias = int(input("Por quantos dias deseja alugar? "))
+            if dias <= 0: print("Quantidade de dias deve ser maior que zero."); return
+            fim = inicio + timedelta(days=dias)
+            # Só os veículos sem reserva no período escolhido
+            veiculos_disp = self._ger_res.veiculos_livres(self._ger_vei, inicio, fim)
+            print(f"\n=== VEÍCULOS LIVRES DE {inicio.strftime('%d/%m/%Y')} A {fim.strftime('%d/%m/%Y')} ===")
+            if not veiculos_disp: print("Nenhum veículo livre neste período."); return
+            for i, v in enumerate(veiculos_disp, start=1):
+                print(f"{i} - Modelo: {v.modelo} | Placa: {v.placa} | Ano: {v.ano} | R${v.valor:.2f}/dia")
             escolha = int(input("Escolha o número do veículo: "))
             if 1 <= escolha <= len(veiculos_disp):
-                veiculo = veiculos_disp[escolha-1]
-                dias = int(input("Por quantos dias deseja alugar? "))
-                if dias > 0: self._ger_res.fazer_reserva(self._usuario, veiculo, dias)
-                else: print("Quantidade de dias deve ser maior que zero.")
+                self._ger_res.fazer_reserva(self._usuario, veiculos_disp[escolha-1], dias, inicio)
             else: print("Opção inválida.")
+        except AppError as e: print(e)
         except (ValueError, IndexError): print("Entrada inválida.")
 
 class ExibirContratoCommand(ICommand):
     def __init__(self, ger_res, usuario):
         self._ger_res, self._usuario = ger_res, usuario
     def execute(self):
-        contratos = [r for r in self._ger_res.reservas if r.cpf == self._usuario.cpf]
+        contratos = self._ger_res.buscar_reservas(cpf=self._usuario.cpf)
         if contratos:
             for r in contratos: r.exibir_contrato(self._usuario)
         else: print("Nenhuma reserva encontrada.")
@@ -205,7 +223,7 @@ class EfetuarPagamentoCommand(ICommand):
     def __init__(self, ger_res, usuario):
         self._ger_res, self._usuario = ger_res, usuario
     def execute(self):
-        r_list = [r for r in self._ger_res.reservas if r.cpf == self._usuario.cpf and not r.pago]
+        r_list = self._ger_res.buscar_reservas(cpf=self._usuario.cpf, estados=(Reserva.PENDENTE,))
         if not r_list: print("Nenhuma reserva em aberto para pagamento."); return
         print("\n=== SUAS RESERVAS EM ABERTO ===")
         for idx, r in enumerate(r_list, 1):
@@ -220,7 +238,7 @@ class RelatarIncidenteCommand(ICommand):
     def __init__(self, ger_res, usuario):
         self._ger_res, self._usuario = ger_res, usuario
     def execute(self):
-        r_list = [r for r in self._ger_res.reservas if r.cpf == self._usuario.cpf and not r.finalizada]
+        r_list = self._ger_res.buscar_reservas(cpf=self._usuario.cpf, estados=(Reserva.PENDENTE, Reserva.PAGA))
         if not r_list: print("Nenhuma reserva em andamento para relatar incidente."); return
         print("\n=== SUAS RESERVAS EM ANDAMENTO ===")
         for idx, r in enumerate(r_list, 1): print(f"{idx}. Veículo: {r.modelo} | Placa: {r.placa}")
@@ -238,13 +256,13 @@ class DevolverVeiculoCommand(ICommand):
     def __init__(self, ger_res, ger_vei, usuario):
         self._ger_res, self._ger_vei, self._usuario = ger_res, ger_vei, usuario
     def execute(self):
-        r_list = [r for r in self._ger_res.reservas if r.cpf == self._usuario.cpf and r.pago and not r.finalizada]
+        r_list = self._ger_res.buscar_reservas(cpf=self._usuario.cpf, estados=(Reserva.PAGA,))
         if not r_list: print("Nenhuma reserva paga e ativa para devolução."); return
         print("\n=== SUAS RESERVAS ATIVAS PARA DEVOLUÇÃO ===")
         for idx, r in enumerate(r_list, 1): print(f"{idx}. Veículo: {r.modelo} | Placa: {r.placa}")
         try:
             escolha = int(input("Escolha o número da reserva para devolver: "))
-            if 1 <= escolha <= len(r_list): r_list[escolha-1].devolver_veiculo(self._ger_vei.veiculos)
+            if 1 <= escolha <= len(r_list): r_list[escolha-1].devolver_veiculo(self._ger_vei)
             else: print("Opção inválida.")
         except (ReservaNaoPagaError, VeiculoIndisponivelError) as e:
             print(f"\n[ERRO NA DEVOLUÇÃO]: {e}")
@@ -257,27 +275,31 @@ class HistoricoReservasCommand(ICommand):
     def __init__(self, ger_res, usuario):
         self._ger_res, self._usuario = ger_res, usuario
     def execute(self):
-        historico = [r for r in self._ger_res.reservas if r.cpf == self._usuario.cpf]
-        if not historico: print("Nenhum histórico de reservas encontrado."); return
         print("\n=== SEU HISTÓRICO DE RESERVAS ===")
-        for r in historico:
-            status = "Finalizada" if r.finalizada else ("Paga" if r.pago else "Pendente")
-            print(f"\nVeículo: {r.modelo} ({r.placa}) - Status: {status}")
-            print(f"  Período: {r.dias} dias | Total (diárias): R${r.total:.2f}")
-            if r.finalizada and r._avaliacao:
-                print(f"  Sua Avaliação: Nota {r._avaliacao} - '{r._comentario}'")
+        # Mais recentes primeiro, uma página por vez
+        exibir_paginado(lambda cursor: self._ger_res.paginar(cpf=self._usuario.cpf, decrescente=True,
+                                                             depois_de=cursor),
+                        lambda _, r: self._formatar(r), vazio="Nenhum histórico de reservas encontrado.")
+    @staticmethod
+    def _formatar(r):
+        status = "Finalizada" if r.finalizada else ("Paga" if r.pago else "Pendente")
+        linhas = [f"\nVeículo: {r.modelo} ({r.placa}) - Status: {status}",
+                  f"  Período: {r.dias} dias | Total (diárias): R${r.total:.2f}"]
+        if r.finalizada and r._avaliacao:
+            linhas.append(f"  Sua Avaliação: Nota {r._avaliacao} - '{r._comentario}'")
+        return "\n".join(linhas)
 
 class ModificarReservaCommand(ICommand):
     def __init__(self, ger_res, ger_vei, usuario):
         self._ger_res, self._ger_vei, self._usuario = ger_res, ger_vei, usuario
     def execute(self):
-        r_list = [r for r in self._ger_res.reservas if r.cpf == self._usuario.cpf and not r.pago and not r.finalizada]
+        r_list = self._ger_res.buscar_reservas(cpf=self._usuario.cpf, estados=(Reserva.PENDENTE,))
         if not r_list: print("Nenhuma reserva não paga disponível para modificação."); return
         print("\n=== SUAS RESERVAS NÃO PAGAS ===")
         for idx, r in enumerate(r_list, 1): print(f"{idx}. Veículo: {r.modelo} | Placa: {r.placa} | Dias: {r.dias}")
         try:
             escolha = int(input("Escolha o número da reserva para modificar: "))
-            if 1 <= escolha <= len(r_list): self._ger_res.modificar_reserva(r_list[escolha-1], self._ger_vei.veiculos)
+            if 1 <= escolha <= len(r_list): self._ger_res.modificar_reserva(r_list[escolha-1], self._ger_vei)
             else: print("Opção inválida.")
         except (ValueError, IndexError): print("Entrada inválida.")
 
@@ -285,12 +307,12 @@ class CancelarReservaCommand(ICommand):
     def __init__(self, ger_res, ger_vei, usuario):
         self._ger_res, self._ger_vei, self._usuario = ger_res, ger_vei, usuario
     def execute(self):
-        r_list = [r for r in self._ger_res.reservas if r.cpf == self._usuario.cpf and not r.pago and not r.finalizada]
+        r_list = self._ger_res.buscar_reservas(cpf=self._usuario.cpf, estados=(Reserva.PENDENTE,))
         if not r_list: print("Nenhuma reserva não paga disponível para cancelamento."); return
         print("\n=== SUAS RESERVAS NÃO PAGAS ===")
         for idx, r in enumerate(r_list, 1): print(f"{idx}. Veículo: {r.modelo} | Placa: {r.placa}")
         try:
             escolha = int(input("Escolha o número da reserva para cancelar: "))
-            if 1 <= escolha <= len(r_list): self._ger_res.cancelar_reserva(r_list[escolha-1], self._ger_vei.veiculos)
+            if 1 <= escolha <= len(r_list): self._ger_res.cancelar_reserva(r_list[escolha-1], self._ger_vei)
             else: print("Opção inválida.")
         except (ValueError, IndexError): print("Entrada inválida.")
\ No newline at end of file
@@ -0,0 +1,186 @@
+"""Motor de cotação: o único lugar onde o preço de uma reserva é calculado.
+
+A conta segue sempre a mesma ordem (diárias brutas, desconto de longa duração,
+cupom, desconto da forma de pagamento, caução) e o resultado vem itemizado numa
+Cotacao. Cotações repetidas saem de um cache LRU; cotar_tabela() calcula uma
+grade veículos x dias de uma vez, vetorizada com NumPy quando ele está instalado.
+"""
+import threading
+from collections import OrderedDict
+from exceptions import CupomInvalidoError, DadosInvalidosError
+
+try:
+    import numpy as np
+except ImportError:  # NumPy é opcional: sem ele a tabela é montada com listas
+    np = None
+
+VALOR_CAUCAO = 250.00
+DIAS_LONGA_DURACAO = 7        # a partir de quantos dias vale o desconto de longa duração
+DESCONTO_LONGA_DURACAO = 0.10
+
+
+class Cotacao:
+    """Preço itemizado de uma reserva. Somente leitura: as instâncias são compartilhadas pelo cache."""
+    __slots__ = ('valor_diaria', 'dias', 'diarias_brutas', 'desconto_longa_duracao',
+                 'desconto_cupom', 'desconto_pagamento', 'caucao', 'total')
+
+    def __init__(self, valor_diaria, dias, diarias_brutas, desconto_longa_duracao,
+                 desconto_cupom, desconto_pagamento, caucao, total):
+        self.valor_diaria = valor_diaria
+        self.dias = dias
+        self.diarias_brutas = diarias_brutas
+        self.desconto_longa_duracao = desconto_longa_duracao
+        self.desconto_cupom = desconto_cupom
+        self.desconto_pagamento = desconto_pagamento
+        self.caucao = caucao
+        self.total = total
+
+    @property
+    def subtotal(self) -> float:
+        """Diárias com o desconto de longa duração: o valor que fica gravado na reserva."""
+        return self.diarias_brutas - self.desconto_longa_duracao
+
+    @property
+    def diarias_a_pagar(self) -> float:
+        return self.total - self.caucao
+
+    def como_dict(self) -> dict:
+        itens = {nome: getattr(self, nome) for nome in self.__slots__}
+        return {nome: round(valor, 2) if isinstance(valor, float) else valor for nome, valor in itens.items()}
+
+    def __repr__(self):
+        return f"Cotacao(dias={self.dias}, subtotal={self.subtotal:.2f}, total={self.total:.2f})"
+
+
+class MotorCotacao:
+    def __init__(self, capacidade_cache=4096):
+        self._capacidade = capacidade_cache
+        self._cache = OrderedDict()
+        self._trava = threading.Lock()
+        self.acertos = 0
+        self.faltas = 0
+
+    # --- Cache ---
+
+    def _memorizado(self, chave, calcular):
+        with self._trava:
+            resultado = self._cache.get(chave)
+            if resultado is not None:
+                self._cache.move_to_end(chave)
+                self.acertos += 1
+                return resultado
+            self.faltas += 1
+        # Calculado fora da trava: duas threads com a mesma cotação no máximo repetem a conta
+        resultado = calcular()
+        with self._trava:
+            self._cache[chave] = resultado
+            if len(self._cache) > self._capacidade:
+                self._cache.popitem(last=False)
+        return resultado
+
+    def limpar_cache(self):
+        with self._trava:
+            self._cache.clear()
+
+    # --- Regras ---
+
+    @staticmethod
+    def _definicao_cupom(cupom, promo_codes):
+        # (tipo, valor) do cupom entra na chave do cache: se o cupom mudar, a cotação muda junto
+        if not cupom:
+            return None
+        try:
+            # Um catálogo (cupons.py) lança CupomInvalidoError com o motivo; um dict, KeyError
+            tipo, valor = promo_codes[cupom]
+        except (KeyError, TypeError):
+            raise CupomInvalidoError("Cupom inválido ou expirado.")
+        return tipo, valor
+
+    @staticmethod
+    def _aplicar_cupom(subtotal, definicao):
+        if definicao is None:
+            return subtotal
+        tipo, valor = definicao
+        desconto = subtotal * valor if tipo == 'perc' else valor
+        return max(subtotal - desconto, 0)
+
+    @classmethod
+    def _calcular(cls, valor_diaria, dias, diarias_brutas, desconto_longa, definicao, estrategia, caucao,
+                  subtotal=None):
+        if subtotal is None:
+            subtotal = diarias_brutas - desconto_longa
+        com_cupom = cls._aplicar_cupom(subtotal, definicao)
+        total = estrategia.calcular(com_cupom, caucao) if estrategia is not None else com_cupom + caucao
+        return Cotacao(valor_diaria, dias, diarias_brutas, desconto_longa, subtotal - com_cupom,
+                       com_cupom + caucao - total, caucao, total)
+
+    # --- Consultas ---
+
+    def cotar(self, valor_diaria, dias, cupom=None, estrategia=None, promo_codes=None,
+              caucao=VALOR_CAUCAO) -> Cotacao:
+        """Cotação completa a partir da diária do veículo."""
+        if dias <= 0:
+            raise DadosInvalidosError("A quantidade de dias deve ser positiva.")
+        definicao = self._definicao_cupom(cupom, promo_codes)
+        chave = ('cotar', valor_diaria, dias, definicao, type(estrategia), caucao)
+
+        def calcular():
+            brutas = valor_diaria * dias
+            desconto_longa = brutas * DESCONTO_LONGA_DURACAO if dias >= DIAS_LONGA_DURACAO else 0.0
+            return self._calcular(valor_diaria, dias, brutas, desconto_longa, definicao, estrategia, caucao)
+        return self._memorizado(chave, calcular)
+
+    def cotar_subtotal(self, subtotal, cupom=None, estrategia=None, promo_codes=None,
+                       caucao=VALOR_CAUCAO, dias=None) -> Cotacao:
+        """Cotação a partir das diárias já com o desconto de longa duração (o total gravado numa reserva)."""
+        definicao = self._definicao_cupom(cupom, promo_codes)
+        chave = ('subtotal', subtotal, dias, definicao, type(estrategia), caucao)
+
+        def calcular():
+            # O desconto de longa duração já está no subtotal: é separado de volta para que o
+            # pagamento mostre os mesmos itens da cotação, mas a conta parte do subtotal gravado
+            brutas, desconto_longa = subtotal, 0.0
+            if dias is not None and dias >= DIAS_LONGA_DURACAO:
+                brutas = subtotal / (1 - DESCONTO_LONGA_DURACAO)
+                desconto_longa = brutas - subtotal
+            valor_diaria = brutas / dias if dias else None
+            return self._calcular(valor_diaria, dias, brutas, desconto_longa, definicao, estrategia, caucao,
+                                  subtotal)
+        return self._memorizado(chave, calcular)
+
+    def cotar_tabela(self, valores_diaria, lista_dias, cupom=None, estrategia=None, promo_codes=None,
+                     caucao=VALOR_CAUCAO) -> tuple:
+        """Totais de uma grade veículos x dias: uma linha por diária em valores_diaria, uma coluna por dias."""
+        valores_diaria, lista_dias = tuple(valores_diaria), tuple(lista_dias)
+        if any(dias <= 0 for dias in lista_dias):
+            raise DadosInvalidosError("A quantidade de dias deve ser positiva.")
+        definicao = self._definicao_cupom(cupom, promo_codes)
+        chave = ('tabela', valores_diaria, lista_dias, definicao, type(estrategia), caucao)
+        return self._memorizado(chave, lambda: self._tabela(valores_diaria, lista_dias, definicao,
+                                                            estrategia, caucao))
+
+    def _tabela(self, valores_diaria, lista_dias, definicao, estrategia, caucao):
+        if np is None or not valores_diaria or not lista_dias:
+            return tuple(tuple(self._calcular(None, None, valor * dias,
+                                              valor * dias * DESCONTO_LONGA_DURACAO
+                                              if dias >= DIAS_LONGA_DURACAO else 0.0,
+                                              definicao, estrategia, caucao).total
+                               for dias in lista_dias)
+                         for valor in valores_diaria)
+
+        # Mesmas operações da cotação unitária, sobre a grade inteira
+        dias = np.asarray(lista_dias, dtype=float)
+        brutas = np.asarray(valores_diaria, dtype=float)[:, None] * dias[None, :]
+        subtotal = brutas - np.where(dias >= DIAS_LONGA_DURACAO, brutas * DESCONTO_LONGA_DURACAO, 0.0)
+        if definicao is not None:
+            tipo, valor = definicao
+            subtotal = np.maximum(subtotal - (subtotal * valor if tipo == 'perc' else valor), 0)
+        totais = estrategia.calcular(subtotal, caucao) if estrategia is not None else subtotal + caucao
+        return tuple(map(tuple, totais.tolist()))
+
+    def __repr__(self):
+        return f"MotorCotacao(cache={len(self._cache)}, acertos={self.acertos}, faltas={self.faltas})"
+
+
+# Um único motor atende criação, alteração e pagamento de reservas
+MOTOR_COTACAO = MotorCotacao()
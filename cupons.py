@@ -0,0 +1,223 @@
+"""Catálogo de cupons de desconto.
+
+Cada cupom tem validade e limite de usos opcionais. As regras são verificadas
+e normalizadas uma vez, no cadastro: o pagamento só compara números. As
+validades ficam num heap, então expurgar os vencidos custa O(1) quando nada
+venceu, e o resgate (que conta um uso) é atômico entre threads.
+"""
+import heapq
+import threading
+import time
+from datetime import datetime
+from clientes import Persistente
+from exceptions import CupomInvalidoError, DadosInvalidosError
+
+TIPOS_CUPOM = ('perc', 'fixo')
+
+
+class Cupom:
+    __slots__ = ('_codigo', '_tipo', '_valor', '_expira_em', '_limite_usos', '_usos')
+
+    def __init__(self, codigo, tipo, valor, expira_em=None, limite_usos=None, usos=0):
+        codigo = str(codigo).strip().upper()
+        if not codigo:
+            raise DadosInvalidosError("Informe o código do cupom.")
+        if tipo not in TIPOS_CUPOM:
+            raise DadosInvalidosError("Tipo de desconto inválido. Use 'perc' ou 'fixo'.")
+        valor = float(valor)
+        if valor <= 0 or (tipo == 'perc' and valor > 1):
+            raise DadosInvalidosError("Valor de desconto inválido (use 0.2 para 20% ou 100 para R$100).")
+        if limite_usos is not None and int(limite_usos) < 1:
+            raise DadosInvalidosError("O limite de usos deve ser de pelo menos 1.")
+        self._codigo = codigo
+        self._tipo = tipo
+        self._valor = valor
+        self._expira_em = float(expira_em) if expira_em is not None else None # timestamp (time.time())
+        self._limite_usos = int(limite_usos) if limite_usos is not None else None
+        self._usos = int(usos)
+
+    @property
+    def codigo(self): return self._codigo
+
+    @property
+    def tipo(self): return self._tipo
+
+    @property
+    def valor(self): return self._valor
+
+    @property
+    def expira_em(self): return self._expira_em
+
+    @property
+    def limite_usos(self): return self._limite_usos
+
+    @property
+    def usos(self): return self._usos
+
+    @property
+    def definicao(self):
+        """(tipo, valor), o formato usado pelo motor de cotação."""
+        return self._tipo, self._valor
+
+    def expirado(self, agora=None) -> bool:
+        return self._expira_em is not None and (time.time() if agora is None else agora) >= self._expira_em
+
+    def esgotado(self) -> bool:
+        return self._limite_usos is not None and self._usos >= self._limite_usos
+
+    def descricao(self) -> str:
+        texto = (f"{self._valor*100:.0f}% de desconto" if self._tipo == 'perc'
+                 else f"R$ {self._valor:.2f} de desconto fixo")
+        if self._expira_em is not None:
+            ultimo_instante = datetime.fromtimestamp(self._expira_em - 1)
+            texto += f" | válido até {ultimo_instante.strftime('%d/%m/%Y %H:%M')}"
+        if self._limite_usos is not None:
+            texto += f" | {self._usos}/{self._limite_usos} usos"
+        elif self._usos:
+            texto += f" | {self._usos} usos"
+        return texto
+
+    def __repr__(self):
+        return f"Cupom({self._codigo!r}, {self._tipo!r}, {self._valor})"
+
+
+class CatalogoCupons(Persistente):
+    """Cupons por código. Também responde como o dicionário {código: (tipo, valor)} do motor de cotação,
+    enxergando só os cupons utilizáveis (nem vencidos nem esgotados)."""
+
+    def __init__(self):
+        self._cupons = {}      # código -> Cupom
+        self._validades = []   # heap de (expira_em, código); entradas de cupons removidos são ignoradas
+        # Protege só os índices; nunca é mantida durante uma gravação no repositório
+        self._trava = threading.Lock()
+
+    def conectar_repositorio(self, repositorio):
+        self._repositorio = repositorio
+        gravados = list(repositorio.carregar_cupons())
+        with self._trava:
+            codigos_gravados = {cupom.codigo for cupom in gravados}
+            locais = [c for codigo, c in self._cupons.items() if codigo not in codigos_gravados]
+            for cupom in gravados:
+                self._indexar(cupom)
+        with self._transacao():
+            for cupom in locais:
+                repositorio.salvar_cupom(cupom)
+        self.expurgar()
+
+    def _indexar(self, cupom):
+        self._cupons[cupom.codigo] = cupom
+        if cupom.expira_em is not None:
+            heapq.heappush(self._validades, (cupom.expira_em, cupom.codigo))
+
+    # --- Cadastro ---
+
+    def adicionar(self, codigo, tipo, valor, expira_em=None, limite_usos=None) -> Cupom:
+        """Cadastra um cupom; expira_em é um timestamp (ver validade_ate) ou None para não expirar."""
+        cupom = Cupom(codigo, tipo, valor, expira_em, limite_usos)
+        if cupom.expirado():
+            raise DadosInvalidosError("A validade do cupom já passou.")
+        self.expurgar()
+        with self._trava:
+            if cupom.codigo in self._cupons:
+                raise DadosInvalidosError("Este código já existe.")
+            self._indexar(cupom)
+        if self._repositorio is not None:
+            self._repositorio.salvar_cupom(cupom)
+        return cupom
+
+    def remover(self, codigo) -> bool:
+        with self._trava:
+            removido = self._cupons.pop(codigo, None) is not None
+        if removido and self._repositorio is not None:
+            self._repositorio.remover_cupom(codigo)
+        return removido
+
+    @staticmethod
+    def validade_ate(data: datetime) -> float:
+        """Timestamp do fim do dia 'data' (o cupom vale durante todo o último dia)."""
+        return datetime(data.year, data.month, data.day, 23, 59, 59).timestamp() + 1
+
+    # --- Consulta ---
+
+    def expurgar(self, agora=None) -> list:
+        """Retira os cupons vencidos; devolve os códigos removidos."""
+        agora = time.time() if agora is None else agora
+        if not self._validades or self._validades[0][0] > agora:
+            return [] # caminho comum: nada venceu desde a última olhada
+        removidos = []
+        with self._trava:
+            while self._validades and self._validades[0][0] <= agora:
+                expira_em, codigo = heapq.heappop(self._validades)
+                cupom = self._cupons.get(codigo)
+                if cupom is not None and cupom.expira_em == expira_em:
+                    del self._cupons[codigo]
+                    removidos.append(codigo)
+        if removidos and self._repositorio is not None:
+            with self._transacao():
+                for codigo in removidos:
+                    self._repositorio.remover_cupom(codigo)
+        return removidos
+
+    def buscar(self, codigo):
+        self.expurgar()
+        return self._cupons.get(codigo)
+
+    def listar(self) -> list:
+        self.expurgar()
+        with self._trava:
+            return list(self._cupons.values())
+
+    def __len__(self):
+        return len(self._cupons)
+
+    def validar(self, codigo) -> Cupom:
+        """O cupom, se ele pode ser usado agora; senão CupomInvalidoError com o motivo."""
+        cupom = self.buscar(codigo)
+        self._verificar(cupom)
+        return cupom
+
+    @staticmethod
+    def _verificar(cupom):
+        if cupom is None or cupom.expirado():
+            raise CupomInvalidoError("Cupom inválido ou expirado.")
+        if cupom.esgotado():
+            raise CupomInvalidoError("Cupom esgotado: o limite de usos já foi atingido.")
+
+    def __contains__(self, codigo):
+        try:
+            self.validar(codigo)
+        except CupomInvalidoError:
+            return False
+        return True
+
+    def __getitem__(self, codigo):
+        return self.validar(codigo).definicao
+
+    # --- Uso ---
+
+    def resgatar(self, codigo) -> Cupom:
+        """Conta um uso do cupom; lança CupomInvalidoError se ele não existe, venceu ou esgotou."""
+        self.expurgar()
+        with self._transacao():
+            with self._trava:
+                cupom = self._cupons.get(codigo)
+                self._verificar(cupom)
+                cupom._usos += 1
+            if self._repositorio is not None:
+                self._repositorio.registrar_uso_cupom(codigo, 1)
+        return cupom
+
+    def estornar(self, codigo):
+        """Devolve um uso resgatado por um pagamento que não se concretizou."""
+        with self._transacao():
+            with self._trava:
+                cupom = self._cupons.get(codigo)
+                if cupom is None or cupom.usos == 0:
+                    return
+                cupom._usos -= 1
+            if self._repositorio is not None:
+                self._repositorio.registrar_uso_cupom(codigo, -1)
+
+
+# Catálogo usado pelos pagamentos, pela camada de serviço e pelo menu de ofertas
+CUPONS = CatalogoCupons()
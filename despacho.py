@@ -0,0 +1,315 @@
+"""Despacho de notificações em segundo plano.
+
+Os canais daqui implementam INotificationSender, então entram no lugar de
+qualquer canal do Bridge (Notification -> INotificationSender) e podem ser
+empilhados:
+
+- DespachanteAssincrono: send() só põe a mensagem numa fila limitada e volta na
+  hora; um grupo de threads do próprio canal retira as mensagens em lotes,
+  entrega pelo canal real e repete as falhas com espera exponencial.
+- EnvioAgrupado: junta as mensagens de um mesmo destinatário que chegam dentro
+  de uma janela num único resumo e limita a vazão do canal com um balde de
+  fichas (token bucket), contando quantos envios foram economizados.
+
+Na saída do programa tudo o que ainda está pendente é entregue.
+"""
+import atexit
+import itertools
+import queue
+import threading
+import time
+import weakref
+from collections import deque
+from reserva import INotificationSender
+from exceptions import EnvioParcialError
+
+_FIM = object() # sentinela que encerra um trabalhador
+
+# Canais em segundo plano ainda abertos (ordem de criação -> canal), esvaziados pelo gancho de encerramento
+_ATIVOS = weakref.WeakValueDictionary()
+_ordem_criacao = itertools.count()
+
+
+class DespachanteAssincrono(INotificationSender):
+    def __init__(self, sender: INotificationSender, trabalhadores=2, capacidade=1000,
+                 tamanho_lote=50, tentativas=3, espera_inicial=0.05, espera_fila=1.0):
+        self._sender = sender
+        self._fila = queue.Queue(maxsize=capacidade)
+        self._tamanho_lote = tamanho_lote
+        self._tentativas = tentativas
+        self._espera_inicial = espera_inicial
+        self._espera_fila = espera_fila # quanto send() aguarda com a fila cheia antes de descartar
+        self._trava = threading.Lock()
+        self.enviadas = 0
+        self.descartadas = 0
+        self.falhas = 0
+        self.repeticoes = 0
+        self._fechado = False
+        nome = type(sender).__name__
+        self._trabalhadores = [threading.Thread(target=self._trabalhar, name=f"despacho-{nome}-{i}", daemon=True)
+                               for i in range(trabalhadores)]
+        for trabalhador in self._trabalhadores:
+            trabalhador.start()
+        self._registro = next(_ordem_criacao)
+        _ATIVOS[self._registro] = self
+
+    @property
+    def sender(self):
+        return self._sender
+
+    @property
+    def pendentes(self):
+        return self._fila.qsize()
+
+    def send(self, message: str, destinatario=None):
+        if self._fechado:
+            raise RuntimeError("Despachante encerrado.")
+        try:
+            self._fila.put((message, destinatario), timeout=self._espera_fila)
+        except queue.Full:
+            # Fila cheia por mais tempo que o tolerado: a reserva não fica esperando o canal
+            with self._trava:
+                self.descartadas += 1
+
+    def _trabalhar(self):
+        while True:
+            primeira = self._fila.get()
+            if primeira is _FIM:
+                self._fila.task_done()
+                return
+            lote = [primeira]
+            encerrar = False
+            while len(lote) < self._tamanho_lote:
+                try:
+                    mensagem = self._fila.get_nowait()
+                except queue.Empty:
+                    break
+                if mensagem is _FIM:
+                    encerrar = True
+                    break
+                lote.append(mensagem)
+            self._entregar(lote)
+            for _ in range(len(lote) + encerrar):
+                self._fila.task_done()
+            if encerrar:
+                return
+
+    def _entregar(self, lote):
+        # Só o que ainda não saiu é repetido: com EnvioParcialError o canal diz quantas mensagens
+        # do início do lote foram entregues e qual falhou; qualquer outro erro vale para o lote inteiro
+        espera, tentativa = self._espera_inicial, 1
+        while lote:
+            try:
+                self._sender.send_batch(lote)
+            except EnvioParcialError as parcial:
+                entregues, erro, culpadas = parcial.entregues, parcial.erro, 1
+            except Exception as e:
+                entregues, erro, culpadas = 0, e, len(lote)
+            else:
+                entregues, erro = len(lote), None
+
+            if entregues:
+                with self._trava:
+                    self.enviadas += entregues
+                lote = lote[entregues:]
+                espera, tentativa = self._espera_inicial, 1 # as tentativas contam por mensagem
+            if erro is None:
+                return
+
+            if tentativa == self._tentativas:
+                with self._trava:
+                    self.falhas += culpadas
+                print(f"[DESPACHO] {culpadas} notificação(ões) via {type(self._sender).__name__} "
+                      f"perdida(s) após {tentativa} tentativas: {erro}")
+                lote = lote[culpadas:]
+                espera, tentativa = self._espera_inicial, 1
+                continue
+            with self._trava:
+                self.repeticoes += 1
+            time.sleep(espera)
+            espera *= 2
+            tentativa += 1
+
+    def esvaziar(self):
+        """Bloqueia até todas as mensagens já aceitas terem sido entregues (ou desistidas)."""
+        self._fila.join()
+
+    def fechar(self):
+        """Entrega o que está na fila e encerra os trabalhadores."""
+        if self._fechado:
+            return
+        self._fechado = True
+        for _ in self._trabalhadores:
+            self._fila.put(_FIM)
+        for trabalhador in self._trabalhadores:
+            trabalhador.join()
+        _ATIVOS.pop(self._registro, None)
+
+
+class BaldeDeFichas:
+    """Token bucket: até 'capacidade' envios de uma vez, com fichas repostas a 'taxa' por segundo."""
+    def __init__(self, taxa, capacidade):
+        self._taxa = taxa
+        self._capacidade = capacidade
+        self._fichas = float(capacidade)
+        self._ultima_reposicao = time.monotonic()
+        self._trava = threading.Lock()
+
+    def tentar(self) -> float:
+        """Consome uma ficha se houver e devolve 0; senão devolve quantos segundos faltam para a próxima."""
+        with self._trava:
+            agora = time.monotonic()
+            self._fichas = min(self._capacidade, self._fichas + (agora - self._ultima_reposicao) * self._taxa)
+            self._ultima_reposicao = agora
+            if self._fichas >= 1:
+                self._fichas -= 1
+                return 0.0
+            return (1 - self._fichas) / self._taxa
+
+    def consumir(self) -> bool:
+        """Bloqueia até conseguir uma ficha; devolve True se precisou esperar."""
+        esperou = False
+        while True:
+            falta = self.tentar()
+            if not falta:
+                return esperou
+            esperou = True
+            time.sleep(falta)
+
+
+class EnvioAgrupado(INotificationSender):
+    """Agrupa por destinatário e limita a vazão de um canal (e-mail, SMS...).
+
+    A primeira mensagem para um destinatário abre uma janela de 'janela'
+    segundos; tudo o que chegar para ele até o fim dela sai como um único
+    resumo. Mensagens sem destinatário não são agrupadas, só respeitam o
+    limite. Cada envio ao canal real consome uma ficha do balde (taxa por
+    segundo, com rajada de até 'rajada'); enquanto o canal espera por fichas,
+    as janelas seguintes continuam acumulando, então o agrupamento cresce
+    justamente nos picos.
+    """
+    def __init__(self, sender: INotificationSender, janela=2.0, taxa=5.0, rajada=10):
+        self._sender = sender
+        self._janela = janela
+        self._balde = BaldeDeFichas(taxa, rajada) if taxa else None
+        # destinatário -> (prazo, mensagens); a ordem de inserção é a ordem dos prazos
+        self._grupos = {}
+        self._avulsas = deque()
+        self._cond = threading.Condition()
+        self._em_envio = 0
+        self._forcar = 0 # esvaziamentos em andamento: entregar sem esperar o fim das janelas
+        self._fechado = False
+        self.recebidas = 0
+        self.enviadas = 0
+        self.economizadas = 0 # mensagens que foram dentro de um resumo em vez de sair sozinhas
+        self.limitadas = 0    # envios que precisaram esperar por uma ficha
+        self.falhas = 0
+        self._trabalhador = threading.Thread(target=self._trabalhar, daemon=True,
+                                             name=f"agrupado-{type(sender).__name__}")
+        self._trabalhador.start()
+        self._registro = next(_ordem_criacao)
+        _ATIVOS[self._registro] = self
+
+    @property
+    def sender(self):
+        return self._sender
+
+    @property
+    def pendentes(self):
+        with self._cond:
+            return len(self._avulsas) + sum(len(mensagens) for _, mensagens in self._grupos.values())
+
+    def send(self, message: str, destinatario=None):
+        with self._cond:
+            if self._fechado:
+                raise RuntimeError("Envio agrupado encerrado.")
+            self.recebidas += 1
+            if destinatario is None:
+                self._avulsas.append(message)
+            else:
+                grupo = self._grupos.get(destinatario)
+                if grupo is None:
+                    self._grupos[destinatario] = grupo = (time.monotonic() + self._janela, [])
+                grupo[1].append(message)
+            self._cond.notify_all()
+
+    def _proximo_envio(self):
+        # Chamado com a condição adquirida; None quando o canal foi fechado e não resta nada
+        while True:
+            if self._avulsas:
+                return self._avulsas.popleft(), None, 1
+            if self._grupos:
+                destinatario, (prazo, mensagens) = next(iter(self._grupos.items()))
+                falta = prazo - time.monotonic()
+                if falta <= 0 or self._forcar or self._fechado:
+                    del self._grupos[destinatario]
+                    return self._resumir(mensagens), destinatario, len(mensagens)
+                self._cond.wait(falta)
+            elif self._fechado:
+                return None
+            else:
+                self._cond.wait()
+
+    @staticmethod
+    def _resumir(mensagens):
+        if len(mensagens) == 1:
+            return mensagens[0]
+        itens = "\n".join(f"{i}) {mensagem}" for i, mensagem in enumerate(mensagens, 1))
+        return f"Você tem {len(mensagens)} novidades sobre suas reservas:\n{itens}"
+
+    def _trabalhar(self):
+        while True:
+            with self._cond:
+                envio = self._proximo_envio()
+                if envio is None:
+                    return
+                self._em_envio += 1
+            mensagem, destinatario, quantidade = envio
+            limitada = self._balde is not None and self._balde.consumir()
+            try:
+                self._sender.send(mensagem, destinatario)
+            except Exception as erro:
+                print(f"[AGRUPADO] {quantidade} notificação(ões) via {type(self._sender).__name__} perdida(s): {erro}")
+                sucesso = False
+            else:
+                sucesso = True
+            with self._cond:
+                self._em_envio -= 1
+                self.limitadas += limitada
+                if sucesso:
+                    self.enviadas += 1
+                    self.economizadas += quantidade - 1
+                else:
+                    self.falhas += quantidade
+                self._cond.notify_all()
+
+    def esvaziar(self):
+        """Entrega agora tudo o que está agrupado (sem esperar as janelas) e aguarda o canal real."""
+        with self._cond:
+            self._forcar += 1
+            self._cond.notify_all()
+            try:
+                self._cond.wait_for(lambda: not self._grupos and not self._avulsas and not self._em_envio)
+            finally:
+                self._forcar -= 1
+
+    def fechar(self):
+        """Entrega o que está pendente e encerra o trabalhador."""
+        with self._cond:
+            if self._fechado:
+                return
+            self._fechado = True
+            self._cond.notify_all()
+        self._trabalhador.join()
+        _ATIVOS.pop(self._registro, None)
+
+
+@atexit.register
+def encerrar_todos():
+    # Flush-on-shutdown: nenhuma notificação aceita se perde ao sair do programa.
+    # Do mais novo para o mais antigo: quem envolve outro canal foi criado depois
+    # dele e precisa ser esvaziado antes.
+    for registro in sorted(_ATIVOS.keys(), reverse=True):
+        canal = _ATIVOS.get(registro)
+        if canal is not None:
+            canal.fechar()
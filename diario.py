@@ -0,0 +1,448 @@
+import json
+import os
+import threading
+from bisect import bisect_left, insort
+from contextlib import contextmanager
+from datetime import date
+from clientes import ClienteFactory
+from veiculos import VeiculoBuilder, NAO_CARREGADO
+from reserva import Reserva
+from persistencia import IRepositorio, _registro_manutencao
+from cupons import Cupom
+from paginacao import percorrer
+from versoes import depois_da_versao
+
+# Repository baseado em diário (event sourcing simples): cada alteração vira
+# um evento compacto numa linha de 'diario.log' (só acrescenta, nunca reescreve).
+# De tempos em tempos o estado é compactado em 'snapshot.json' e o diário recomeça,
+# então a inicialização lê o snapshot e reaplica apenas a cauda do diário.
+
+ARQUIVO_SNAPSHOT = 'snapshot.json'
+ARQUIVO_DIARIO = 'diario.log'
+
+
+def _estado_vazio():
+    return {
+        'clientes': {},     # cpf -> nome
+        'veiculos': {},     # placa -> [modelo, ano, valor, disponivel]
+        'manutencoes': {},  # placa -> [[descricao, data, custo, versao], ...]
+        'reservas': {},     # id -> {campos da reserva + 'incidentes'}
+        'cupons': {},       # codigo -> [tipo, valor, expira_em, limite_usos, usos]
+        'ultimo_id_reserva': 0,
+    }
+
+
+class RepositorioDiario(IRepositorio):
+    def __init__(self, diretorio, eventos_por_snapshot=10_000, sincronizar=True):
+        os.makedirs(diretorio, exist_ok=True)
+        self._caminho_snapshot = os.path.join(diretorio, ARQUIVO_SNAPSHOT)
+        self._caminho_diario = os.path.join(diretorio, ARQUIVO_DIARIO)
+        self._eventos_por_snapshot = eventos_por_snapshot
+        self._sincronizar = sincronizar
+
+        self._estado = _estado_vazio()
+        # Índices de versão (exportação incremental), remontados na recuperação e mantidos por _aplicar
+        self._reservas_por_versao = []     # (versao, id)
+        self._manutencoes_por_versao = []  # (versao, placa, [descricao, data, custo, versao])
+        self._seq = 0                # último número de sequência atribuído
+        self._seq_snapshot = 0       # último evento coberto pelo snapshot
+        self._recuperar()
+        self.novo = self._seq == 0   # nenhum evento gravado até agora
+
+        self._cond = threading.Condition()
+        self._pendentes = []         # linhas aguardando o próximo group commit
+        self._seq_gravado = self._seq
+        self._local = threading.local()  # transação em andamento (por thread)
+        self._encerrando = False
+        self._compactacao_pedida = False
+        self._erro = None            # falha de gravação: o diário para de aceitar eventos
+        self._arquivo = open(self._caminho_diario, 'a', encoding='utf-8')
+        self._gravador = threading.Thread(target=self._laco_gravacao, name='diario-gravador', daemon=True)
+        self._gravador.start()
+
+    # --- Recuperação ---
+
+    def _recuperar(self):
+        if os.path.exists(self._caminho_snapshot):
+            with open(self._caminho_snapshot, encoding='utf-8') as f:
+                snapshot = json.load(f)
+            self._estado = snapshot['estado']
+            self._seq = self._seq_snapshot = snapshot['seq']
+            self._reservas_por_versao = sorted((d['versao'], d['id']) for d in self._estado['reservas'].values())
+            self._manutencoes_por_versao = sorted(
+                (dados[3], placa, dados) for placa, registros in self._estado['manutencoes'].items()
+                for dados in registros)
+
+        if not os.path.exists(self._caminho_diario):
+            return
+        with open(self._caminho_diario, 'rb+') as f:
+            integros = 0 # bytes até o fim da última linha completa
+            for linha in f:
+                try:
+                    if not linha.endswith(b'\n'):
+                        raise ValueError
+                    evento = json.loads(linha)
+                except ValueError:
+                    break  # última linha incompleta (queda durante a gravação)
+                integros += len(linha)
+                if evento['s'] <= self._seq_snapshot:
+                    continue
+                self._aplicar(evento['e'], evento['d'])
+                self._seq = evento['s']
+            # Corta a linha incompleta: senão o próximo evento seria acrescentado colado a ela
+            if integros < f.seek(0, os.SEEK_END):
+                f.truncate(integros)
+                f.flush()
+                os.fsync(f.fileno())
+
+    @property
+    def eventos_na_cauda(self):
+        return self._seq - self._seq_snapshot
+
+    # --- Escrita com group commit ---
+
+    @contextmanager
+    def transacao(self):
+        # Eventos de uma transação só entram no diário (e no estado) juntos, no fim do bloco externo
+        if not hasattr(self._local, 'buffer'):
+            self._local.buffer = []
+            self._local.profundidade = 0
+        self._local.profundidade += 1
+        try:
+            yield self
+        except BaseException:
+            self._local.profundidade -= 1
+            if self._local.profundidade == 0:
+                self._local.buffer = []
+            raise
+        self._local.profundidade -= 1
+        if self._local.profundidade == 0 and self._local.buffer:
+            eventos, self._local.buffer = self._local.buffer, []
+            self._publicar(eventos)
+
+    def _registrar(self, tipo, dados):
+        if getattr(self._local, 'profundidade', 0):
+            self._local.buffer.append((tipo, dados))
+        else:
+            self._publicar([(tipo, dados)])
+
+    def _verificar_erro(self):
+        if self._erro is not None:
+            raise OSError(f"O diário parou de gravar ({self._erro}); a alteração não foi confirmada.") from self._erro
+
+    def _publicar(self, eventos):
+        with self._cond:
+            self._verificar_erro()
+            for tipo, dados in eventos:
+                self._seq += 1
+                self._aplicar(tipo, dados)
+                self._pendentes.append(json.dumps({'s': self._seq, 'e': tipo, 'd': dados},
+                                                  separators=(',', ':'), ensure_ascii=False) + '\n')
+            alvo = self._seq
+            self._cond.notify_all()
+            # Group commit: quem chegou enquanto o gravador fazia fsync entra no mesmo lote
+            while self._seq_gravado < alvo:
+                self._verificar_erro()
+                self._cond.wait()
+
+    def _laco_gravacao(self):
+        try:
+            while True:
+                with self._cond:
+                    while not (self._pendentes or self._compactacao_pedida or self._encerrando):
+                        self._cond.wait()
+                    if not (self._pendentes or self._compactacao_pedida):
+                        return
+                    lote, self._pendentes = self._pendentes, []
+                    ultimo = self._seq
+
+                if lote:
+                    self._arquivo.write(''.join(lote))
+                    self._arquivo.flush()
+                    if self._sincronizar:
+                        os.fsync(self._arquivo.fileno())
+
+                with self._cond:
+                    self._seq_gravado = ultimo
+                    compactar = (self._compactacao_pedida
+                                 or self._seq - self._seq_snapshot >= self._eventos_por_snapshot)
+                    if compactar:
+                        # Só a cópia do estado é feita sob a trava; a gravação e o fsync ficam fora dela
+                        snapshot = json.dumps({'seq': self._seq, 'estado': self._estado},
+                                              separators=(',', ':'), ensure_ascii=False)
+                        seq_snapshot, cobertos = self._seq, len(self._pendentes)
+                    self._cond.notify_all()
+
+                if compactar:
+                    self._gravar_snapshot(snapshot)
+                    with self._cond:
+                        self._trocar_diario(seq_snapshot, cobertos)
+                        self._compactacao_pedida = False
+                        self._seq_gravado = max(self._seq_gravado, seq_snapshot)
+                        self._cond.notify_all()
+        except Exception as e:
+            # Disco cheio, erro de E/S...: quem espera pelo lote recebe o erro em vez de esperar para sempre
+            with self._cond:
+                self._erro = e
+                self._cond.notify_all()
+
+    def _gravar_snapshot(self, conteudo):
+        # Só na thread gravadora, sem self._cond: os eventos continuam sendo aceitos enquanto isso
+        with open(self._caminho_snapshot + '.tmp', 'w', encoding='utf-8') as f:
+            f.write(conteudo)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _trocar_diario(self, seq_snapshot, cobertos):
+        # Com self._cond adquirido. O snapshot cobre as 'cobertos' primeiras linhas pendentes, que são
+        # descartadas; as que chegaram durante a gravação dele vão para o diário novo no próximo lote.
+        os.replace(self._caminho_snapshot + '.tmp', self._caminho_snapshot)
+        self._seq_snapshot = seq_snapshot
+        del self._pendentes[:cobertos]
+        self._arquivo.close()
+        self._arquivo = open(self._caminho_diario, 'w', encoding='utf-8')
+
+    def compactar(self):
+        # A troca do arquivo fica com o gravador, que é o único a escrever nele
+        with self._cond:
+            self._verificar_erro()
+            if self._encerrando:
+                return
+            self._compactacao_pedida = True
+            self._cond.notify_all()
+            while self._compactacao_pedida:
+                self._verificar_erro()
+                self._cond.wait()
+
+    # --- Aplicação dos eventos ao estado ---
+
+    def _aplicar(self, tipo, d):
+        estado = self._estado
+        if tipo == 'cliente':
+            estado['clientes'][d[0]] = d[1]
+        elif tipo == 'cliente-':
+            estado['clientes'].pop(d[0], None)
+        elif tipo == 'veiculo':
+            estado['veiculos'][d[0]] = d[1:]
+        elif tipo == 'disponivel':
+            estado['veiculos'][d[0]][3] = d[1]
+        elif tipo == 'veiculo-':
+            estado['veiculos'].pop(d[0], None)
+            if estado['manutencoes'].pop(d[0], None):
+                self._manutencoes_por_versao[:] = [e for e in self._manutencoes_por_versao if e[1] != d[0]]
+        elif tipo == 'manutencao':
+            estado['manutencoes'].setdefault(d[0], []).append(d[1:])
+            insort(self._manutencoes_por_versao, (d[4], d[0], d[1:]))
+        elif tipo == 'reserva':
+            self._desindexar_reserva(estado['reservas'].get(str(d['id'])))
+            estado['reservas'][str(d['id'])] = d
+            estado['ultimo_id_reserva'] = max(estado['ultimo_id_reserva'], d['id'])
+            insort(self._reservas_por_versao, (d['versao'], d['id']))
+        elif tipo == 'cancelada':
+            self._desindexar_reserva(estado['reservas'].pop(str(d[0]), None))
+        # Eventos de uma reserva existente: [id, campos..., versão]
+        elif tipo in ('modificada', 'paga', 'devolvida', 'avaliada', 'incidente'):
+            reserva = estado['reservas'][str(d[0])]
+            self._desindexar_reserva(reserva)
+            if tipo == 'modificada':
+                reserva['dias'], reserva['total'] = d[1:3]
+            elif tipo == 'paga':
+                reserva['pago'] = True
+                reserva['desconto_cupom'], reserva['desconto_pagamento'] = d[1:3]
+            elif tipo == 'devolvida':
+                reserva['finalizada'] = True
+                reserva['caucao_retido'] = d[1]
+            elif tipo == 'avaliada':
+                reserva['avaliacao'], reserva['comentario'] = d[1:3]
+            else:
+                reserva['incidentes'].append(d[1:3])
+            reserva['versao'] = d[-1]
+            insort(self._reservas_por_versao, (reserva['versao'], reserva['id']))
+        elif tipo == 'cupom':
+            estado['cupons'][d[0]] = d[1:]
+        elif tipo == 'cupom-':
+            estado['cupons'].pop(d[0], None)
+        elif tipo == 'cupom-uso':
+            cupom = estado['cupons'].get(d[0])
+            if cupom is not None:
+                cupom[4] = max(cupom[4] + d[1], 0)
+
+    def _desindexar_reserva(self, dados):
+        if dados is None:
+            return
+        chave = (dados['versao'], dados['id'])
+        i = bisect_left(self._reservas_por_versao, chave)
+        if i < len(self._reservas_por_versao) and self._reservas_por_versao[i] == chave:
+            del self._reservas_por_versao[i]
+
+    # --- Clientes ---
+
+    def salvar_cliente(self, cliente):
+        self._registrar('cliente', [cliente.cpf, cliente.nome])
+
+    def remover_cliente(self, cpf):
+        self._registrar('cliente-', [cpf])
+
+    def buscar_cliente(self, cpf):
+        nome = self._estado['clientes'].get(cpf)
+        return ClienteFactory().criar_usuario(nome, cpf) if nome is not None else None
+
+    def buscar_clientes_por_nome(self, nome):
+        fabrica = ClienteFactory()
+        alvo = nome.casefold()
+        for cpf, nome_cliente in list(self._estado['clientes'].items()):
+            if nome_cliente.casefold() == alvo:
+                yield fabrica.criar_usuario(nome_cliente, cpf)
+
+    def carregar_clientes(self):
+        fabrica = ClienteFactory()
+        for cpf, nome in list(self._estado['clientes'].items()):
+            yield fabrica.criar_usuario(nome, cpf)
+
+    # --- Veículos ---
+
+    def salvar_veiculo(self, veiculo):
+        if veiculo.placa in self._estado['veiculos']:
+            self._registrar('disponivel', [veiculo.placa, veiculo.disponivel])
+        else:
+            self._registrar('veiculo', [veiculo.placa, veiculo.modelo, str(veiculo.ano),
+                                        veiculo.valor, veiculo.disponivel])
+
+    def remover_veiculo(self, placa):
+        self._registrar('veiculo-', [placa])
+
+    def carregar_veiculos(self):
+        for placa, (modelo, ano, valor, disponivel) in list(self._estado['veiculos'].items()):
+            veiculo = (VeiculoBuilder()
+                       .com_modelo(modelo)
+                       .com_placa(placa)
+                       .com_ano(ano)
+                       .com_valor(valor)
+                       .build())
+            veiculo._disponivel = disponivel
+            veiculo._manutencao = NAO_CARREGADO
+            yield veiculo
+
+    def salvar_manutencao(self, veiculo, registro):
+        self._registrar('manutencao', [veiculo.placa, registro.descricao, registro.data_formatada,
+                                       registro.custo, registro.versao])
+
+    def carregar_manutencoes(self, placa):
+        return [_registro_manutencao(*dados) for dados in self._estado['manutencoes'].get(placa, [])]
+
+    def carregar_todas_manutencoes(self):
+        # Agrupadas por veículo, e na ordem de registro dentro de cada um
+        return [(placa, _registro_manutencao(*dados))
+                for placa, registros in self._estado['manutencoes'].items() for dados in registros]
+
+    def carregar_manutencoes_alteradas(self, desde=None):
+        for _, placa, dados in percorrer(self._manutencoes_por_versao, self._cond, depois_de=depois_da_versao(desde)):
+            yield placa, _registro_manutencao(*dados)
+
+    # --- Reservas ---
+
+    def salvar_reserva(self, reserva, evento):
+        if evento == 'criada':
+            self._registrar('reserva', {
+                'id': reserva.id, 'cpf': reserva.cpf, 'placa': reserva.placa, 'modelo': reserva.modelo,
+                'inicio': reserva.inicio.isoformat(),
+                'dias': reserva.dias, 'total': reserva.total, 'deposito': reserva._deposito,
+                'pago': reserva.pago, 'finalizada': reserva.finalizada, 'caucao_retido': reserva.caucao_retido,
+                'avaliacao': reserva._avaliacao, 'comentario': reserva._comentario,
+                'incidentes': [[i['data'], i['descricao']] for i in reserva.incidentes],
+                'desconto_cupom': reserva.desconto_cupom, 'desconto_pagamento': reserva.desconto_pagamento,
+                'versao': reserva.versao})
+        elif evento == 'modificada':
+            self._registrar('modificada', [reserva.id, reserva.dias, reserva.total, reserva.versao])
+        elif evento == Reserva.PAGA:
+            self._registrar('paga', [reserva.id, reserva.desconto_cupom, reserva.desconto_pagamento, reserva.versao])
+        elif evento == Reserva.FINALIZADA:
+            self._registrar('devolvida', [reserva.id, reserva.caucao_retido, reserva.versao])
+        elif evento == 'avaliada':
+            self._registrar('avaliada', [reserva.id, reserva._avaliacao, reserva._comentario, reserva.versao])
+
+    def remover_reserva(self, reserva):
+        self._registrar('cancelada', [reserva.id])
+
+    def salvar_incidente(self, reserva, incidente):
+        self._registrar('incidente', [reserva.id, incidente['data'], incidente['descricao'], reserva.versao])
+
+    def carregar_reservas(self, cpf=None, placa=None, finalizadas=None):
+        for dados in list(self._estado['reservas'].values()):
+            if cpf is not None and dados['cpf'] != cpf:
+                continue
+            if placa is not None and dados['placa'] != placa:
+                continue
+            if finalizadas is not None and dados['finalizada'] != finalizadas:
+                continue
+            yield self._reserva_de_dados(dados)
+
+    def carregar_reservas_alteradas(self, desde=None):
+        # Cada bloco é convertido sob self._cond: os eventos aplicados depois não o alteram pela metade
+        yield from percorrer(self._reservas_por_versao, self._cond,
+                             lambda chave: self._reserva_de_dados(self._estado['reservas'][str(chave[1])]),
+                             depois_de=depois_da_versao(desde))
+
+    @staticmethod
+    def _reserva_de_dados(dados):
+        reserva = Reserva()
+        reserva._id = dados['id']
+        reserva._cpf = dados['cpf']
+        reserva._placa = dados['placa']
+        reserva._modelo = dados['modelo']
+        reserva._inicio = date.fromisoformat(dados['inicio'])
+        reserva._dias = dados['dias']
+        reserva._total = dados['total']
+        reserva._deposito = dados['deposito']
+        reserva._pago = dados['pago']
+        reserva._finalizada = dados['finalizada']
+        reserva._caucao_retido = dados['caucao_retido']
+        reserva._avaliacao = dados['avaliacao']
+        reserva._comentario = dados['comentario']
+        reserva._desconto_cupom = dados['desconto_cupom']
+        reserva._desconto_pagamento = dados['desconto_pagamento']
+        reserva._versao = dados['versao']
+        reserva._incidentes = [{'data': data, 'descricao': desc}
+                               for data, desc in dados['incidentes']] or None
+        return reserva
+
+    def proximo_id_reserva(self):
+        return self._estado['ultimo_id_reserva'] + 1
+
+    def resumir_reservas_finalizadas(self):
+        resumo = dict.fromkeys(('quantidade', 'retidas'), 0)
+        resumo.update(dict.fromkeys(('valor', 'caucao', 'caucao_retida'), 0.0))
+        for dados in list(self._estado['reservas'].values()):
+            if not dados['finalizada']:
+                continue
+            resumo['quantidade'] += 1
+            resumo['valor'] += dados['total'] + dados['deposito']
+            resumo['caucao'] += dados['deposito']
+            if dados['caucao_retido']:
+                resumo['retidas'] += 1
+                resumo['caucao_retida'] += dados['deposito']
+        return resumo
+
+    # --- Cupons ---
+
+    def salvar_cupom(self, cupom):
+        self._registrar('cupom', [cupom.codigo, cupom.tipo, cupom.valor,
+                                  cupom.expira_em, cupom.limite_usos, cupom.usos])
+
+    def remover_cupom(self, codigo):
+        self._registrar('cupom-', [codigo])
+
+    def registrar_uso_cupom(self, codigo, delta):
+        self._registrar('cupom-uso', [codigo, delta])
+
+    def carregar_cupons(self):
+        return [Cupom(codigo, *dados) for codigo, dados in list(self._estado['cupons'].items())]
+
+    def fechar(self):
+        with self._cond:
+            if self._encerrando:
+                return
+            self._encerrando = True
+            self._cond.notify_all()
+        self._gravador.join()
+        self._arquivo.close()
@@ -20,6 +20,10 @@ class VeiculoNaoEncontradoError(AppError):
     """Lançada ao tentar operar sobre um veículo que não está na lista."""
     pass
 
+class ClienteNaoEncontradoError(AppError):
+    """Lançada ao tentar operar sobre um CPF que não está cadastrado."""
+    pass
+
 # --- Exceções de Reserva ---
 
 class ReservaJaPagaError(AppError):
@@ -30,6 +34,27 @@ class ReservaNaoPagaError(AppError):
     """Lançada ao tentar devolver um veículo cuja reserva ainda não foi paga."""
     pass
 
+class ReservaNaoEncontradaError(AppError):
+    """Lançada ao tentar operar sobre uma reserva inexistente."""
+    pass
+
+class ReservaFinalizadaError(AppError):
+    """Lançada ao tentar alterar uma reserva cujo veículo já foi devolvido."""
+    pass
+
+class CupomInvalidoError(AppError):
+    """Lançada quando o cupom de desconto informado não existe ou expirou."""
+    pass
+
 class DadosInvalidosError(AppError):
     """Lançada quando dados essenciais para uma operação estão faltando."""
-    pass
\ No newline at end of file
+    pass
+
+# --- Exceções de Notificação ---
+
+class EnvioParcialError(Exception):
+    """Lançada por send_batch quando só as primeiras 'entregues' mensagens do lote saíram."""
+    def __init__(self, entregues, erro):
+        super().__init__(f"{entregues} mensagem(ns) entregue(s) antes da falha: {erro}")
+        self.entregues = entregues
+        self.erro = erro
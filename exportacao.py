@@ -0,0 +1,221 @@
+"""Exportação de reservas, manutenções e incidentes para arquivos CSV ou JSONL.
+
+Os registros saem dos gerenciadores por geradores e são escritos um a um num
+arquivo com buffer grande (compactado com gzip se o nome terminar em .gz), sem
+montar o conteúdo em memória. O arquivo é gravado com nome temporário e só
+substitui o anterior quando termina, então uma exportação interrompida não
+deixa arquivo pela metade. Uso (a partir da raiz do projeto):
+
+    python exportacao.py reservas reservas.csv
+    python exportacao.py manutencoes manutencoes.jsonl.gz --incremental
+
+Com --incremental, só saem os registros alterados desde a última exportação
+incremental do mesmo tipo: cada alteração recebe uma versão crescente
+(versoes.py) e a maior versão exportada fica guardada como marca d'água em
+'.marcas_exportacao.json', na pasta do arquivo. Reservas e incidentes são
+exportados por reserva (chaves 'id' e 'reserva' + 'numero'): quem consome o
+arquivo deve sobrescrever as linhas já recebidas com as mesmas chaves.
+Reservas canceladas são apagadas e por isso não aparecem na exportação.
+"""
+import csv
+import gzip
+import io
+import json
+import os
+import sys
+from reserva import Gerenciar_Reserva
+from veiculos import GerenciarVeiculo
+from exceptions import DadosInvalidosError
+from persistencia import repositorio_do_ambiente
+
+TAMANHO_BUFFER = 1 << 16
+ARQUIVO_MARCAS = '.marcas_exportacao.json'
+
+COLUNAS = {
+    'reservas': ('id', 'cpf', 'placa', 'modelo', 'inicio', 'fim', 'dias', 'total', 'caucao', 'estado',
+                 'caucao_retido', 'desconto_cupom', 'desconto_pagamento', 'avaliacao', 'comentario', 'versao'),
+    'manutencoes': ('placa', 'data', 'descricao', 'custo', 'versao'),
+    'incidentes': ('reserva', 'numero', 'cpf', 'placa', 'data', 'descricao', 'versao'),
+}
+
+
+class ResultadoExportacao:
+    def __init__(self, tipo, caminho, desde):
+        self.tipo = tipo
+        self.caminho = caminho
+        self.desde = desde    # marca d'água usada (None: exportação completa)
+        self.exportados = 0
+        self.versao = desde   # maior versão exportada: a marca da próxima exportação incremental
+
+    def __str__(self):
+        origem = "completa" if self.desde is None else f"desde a versão {self.desde}"
+        return f"{self.exportados} registro(s) de {self.tipo} exportado(s) para {self.caminho} ({origem})"
+
+
+# --- Registros ---
+
+def _linhas_reservas(ger_res, desde):
+    for r in ger_res.reservas_alteradas(desde):
+        yield r.versao, {
+            'id': r.id, 'cpf': r.cpf, 'placa': r.placa, 'modelo': r.modelo,
+            'inicio': r.inicio.isoformat(), 'fim': r.fim.isoformat(), 'dias': r.dias,
+            'total': round(r.total, 2), 'caucao': round(r.deposito, 2), 'estado': r.estado,
+            'caucao_retido': r.caucao_retido, 'desconto_cupom': round(r.desconto_cupom, 2),
+            'desconto_pagamento': round(r.desconto_pagamento, 2), 'avaliacao': r._avaliacao, 'comentario': r._comentario,
+            'versao': r.versao}
+
+
+def _linhas_incidentes(ger_res, desde):
+    for r in ger_res.reservas_alteradas(desde):
+        for numero, incidente in enumerate(r.incidentes, 1):
+            yield r.versao, {'reserva': r.id, 'numero': numero, 'cpf': r.cpf, 'placa': r.placa,
+                             'data': incidente['data'], 'descricao': incidente['descricao'], 'versao': r.versao}
+        if not r.incidentes:
+            yield r.versao, None # sem linha, mas a versão conta para a marca d'água
+
+
+def _linhas_manutencoes(ger_vei, desde):
+    for placa, m in ger_vei.manutencoes_alteradas(desde):
+        yield m.versao, {'placa': placa, 'data': m.data.isoformat(), 'descricao': m.descricao,
+                         'custo': m.custo, 'versao': m.versao}
+
+
+# --- Formatos ---
+
+def _escrever_csv(arquivo, colunas, linhas):
+    escritor = csv.DictWriter(arquivo, colunas)
+    escritor.writeheader()
+    escritor.writerows(linhas) # consome o gerador linha a linha
+
+
+def _escrever_jsonl(arquivo, colunas, linhas):
+    for linha in linhas:
+        arquivo.write(json.dumps(linha, ensure_ascii=False))
+        arquivo.write('\n')
+
+
+FORMATOS = {'.csv': _escrever_csv, '.jsonl': _escrever_jsonl}
+
+
+def _formato(caminho):
+    """(função de escrita, compactar) a partir da extensão: .csv, .jsonl, .csv.gz ou .jsonl.gz."""
+    base, extensao = os.path.splitext(caminho.lower())
+    compactar = extensao == '.gz'
+    if compactar:
+        extensao = os.path.splitext(base)[1]
+    if extensao not in FORMATOS:
+        raise DadosInvalidosError("Formato não suportado: use .csv ou .jsonl (com .gz opcional).")
+    return FORMATOS[extensao], compactar
+
+
+def _gravar(caminho, tipo, linhas, resultado, tamanho_buffer):
+    escrever, compactar = _formato(caminho)
+
+    def contadas():
+        for versao, linha in linhas:
+            if resultado.versao is None or versao > resultado.versao:
+                resultado.versao = versao
+            if linha is not None:
+                resultado.exportados += 1
+                yield linha
+
+    temporario = caminho + '.tmp'
+    try:
+        # O buffer grande fica no arquivo em disco: o texto (e o gzip) escrevem nele em blocos
+        with open(temporario, 'wb', buffering=tamanho_buffer) as bruto:
+            binario = gzip.GzipFile(fileobj=bruto, mode='wb', mtime=0) if compactar else bruto
+            with io.TextIOWrapper(binario, encoding='utf-8', newline='') as arquivo:
+                escrever(arquivo, COLUNAS[tipo], contadas())
+        os.replace(temporario, caminho)
+    except BaseException:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+        raise
+
+
+# --- Marcas d'água ---
+
+def _caminho_marcas(caminho):
+    return os.path.join(os.path.dirname(os.path.abspath(caminho)), ARQUIVO_MARCAS)
+
+
+def ler_marcas(caminho_marcas) -> dict:
+    """{tipo: versão} da última exportação incremental de cada tipo."""
+    try:
+        with open(caminho_marcas, encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def _gravar_marcas(caminho_marcas, marcas):
+    temporario = caminho_marcas + '.tmp'
+    with open(temporario, 'w', encoding='utf-8') as f:
+        json.dump(marcas, f)
+    os.replace(temporario, caminho_marcas)
+
+
+# --- Exportação ---
+
+def _exportar(tipo, caminho, linhas_desde, incremental, caminho_marcas, tamanho_buffer):
+    caminho_marcas = caminho_marcas or _caminho_marcas(caminho)
+    marcas = ler_marcas(caminho_marcas) if incremental else {}
+    resultado = ResultadoExportacao(tipo, caminho, marcas.get(tipo))
+    _gravar(caminho, tipo, linhas_desde(resultado.desde), resultado, tamanho_buffer)
+    # A marca só avança depois que o arquivo está completo no lugar
+    if incremental and resultado.versao is not None and resultado.versao != resultado.desde:
+        marcas[tipo] = resultado.versao
+        _gravar_marcas(caminho_marcas, marcas)
+    return resultado
+
+
+def exportar_reservas(caminho, ger_res=None, incremental=False, caminho_marcas=None, tamanho_buffer=TAMANHO_BUFFER):
+    ger_res = ger_res or Gerenciar_Reserva()
+    return _exportar('reservas', caminho, lambda desde: _linhas_reservas(ger_res, desde),
+                     incremental, caminho_marcas, tamanho_buffer)
+
+
+def exportar_incidentes(caminho, ger_res=None, incremental=False, caminho_marcas=None, tamanho_buffer=TAMANHO_BUFFER):
+    ger_res = ger_res or Gerenciar_Reserva()
+    return _exportar('incidentes', caminho, lambda desde: _linhas_incidentes(ger_res, desde),
+                     incremental, caminho_marcas, tamanho_buffer)
+
+
+def exportar_manutencoes(caminho, ger_vei=None, incremental=False, caminho_marcas=None, tamanho_buffer=TAMANHO_BUFFER):
+    ger_vei = ger_vei or GerenciarVeiculo()
+    return _exportar('manutencoes', caminho, lambda desde: _linhas_manutencoes(ger_vei, desde),
+                     incremental, caminho_marcas, tamanho_buffer)
+
+
+if __name__ == '__main__':
+    argumentos = [a for a in sys.argv[1:] if a != '--incremental']
+    if len(argumentos) != 2 or argumentos[0] not in COLUNAS:
+        print("Uso: python exportacao.py reservas|manutencoes|incidentes ARQUIVO.csv|ARQUIVO.jsonl[.gz] [--incremental]")
+        sys.exit(1)
+
+    repositorio = repositorio_do_ambiente()
+    if repositorio is None:
+        print("Aviso: AV_RENTAL_DB/AV_RENTAL_DIARIO não definido; não há dados gravados para exportar.")
+
+    tipo, caminho = argumentos
+    incremental = '--incremental' in sys.argv[1:]
+    try:
+        if tipo == 'manutencoes':
+            ger_vei = GerenciarVeiculo()
+            if repositorio is not None:
+                ger_vei.conectar_repositorio(repositorio)
+            resultado = exportar_manutencoes(caminho, ger_vei, incremental)
+        else:
+            ger_res = Gerenciar_Reserva()
+            if repositorio is not None:
+                ger_res.conectar_repositorio(repositorio)
+            exportar = exportar_reservas if tipo == 'reservas' else exportar_incidentes
+            resultado = exportar(caminho, ger_res, incremental)
+    except DadosInvalidosError as e:
+        print(e)
+        sys.exit(1)
+    finally:
+        if repositorio is not None:
+            repositorio.fechar()
+
+    print(resultado)
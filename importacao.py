@@ -0,0 +1,166 @@
+"""Importação em lote de clientes e veículos a partir de arquivos CSV ou JSONL.
+
+O arquivo é lido linha a linha por geradores (memória constante), cada registro
+passa pelas mesmas validações do cadastro interativo e os aceitos são gravados
+em lotes. Uso (a partir da raiz do projeto):
+
+    python importacao.py clientes clientes.csv
+    python importacao.py veiculos frota.jsonl
+
+Colunas esperadas: clientes -> nome, cpf | veículos -> modelo, placa, ano, valor
+"""
+import csv
+import json
+import sys
+from itertools import islice
+from clientes import GerenciarCliente, ClienteFactory
+from veiculos import GerenciarVeiculo, VeiculoBuilder
+from exceptions import DadosInvalidosError
+from validacoes import validar_nome, validar_cpf, validar_placa, validar_ano, validar_valor
+from persistencia import repositorio_do_ambiente
+
+TAMANHO_LOTE = 1000
+
+
+class ResultadoImportacao:
+    def __init__(self):
+        self.importados = 0
+        self.rejeitados = []  # (número da linha, motivo)
+
+    def rejeitar(self, linha, motivo):
+        self.rejeitados.append((linha, motivo))
+
+    def __str__(self):
+        return f"{self.importados} registro(s) importado(s), {len(self.rejeitados)} rejeitado(s)"
+
+
+def ler_registros(caminho):
+    """Gera (número da linha, dicionário) para cada registro de um arquivo .csv ou .jsonl."""
+    with open(caminho, encoding='utf-8', newline='') as arquivo:
+        if caminho.lower().endswith('.csv'):
+            leitor = csv.DictReader(arquivo)
+            for registro in leitor:
+                yield leitor.line_num, registro
+        else:
+            for numero, texto in enumerate(arquivo, 1):
+                if not texto.strip():
+                    continue
+                try:
+                    yield numero, json.loads(texto)
+                except ValueError:
+                    yield numero, None
+
+
+def _em_lotes(itens, tamanho):
+    iterador = iter(itens)
+    while True:
+        lote = list(islice(iterador, tamanho))
+        if not lote:
+            return
+        yield lote
+
+
+def _campo(registro, nome):
+    valor = registro.get(nome)
+    if valor is None or str(valor).strip() == '':
+        raise DadosInvalidosError(f"Campo obrigatório ausente: '{nome}'.")
+    return str(valor).strip()
+
+
+def _clientes_validos(registros, ger_cli, resultado):
+    fabrica = ClienteFactory()
+    for linha, registro in registros:
+        try:
+            if not isinstance(registro, dict):
+                raise DadosInvalidosError("Registro mal formatado.")
+            nome = validar_nome(_campo(registro, 'nome'))
+            cpf = validar_cpf(_campo(registro, 'cpf'))
+            if ger_cli.existe_cpf(cpf):
+                raise DadosInvalidosError(f"CPF {cpf} já cadastrado.")
+        except DadosInvalidosError as e:
+            resultado.rejeitar(linha, str(e))
+            continue
+        yield linha, fabrica.criar_usuario(nome, cpf)
+
+
+def _veiculos_validos(registros, ger_vei, resultado):
+    for linha, registro in registros:
+        try:
+            if not isinstance(registro, dict):
+                raise DadosInvalidosError("Registro mal formatado.")
+            modelo = _campo(registro, 'modelo').title()
+            placa = validar_placa(_campo(registro, 'placa'))
+            ano = validar_ano(_campo(registro, 'ano'))
+            valor = validar_valor(_campo(registro, 'valor'))
+            if ger_vei.existe_placa(placa):
+                raise DadosInvalidosError(f"Placa {placa} já cadastrada.")
+        except DadosInvalidosError as e:
+            resultado.rejeitar(linha, str(e))
+            continue
+        # Build
+        yield linha, (VeiculoBuilder()
+                      .com_modelo(modelo)
+                      .com_placa(placa)
+                      .com_ano(ano)
+                      .com_valor(valor)
+                      .build())
+
+
+def _gravar_em_lotes(validos, chave, adicionar, resultado, tamanho_lote):
+    # Cada lote é gravado antes de o próximo ser lido; duplicados de lotes anteriores
+    # já são barrados na validação, então só é preciso olhar dentro do lote atual.
+    for lote in _em_lotes(validos, tamanho_lote):
+        novos, vistos = [], set()
+        for linha, objeto in lote:
+            if chave(objeto) in vistos:
+                resultado.rejeitar(linha, f"{chave(objeto)} repetido no arquivo.")
+                continue
+            vistos.add(chave(objeto))
+            novos.append(objeto)
+        resultado.importados += len(adicionar(novos))
+
+
+def importar_clientes(caminho, ger_cli=None, tamanho_lote=TAMANHO_LOTE):
+    ger_cli = ger_cli or GerenciarCliente()
+    resultado = ResultadoImportacao()
+    validos = _clientes_validos(ler_registros(caminho), ger_cli, resultado)
+    _gravar_em_lotes(validos, lambda c: c.cpf, ger_cli.adicionar_clientes, resultado, tamanho_lote)
+    return resultado
+
+
+def importar_veiculos(caminho, ger_vei=None, tamanho_lote=TAMANHO_LOTE):
+    ger_vei = ger_vei or GerenciarVeiculo()
+    resultado = ResultadoImportacao()
+    validos = _veiculos_validos(ler_registros(caminho), ger_vei, resultado)
+    _gravar_em_lotes(validos, lambda v: v.placa, ger_vei.adicionar_veiculos, resultado, tamanho_lote)
+    return resultado
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 3 or sys.argv[1] not in ('clientes', 'veiculos'):
+        print("Uso: python importacao.py clientes|veiculos ARQUIVO.csv|ARQUIVO.jsonl")
+        sys.exit(1)
+
+    repositorio = repositorio_do_ambiente()
+    if repositorio is None:
+        print("Aviso: AV_RENTAL_DB/AV_RENTAL_DIARIO não definido; os dados não serão gravados.")
+
+    tipo, caminho = sys.argv[1], sys.argv[2]
+    try:
+        if tipo == 'clientes':
+            ger_cli = GerenciarCliente()
+            if repositorio is not None:
+                ger_cli.conectar_repositorio(repositorio)
+            resultado = importar_clientes(caminho, ger_cli)
+        else:
+            ger_vei = GerenciarVeiculo()
+            if repositorio is not None:
+                ger_vei.conectar_repositorio(repositorio)
+            resultado = importar_veiculos(caminho, ger_vei)
+    finally:
+        if repositorio is not None:
+            repositorio.fechar()
+
+    print(resultado)
+    for linha, motivo in resultado.rejeitados:
+        print(f"  Linha {linha}: {motivo}")
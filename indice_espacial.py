@@ -0,0 +1,136 @@
+import heapq
+import math
+
+KM_POR_GRAU = 111.195 # comprimento de um grau de latitude
+
+
+class IndiceEspacial:
+    """Grade uniforme sobre posições (lat, lon) para buscas de vizinhos.
+
+    As coordenadas são projetadas em km (equiretangular em torno de uma latitude
+    de referência, precisa na escala de uma cidade) e cada ponto fica numa
+    célula quadrada; mover um ponto só custa algo quando ele troca de célula.
+    """
+
+    def __init__(self, tamanho_celula_km=0.1, lat_referencia=-23.55):
+        self._tamanho = tamanho_celula_km
+        self._escala_lon = KM_POR_GRAU * math.cos(math.radians(lat_referencia))
+        self._celulas = {}  # (cx, cy) -> {chave: (x, y)}
+        self._posicoes = {} # chave -> (x, y, célula)
+
+    def __len__(self):
+        return len(self._posicoes)
+
+    def __contains__(self, chave):
+        return chave in self._posicoes
+
+    def _projetar(self, lat, lon):
+        return lon * self._escala_lon, lat * KM_POR_GRAU
+
+    def _celula(self, x, y):
+        return math.floor(x / self._tamanho), math.floor(y / self._tamanho)
+
+    def atualizar(self, chave, lat, lon):
+        """Insere ou move um ponto."""
+        x, y = self._projetar(lat, lon)
+        celula = self._celula(x, y)
+        anterior = self._posicoes.get(chave)
+        if anterior is not None and anterior[2] != celula:
+            self._retirar_da_celula(chave, anterior[2])
+        self._celulas.setdefault(celula, {})[chave] = (x, y)
+        self._posicoes[chave] = (x, y, celula)
+
+    def remover(self, chave):
+        anterior = self._posicoes.pop(chave, None)
+        if anterior is not None:
+            self._retirar_da_celula(chave, anterior[2])
+
+    def _retirar_da_celula(self, chave, celula):
+        pontos = self._celulas[celula]
+        del pontos[chave]
+        if not pontos:
+            del self._celulas[celula]
+
+    @staticmethod
+    def _anel(cx, cy, r):
+        # Células na borda do quadrado de "raio" r em torno de (cx, cy)
+        if r == 0:
+            yield cx, cy
+            return
+        for dx in range(-r, r + 1):
+            yield cx + dx, cy - r
+            yield cx + dx, cy + r
+        for dy in range(-r + 1, r):
+            yield cx - r, cy + dy
+            yield cx + r, cy + dy
+
+    def proximos(self, lat, lon, k=1):
+        """Os k pontos mais próximos, como [(distância em km, chave)] em ordem crescente."""
+        if k <= 0 or not self._posicoes:
+            return []
+        x, y = self._projetar(lat, lon)
+        cx, cy = self._celula(x, y)
+        melhores = [] # heap de (-distância, chave) com os k melhores até agora
+        celulas_vistas = 0
+        r = 0
+        while True:
+            for celula in self._anel(cx, cy, r):
+                pontos = self._celulas.get(celula)
+                if not pontos:
+                    continue
+                for chave, (px, py) in pontos.items():
+                    d = math.hypot(px - x, py - y)
+                    if len(melhores) < k:
+                        heapq.heappush(melhores, (-d, chave))
+                    elif d < -melhores[0][0]:
+                        heapq.heapreplace(melhores, (-d, chave))
+            # Tudo fora dos anéis já vistos está a pelo menos r células de distância
+            if len(melhores) == k and -melhores[0][0] <= r * self._tamanho:
+                break
+            celulas_vistas += max(1, 8 * r)
+            if celulas_vistas > len(self._celulas):
+                # Consulta longe da frota: percorrer as células ocupadas sai mais barato
+                return self._proximos_por_celula(x, y, k)
+            r += 1
+        return sorted((-d, chave) for d, chave in melhores)
+
+    def _proximos_por_celula(self, x, y, k):
+        # Best-first: células ocupadas em ordem da menor distância possível até a consulta
+        t = self._tamanho
+        fila = [(math.hypot(max(cx * t - x, 0.0, x - (cx + 1) * t),
+                            max(cy * t - y, 0.0, y - (cy + 1) * t)), (cx, cy))
+                for cx, cy in self._celulas]
+        heapq.heapify(fila)
+        melhores = []
+        while fila:
+            distancia_minima, celula = heapq.heappop(fila)
+            if len(melhores) == k and distancia_minima > -melhores[0][0]:
+                break
+            for chave, (px, py) in self._celulas[celula].items():
+                d = math.hypot(px - x, py - y)
+                if len(melhores) < k:
+                    heapq.heappush(melhores, (-d, chave))
+                elif d < -melhores[0][0]:
+                    heapq.heapreplace(melhores, (-d, chave))
+        return sorted((-d, chave) for d, chave in melhores)
+
+    def no_raio(self, lat, lon, raio_km):
+        """Pontos a até raio_km, como [(distância em km, chave)] em ordem crescente."""
+        x, y = self._projetar(lat, lon)
+        cx, cy = self._celula(x, y)
+        alcance = math.ceil(raio_km / self._tamanho)
+        if (2 * alcance + 1) ** 2 <= len(self._celulas):
+            celulas = ((cx + dx, cy + dy) for dx in range(-alcance, alcance + 1)
+                       for dy in range(-alcance, alcance + 1))
+        else:
+            celulas = [c for c in self._celulas
+                       if abs(c[0] - cx) <= alcance and abs(c[1] - cy) <= alcance]
+
+        encontrados = []
+        for celula in celulas:
+            for chave, (px, py) in self._celulas.get(celula, {}).items():
+                d = math.hypot(px - x, py - y)
+                if d <= raio_km:
+                    encontrados.append((d, chave))
+        encontrados.sort()
+        return encontrados
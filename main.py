@@ -1,13 +1,17 @@
 import os
+import atexit
 from datetime import datetime
 from clientes import GerenciarCliente, ClienteFactory, AdminFactory
 from veiculos import GerenciarVeiculo, Veiculo, VeiculoBuilder
 from reserva import Gerenciar_Reserva, Reserva
 from comandos import *
-from exceptions import CpfJaCadastradoError
+from exceptions import CpfJaCadastradoError, DadosInvalidosError
+from persistencia import repositorio_do_ambiente
+from cupons import CUPONS
+from validacoes import validar_data
 
-# "Banco de dados" de Cupons de Desconto VIVE AQUI AGORA
-PROMO_CODES = {
+# Cupons cadastrados na primeira execução (só num repositório novo, ou sem repositório)
+CUPONS_INICIAIS = {
     "BEMVINDO15": ('perc', 0.15),
     "FERIAS50": ('fixo', 50.00)
 }
@@ -16,15 +20,34 @@ ger_cli = GerenciarCliente()
 ger_vei = GerenciarVeiculo()
 ger_res = Gerenciar_Reserva()
 
+# Persistência opcional: com AV_RENTAL_DB=/caminho/locadora.db o estado é
+# gravado em SQLite; com AV_RENTAL_DIARIO=/caminho/pasta, num diário de eventos.
+if ger_cli.repositorio is None:
+    _repositorio = repositorio_do_ambiente()
+    if _repositorio is not None:
+        atexit.register(_repositorio.fechar)
+        ger_cli.conectar_repositorio(_repositorio)
+        ger_vei.conectar_repositorio(_repositorio)
+        ger_res.conectar_repositorio(_repositorio)
+repositorio = ger_cli.repositorio
+
+if repositorio is not None and CUPONS.repositorio is None:
+    CUPONS.conectar_repositorio(repositorio)
+if repositorio is None or repositorio.novo:
+    for codigo, (tipo, valor) in CUPONS_INICIAIS.items():
+        if CUPONS.buscar(codigo) is None:
+            CUPONS.adicionar(codigo, tipo, valor)
+
 # Dados iniciais para teste
-if not any(v.placa == 'ABC1234' for v in ger_vei.veiculos):
+if not ger_vei.existe_placa('ABC1234'):
     v_base1 = VeiculoBuilder().com_modelo('Fiat Mobi').com_placa('ABC1234').com_ano('2022').com_valor(95.50).build()
     v_base2 = VeiculoBuilder().com_modelo('Hyundai HB20').com_placa('DEF5678').com_ano('2023').com_valor(120.00).build()
-    ger_vei.veiculos.extend([v_base1, v_base2])
+    ger_vei.adicionar_veiculo(v_base1)
+    ger_vei.adicionar_veiculo(v_base2)
 
-if not any(c.cpf == '12345678900' for c in ger_cli.clientes):
+if not ger_cli.existe_cpf('12345678900'):
     c_base = ClienteFactory().criar_usuario(nome='Arthur Alves', cpf='12345678900')
-    ger_cli.clientes.append(c_base)
+    ger_cli.adicionar_cliente(c_base)
 
 ADMIN_USER = "admin"
 ADMIN_PASS = "admin"
@@ -54,7 +77,7 @@ def login():
                     continue
 
             elif entrada.isdigit() and len(entrada) == 11:
-                cliente = next((c for c in ger_cli.clientes if c.cpf == entrada), None)
+                cliente = ger_cli.buscar_por_cpf(entrada)
                 if cliente:
                     print(f"Bem-vindo, {cliente.nome}!")
                     input("Pressione Enter para continuar...")
@@ -85,15 +108,14 @@ def gerenciar_ofertas():
     while True:
         os.system('cls' if os.name == 'nt' else 'clear')
         print("\n=== GERENCIADOR DE OFERTAS ESPECIAIS ===")
-        if not PROMO_CODES:
+        cupons = CUPONS.listar() # os vencidos já saem aqui
+        if not cupons:
             print("Nenhum cupom de desconto cadastrado.")
         else:
             print("Cupons ativos:")
-            for codigo, (tipo, valor) in PROMO_CODES.items():
-                if tipo == 'perc':
-                    print(f"- {codigo}: {valor*100:.0f}% de desconto")
-                else:
-                    print(f"- {codigo}: R$ {valor:.2f} de desconto fixo")
+            for cupom in cupons:
+                esgotado = " (ESGOTADO)" if cupom.esgotado() else ""
+                print(f"- {cupom.codigo}: {cupom.descricao()}{esgotado}")
         
         print("\n1 - Adicionar Novo Cupom")
         print("2 - Remover Cupom")
@@ -102,7 +124,7 @@ def gerenciar_ofertas():
 
         if opcao == '1':
             codigo = input("Digite o código do novo cupom (ex: PROMO20): ").upper()
-            if codigo in PROMO_CODES:
+            if CUPONS.buscar(codigo) is not None:
                 print("Este código já existe.")
             else:
                 tipo = input("O desconto é percentual ('perc') ou fixo ('fixo')? ").lower()
@@ -110,16 +132,20 @@ def gerenciar_ofertas():
                     try:
                         valor_str = input("Digite o valor do desconto (ex: 0.2 para 20% ou 100 para R$100): ")
                         valor = float(valor_str)
-                        PROMO_CODES[codigo] = (tipo, valor)
+                        validade = input("Válido até (dd/mm/aaaa, deixe em branco para não expirar): ").strip()
+                        expira_em = CUPONS.validade_ate(validar_data(validade)) if validade else None
+                        limite = input("Limite de usos (deixe em branco para ilimitado): ").strip()
+                        CUPONS.adicionar(codigo, tipo, valor, expira_em, int(limite) if limite else None)
                         print("Cupom adicionado com sucesso!")
                     except ValueError:
                         print("Valor inválido.")
+                    except DadosInvalidosError as e:
+                        print(e)
                 else:
                     print("Tipo de desconto inválido. Use 'perc' ou 'fixo'.")
         elif opcao == '2':
             codigo = input("Digite o código do cupom a ser removido: ").upper()
-            if codigo in PROMO_CODES:
-                del PROMO_CODES[codigo]
+            if CUPONS.remover(codigo):
                 print("Cupom removido com sucesso!")
             else:
                 print("Cupom não encontrado.")
@@ -208,5 +234,17 @@ def menu():
                 print("Opção inválida.")
             
             input("\nPressione Enter para continuar...")
+
+
+def usar_despacho():
+    # E-mail e SMS saem em segundo plano: a reserva não espera pelos provedores.
+    # Na frente do despacho, as mensagens de um mesmo cliente viram um resumo e a
+    # vazão de cada canal fica dentro do limite do provedor. Chamado ao iniciar o
+    # menu ou o servidor: só importar este módulo não cria threads de envio.
+    ger_res.usar_despacho_assincrono()
+    ger_res.usar_envio_agrupado(janela=2.0, taxa=5.0, rajada=10)
+
+
 if __name__ == "__main__":
+    usar_despacho()
     menu()
\ No newline at end of file
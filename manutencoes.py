@@ -0,0 +1,198 @@
+"""Registros de manutenção tipados e o índice de manutenções da frota.
+
+Cada registro guarda a data já convertida (datetime.date), então consultas por
+período não reinterpretam texto. O IndiceManutencoes mantém, a cada registro:
+
+- todas as manutenções da frota em ordem de data (listas paralelas + bisect);
+- o custo acumulado por mês e por veículo, de modo que o custo de um período
+  soma os meses inteiros e só percorre os registros dos meses das pontas;
+- a data da última manutenção de cada veículo, ordenada, para achar os
+  veículos com revisão atrasada com uma busca binária.
+"""
+from bisect import bisect_left, bisect_right, insort
+from datetime import date, datetime, timedelta
+from itertools import count
+from exceptions import DadosInvalidosError
+from validacoes import validar_data
+
+INTERVALO_REVISAO_DIAS = 180
+
+
+class RegistroManutencao:
+    __slots__ = ('data', 'descricao', 'custo', 'versao')
+
+    def __init__(self, data, descricao, custo, versao=0):
+        self.data = data # datetime.date
+        self.descricao = descricao
+        self.custo = float(custo)
+        self.versao = versao # atribuída pelo gerenciador ao registrar (ver versoes.py)
+
+    @classmethod
+    def criar(cls, descricao, data, custo):
+        """Valida e converte: 'data' pode ser um date/datetime ou texto dd/mm/aaaa."""
+        if isinstance(data, datetime):
+            data = data.date()
+        elif not isinstance(data, date):
+            data = validar_data(data).date()
+        try:
+            custo = float(custo)
+        except (TypeError, ValueError):
+            raise DadosInvalidosError("O custo deve ser um número.")
+        if custo < 0:
+            raise DadosInvalidosError("O custo não pode ser negativo.")
+        return cls(data, descricao, custo)
+
+    @property
+    def data_formatada(self) -> str:
+        return self.data.strftime("%d/%m/%Y")
+
+    def como_dict(self) -> dict:
+        return {'descricao': self.descricao, 'data': self.data_formatada, 'custo': self.custo}
+
+    def __repr__(self):
+        return f"RegistroManutencao({self.data_formatada}, {self.descricao!r}, {self.custo:.2f})"
+
+
+def _inicio_do_mes(dia):
+    return dia.replace(day=1)
+
+
+def _proximo_mes(dia):
+    return date(dia.year + 1, 1, 1) if dia.month == 12 else date(dia.year, dia.month + 1, 1)
+
+
+def ultimo_trimestre(hoje=None):
+    """[início, fim) do trimestre civil anterior ao de 'hoje'."""
+    hoje = hoje or date.today()
+    inicio_atual = date(hoje.year, 3 * ((hoje.month - 1) // 3) + 1, 1)
+    mes, ano = inicio_atual.month - 3, inicio_atual.year
+    if mes < 1:
+        mes, ano = mes + 12, ano - 1
+    return date(ano, mes, 1), inicio_atual
+
+
+def limite_revisao(dias=INTERVALO_REVISAO_DIAS, hoje=None):
+    """Data antes da qual a última manutenção conta como atrasada."""
+    return (hoje or date.today()) - timedelta(days=dias)
+
+
+class IndiceManutencoes:
+    def __init__(self):
+        self._chaves = []   # (data, sequência) em ordem; a sequência desempata registros do mesmo dia
+        self._entradas = [] # (placa, RegistroManutencao), paralela a _chaves
+        self._sequencia = count()
+        self._chaves_por_veiculo = {} # placa -> [chave, ...]
+        self._custo_por_mes = {}      # date (dia 1) -> custo
+        self._por_veiculo = {}        # placa -> [quantidade, custo]
+        self._ultima = {}             # placa -> data da manutenção mais recente
+        self._ultimas = []            # (data, placa) ordenadas
+        self._sem_registro = set()    # placas da frota sem nenhuma manutenção
+        self.custo_total = 0.0
+
+    def __len__(self):
+        return len(self._chaves)
+
+    # --- Atualização ---
+
+    def adicionar_veiculo(self, placa, registros=()):
+        if placa not in self._ultima:
+            self._sem_registro.add(placa)
+        for registro in registros:
+            self.incluir(placa, registro)
+
+    def incluir(self, placa, registro):
+        chave = (registro.data, next(self._sequencia))
+        i = bisect_right(self._chaves, chave)
+        self._chaves.insert(i, chave)
+        self._entradas.insert(i, (placa, registro))
+        self._chaves_por_veiculo.setdefault(placa, []).append(chave)
+
+        mes = _inicio_do_mes(registro.data)
+        self._custo_por_mes[mes] = self._custo_por_mes.get(mes, 0.0) + registro.custo
+        totais = self._por_veiculo.setdefault(placa, [0, 0.0])
+        totais[0] += 1
+        totais[1] += registro.custo
+        self.custo_total += registro.custo
+
+        self._sem_registro.discard(placa)
+        ultima = self._ultima.get(placa)
+        if ultima is None or registro.data > ultima:
+            if ultima is not None:
+                del self._ultimas[bisect_left(self._ultimas, (ultima, placa))]
+            insort(self._ultimas, (registro.data, placa))
+            self._ultima[placa] = registro.data
+
+    def remover_veiculo(self, placa):
+        """Tira o veículo e todo o histórico dele (como o ON DELETE CASCADE do repositório)."""
+        self._sem_registro.discard(placa)
+        for chave in self._chaves_por_veiculo.pop(placa, ()):
+            i = bisect_left(self._chaves, chave)
+            _, registro = self._entradas[i]
+            del self._chaves[i], self._entradas[i]
+            mes = _inicio_do_mes(registro.data)
+            self._custo_por_mes[mes] -= registro.custo
+            self.custo_total -= registro.custo
+        self._por_veiculo.pop(placa, None)
+        ultima = self._ultima.pop(placa, None)
+        if ultima is not None:
+            del self._ultimas[bisect_left(self._ultimas, (ultima, placa))]
+
+    # --- Consultas ---
+
+    def _fatia(self, inicio, fim):
+        # Posições dos registros com data em [inicio, fim)
+        i = 0 if inicio is None else bisect_left(self._chaves, (inicio,))
+        j = len(self._chaves) if fim is None else bisect_left(self._chaves, (fim,))
+        return i, j
+
+    def _somar_registros(self, inicio, fim):
+        i, j = self._fatia(inicio, fim)
+        return sum(registro.custo for _, registro in self._entradas[i:j])
+
+    def custo_periodo(self, inicio, fim) -> float:
+        """Custo das manutenções com data em [inicio, fim)."""
+        if not inicio < fim:
+            raise DadosInvalidosError("O fim do período deve ser depois do início.")
+        total, cursor = 0.0, inicio
+        if cursor.day != 1: # mês da ponta inicial: só os registros a partir de 'inicio'
+            corte = min(_proximo_mes(cursor), fim)
+            total += self._somar_registros(cursor, corte)
+            cursor = corte
+        while cursor < fim and _proximo_mes(cursor) <= fim: # meses inteiros: um acesso ao acumulado
+            total += self._custo_por_mes.get(cursor, 0.0)
+            cursor = _proximo_mes(cursor)
+        if cursor < fim:
+            total += self._somar_registros(cursor, fim)
+        return total
+
+    def custo_veiculo(self, placa) -> dict:
+        quantidade, custo = self._por_veiculo.get(placa, (0, 0.0))
+        return {'quantidade': quantidade, 'custo': custo, 'ultima': self._ultima.get(placa)}
+
+    def registros(self, inicio=None, fim=None, decrescente=False):
+        """Gerador de (placa, registro) com data em [inicio, fim), em ordem de data."""
+        i, j = self._fatia(inicio, fim)
+        posicoes = range(j - 1, i - 1, -1) if decrescente else range(i, j)
+        entradas = self._entradas
+        for k in posicoes:
+            yield entradas[k]
+
+    def pagina(self, limite, depois_de=None, decrescente=True):
+        """Até 'limite' entradas depois do cursor; devolve (entradas, cursor da próxima ou None)."""
+        if decrescente:
+            j = len(self._chaves) if depois_de is None else bisect_left(self._chaves, depois_de)
+            i = max(j - limite, 0)
+            entradas = self._entradas[i:j][::-1]
+            proximo = self._chaves[i] if i > 0 else None
+        else:
+            i = 0 if depois_de is None else bisect_right(self._chaves, depois_de)
+            j = min(i + limite, len(self._chaves))
+            entradas = self._entradas[i:j]
+            proximo = self._chaves[j - 1] if j < len(self._chaves) else None
+        return entradas, proximo
+
+    def em_atraso(self, limite) -> list:
+        """Placas sem manutenção desde antes de 'limite' (as mais atrasadas primeiro) e as que nunca tiveram."""
+        atrasadas = [placa for _, placa in self._ultimas[:bisect_left(self._ultimas, (limite,))]]
+        return sorted(self._sem_registro) + atrasadas
+
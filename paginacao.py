@@ -0,0 +1,105 @@
+"""Consultas paginadas sobre os índices dos gerenciadores.
+
+Os gerenciadores mantêm listas já ordenadas das chaves (clientes por nome ou
+CPF, reservas por id), e percorrer() anda por elas a partir de um cursor (a
+chave do último item já entregue) com bisect, um bloco por vez: a memória
+usada é a de um bloco, não a do histórico inteiro, e o cursor continua
+válido mesmo que itens sejam incluídos ou removidos entre uma página e
+outra. Nas ordens sem lista própria, selecionar() escolhe a página com
+heapq.nsmallest. As listagens interativas pedem a próxima página só quando
+o usuário quer ver mais.
+"""
+import heapq
+from bisect import bisect_left, bisect_right
+from exceptions import DadosInvalidosError
+
+TAMANHO_PAGINA = 10
+TAMANHO_BLOCO = 256 # itens copiados por vez sob a trava em percorrer()
+
+
+class Pagina:
+    __slots__ = ('itens', 'cursor')
+
+    def __init__(self, itens, cursor):
+        self.itens = itens
+        self.cursor = cursor # passe como 'depois_de' para obter a próxima página; None na última
+
+    @classmethod
+    def de(cls, itens, limite, chave):
+        """Página a partir de até limite+1 itens: o item a mais só indica que há continuação."""
+        if len(itens) > limite:
+            del itens[limite:]
+            return cls(itens, chave(itens[-1]))
+        return cls(itens, None)
+
+    def __iter__(self):
+        return iter(self.itens)
+
+    def __len__(self):
+        return len(self.itens)
+
+
+def chave_de_ordenacao(ordenacoes, ordenar_por):
+    try:
+        return ordenacoes[ordenar_por]
+    except KeyError:
+        raise DadosInvalidosError(f"Ordenação inválida: '{ordenar_por}' (use {', '.join(ordenacoes)}).")
+
+
+def validar_limite(limite):
+    if limite is not None and limite < 1:
+        raise DadosInvalidosError("O limite deve ser de pelo menos 1.")
+
+
+def selecionar(itens, chave, filtro=None, depois_de=None, limite=None, decrescente=False) -> list:
+    """Os itens que passam no filtro, em ordem de 'chave', a partir do cursor 'depois_de' (exclusive)."""
+    validar_limite(limite)
+    candidatos = itens if filtro is None else filter(filtro, itens)
+    if depois_de is not None:
+        if decrescente:
+            candidatos = (item for item in candidatos if chave(item) < depois_de)
+        else:
+            candidatos = (item for item in candidatos if chave(item) > depois_de)
+    if limite is None:
+        return sorted(candidatos, key=chave, reverse=decrescente)
+    # O(n log limite) e só 'limite' itens guardados, em vez de ordenar tudo
+    escolher = heapq.nlargest if decrescente else heapq.nsmallest
+    return escolher(limite, candidatos, key=chave)
+
+
+def percorrer(ordenados, trava, valor=None, depois_de=None, decrescente=False, tamanho=TAMANHO_BLOCO):
+    """Gera os itens da lista ordenada 'ordenados' a partir do cursor 'depois_de' (exclusive), em blocos.
+
+    A trava só é mantida enquanto um bloco é copiado (e convertido por 'valor', se dado): a lista
+    pode mudar entre um bloco e outro, e o seguinte recomeça da última chave entregue, por bisect.
+    """
+    while True:
+        with trava:
+            if decrescente:
+                j = len(ordenados) if depois_de is None else bisect_left(ordenados, depois_de)
+                chaves = ordenados[max(j - tamanho, 0):j][::-1]
+            else:
+                i = 0 if depois_de is None else bisect_right(ordenados, depois_de)
+                chaves = ordenados[i:i + tamanho]
+            itens = chaves if valor is None else [valor(chave) for chave in chaves]
+        if not chaves:
+            return
+        yield from itens
+        depois_de = chaves[-1]
+
+
+def exibir_paginado(buscar_pagina, formatar, vazio="Nenhum registro encontrado.",
+                    pergunta="[Enter] mais resultados | [S] sair: ") -> int:
+    """Imprime página por página; buscar_pagina(cursor) devolve uma Pagina. Devolve quantos itens foram exibidos."""
+    cursor, exibidos = None, 0
+    while True:
+        pagina = buscar_pagina(cursor)
+        for item in pagina:
+            exibidos += 1
+            print(formatar(exibidos, item))
+        if pagina.cursor is None or input(pergunta).strip().lower() == 's':
+            break
+        cursor = pagina.cursor
+    if not exibidos:
+        print(vazio)
+    return exibidos
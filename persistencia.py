@@ -0,0 +1,442 @@
+import os
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from datetime import date, datetime
+from clientes import ClienteFactory
+from veiculos import VeiculoBuilder, NAO_CARREGADO
+from reserva import Reserva
+from cupons import Cupom
+from manutencoes import RegistroManutencao
+from paginacao import TAMANHO_BLOCO
+
+# Repository: interface usada pelos gerenciadores para persistir o estado.
+# Os gerenciadores continuam mantendo seus índices em memória; o repositório
+# só recebe as escritas e fornece os dados sob demanda (leitura preguiçosa).
+class IRepositorio(ABC):
+    # True quando o repositório foi criado nesta abertura (nada gravado antes): só então
+    # entram os dados iniciais, que não voltam se o operador os apagar depois
+    novo = False
+
+    @abstractmethod
+    def transacao(self):
+        pass
+
+    # --- Clientes ---
+    @abstractmethod
+    def salvar_cliente(self, cliente):
+        pass
+    @abstractmethod
+    def remover_cliente(self, cpf):
+        pass
+    @abstractmethod
+    def buscar_cliente(self, cpf):
+        pass
+    @abstractmethod
+    def buscar_clientes_por_nome(self, nome):
+        pass
+    @abstractmethod
+    def carregar_clientes(self):
+        pass
+
+    # --- Veículos ---
+    @abstractmethod
+    def salvar_veiculo(self, veiculo):
+        pass
+    @abstractmethod
+    def remover_veiculo(self, placa):
+        pass
+    @abstractmethod
+    def carregar_veiculos(self):
+        pass
+    @abstractmethod
+    def salvar_manutencao(self, veiculo, registro):
+        pass
+    @abstractmethod
+    def carregar_manutencoes(self, placa):
+        pass
+    @abstractmethod
+    def carregar_todas_manutencoes(self):
+        """(placa, RegistroManutencao) de toda a frota, na ordem em que foram registradas."""
+        pass
+    @abstractmethod
+    def carregar_manutencoes_alteradas(self, desde=None):
+        """Gerador de (placa, RegistroManutencao) com versão maior que 'desde', em ordem de (versão, placa)."""
+        pass
+
+    # --- Reservas ---
+    @abstractmethod
+    def salvar_reserva(self, reserva, evento):
+        pass
+    @abstractmethod
+    def remover_reserva(self, reserva):
+        pass
+    @abstractmethod
+    def salvar_incidente(self, reserva, incidente):
+        pass
+    @abstractmethod
+    def carregar_reservas(self, cpf=None, placa=None, finalizadas=None):
+        pass
+    @abstractmethod
+    def carregar_reservas_alteradas(self, desde=None):
+        """Gerador das reservas com versão maior que 'desde', em ordem de (versão, id), sem ler todas de uma vez."""
+        pass
+    @abstractmethod
+    def proximo_id_reserva(self):
+        pass
+    @abstractmethod
+    def resumir_reservas_finalizadas(self) -> dict:
+        """{'quantidade', 'valor' (diárias + caução), 'caucao', 'retidas', 'caucao_retida'} das finalizadas."""
+        pass
+
+    # --- Cupons ---
+    @abstractmethod
+    def salvar_cupom(self, cupom):
+        pass
+    @abstractmethod
+    def remover_cupom(self, codigo):
+        pass
+    @abstractmethod
+    def registrar_uso_cupom(self, codigo, delta):
+        # Incremento (não valor absoluto): resgates simultâneos não se sobrescrevem
+        pass
+    @abstractmethod
+    def carregar_cupons(self):
+        pass
+
+    @abstractmethod
+    def fechar(self):
+        pass
+
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS clientes (
+    cpf  TEXT PRIMARY KEY,
+    nome TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_clientes_nome ON clientes (nome COLLATE NOCASE);
+
+CREATE TABLE IF NOT EXISTS veiculos (
+    placa      TEXT PRIMARY KEY,
+    modelo     TEXT NOT NULL,
+    ano        TEXT NOT NULL,
+    valor      REAL NOT NULL,
+    disponivel INTEGER NOT NULL DEFAULT 1
+);
+
+CREATE TABLE IF NOT EXISTS manutencoes (
+    id        INTEGER PRIMARY KEY,
+    placa     TEXT NOT NULL REFERENCES veiculos (placa) ON DELETE CASCADE,
+    descricao TEXT NOT NULL,
+    data      TEXT NOT NULL,
+    custo     REAL NOT NULL,
+    versao    INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_manutencoes_placa ON manutencoes (placa);
+CREATE INDEX IF NOT EXISTS idx_manutencoes_versao ON manutencoes (versao, placa);
+
+CREATE TABLE IF NOT EXISTS reservas (
+    id         INTEGER PRIMARY KEY,
+    cpf        TEXT NOT NULL,
+    placa      TEXT NOT NULL,
+    modelo     TEXT NOT NULL,
+    inicio     TEXT NOT NULL,
+    dias       INTEGER NOT NULL,
+    total      REAL NOT NULL,
+    deposito   REAL NOT NULL,
+    pago       INTEGER NOT NULL DEFAULT 0,
+    finalizada INTEGER NOT NULL DEFAULT 0,
+    caucao_retido INTEGER NOT NULL DEFAULT 0,
+    avaliacao  INTEGER,
+    comentario TEXT,
+    desconto_cupom     REAL NOT NULL DEFAULT 0,
+    desconto_pagamento REAL NOT NULL DEFAULT 0,
+    versao     INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_reservas_cpf ON reservas (cpf);
+CREATE INDEX IF NOT EXISTS idx_reservas_placa ON reservas (placa);
+CREATE INDEX IF NOT EXISTS idx_reservas_estado ON reservas (finalizada, pago);
+CREATE INDEX IF NOT EXISTS idx_reservas_versao ON reservas (versao);
+
+CREATE TABLE IF NOT EXISTS incidentes (
+    id         INTEGER PRIMARY KEY,
+    reserva_id INTEGER NOT NULL REFERENCES reservas (id) ON DELETE CASCADE,
+    data       TEXT NOT NULL,
+    descricao  TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_incidentes_reserva ON incidentes (reserva_id);
+
+CREATE TABLE IF NOT EXISTS cupons (
+    codigo      TEXT PRIMARY KEY,
+    tipo        TEXT NOT NULL CHECK (tipo IN ('perc', 'fixo')),
+    valor       REAL NOT NULL,
+    expira_em   REAL,
+    limite_usos INTEGER,
+    usos        INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+
+
+def _registro_manutencao(descricao, data, custo, versao):
+    # Os dois repositórios guardam a data como texto dd/mm/aaaa
+    return RegistroManutencao(datetime.strptime(data, "%d/%m/%Y").date(), descricao, custo, versao)
+
+
+_COLUNAS_RESERVA = ("id, cpf, placa, modelo, inicio, dias, total, deposito, pago, finalizada, caucao_retido, "
+                    "avaliacao, comentario, desconto_cupom, desconto_pagamento, versao")
+
+
+class RepositorioSQLite(IRepositorio):
+    def __init__(self, caminho=':memory:'):
+        # Uma conexão compartilhada pelas threads: a trava (reentrante) cobre cada
+        # transação inteira e também cada leitura (ver _consultar).
+        self._conexao = sqlite3.connect(caminho, check_same_thread=False)
+        self._trava = threading.RLock()
+        self._conexao.execute("PRAGMA foreign_keys = ON")
+        self._conexao.execute("PRAGMA journal_mode = WAL")
+        self._conexao.execute("PRAGMA synchronous = NORMAL")
+        self.novo = self._conexao.execute(
+            "SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name = 'clientes'").fetchone()[0] == 0
+        self._conexao.executescript(ESQUEMA)
+        self._profundidade = 0
+
+    # Transações aninhadas: só o bloco mais externo faz o COMMIT, então uma
+    # operação (ou uma carga em lote) grava todas as suas linhas de uma vez.
+    @contextmanager
+    def transacao(self):
+        with self._trava:
+            self._profundidade += 1
+            try:
+                yield self
+            except BaseException:
+                self._profundidade -= 1
+                if self._profundidade == 0:
+                    self._conexao.rollback()
+                raise
+            self._profundidade -= 1
+            if self._profundidade == 0:
+                self._conexao.commit()
+
+    def _executar(self, sql, parametros=()):
+        with self.transacao():
+            self._conexao.execute(sql, parametros)
+
+    def _consultar(self, sql, parametros=()):
+        # Leituras também passam pela trava: o objeto de conexão não aceita cursores de
+        # threads diferentes ao mesmo tempo, e sem ela uma leitura enxergaria a transação
+        # de outra thread pela metade. As linhas saem todas antes de soltar a trava.
+        with self._trava:
+            return self._conexao.execute(sql, parametros).fetchall()
+
+    # --- Clientes ---
+
+    def salvar_cliente(self, cliente):
+        self._executar("INSERT OR REPLACE INTO clientes (cpf, nome) VALUES (?, ?)",
+                       (cliente.cpf, cliente.nome))
+
+    def remover_cliente(self, cpf):
+        self._executar("DELETE FROM clientes WHERE cpf = ?", (cpf,))
+
+    def buscar_cliente(self, cpf):
+        linhas = self._consultar("SELECT nome, cpf FROM clientes WHERE cpf = ?", (cpf,))
+        return ClienteFactory().criar_usuario(*linhas[0]) if linhas else None
+
+    def buscar_clientes_por_nome(self, nome):
+        fabrica = ClienteFactory()
+        linhas = self._consultar(
+            "SELECT nome, cpf FROM clientes WHERE nome = ? COLLATE NOCASE ORDER BY rowid", (nome,))
+        for linha in linhas:
+            yield fabrica.criar_usuario(*linha)
+
+    def carregar_clientes(self):
+        fabrica = ClienteFactory()
+        for linha in self._consultar("SELECT nome, cpf FROM clientes ORDER BY rowid"):
+            yield fabrica.criar_usuario(*linha)
+
+    # --- Veículos ---
+
+    def salvar_veiculo(self, veiculo):
+        self._executar(
+            "INSERT INTO veiculos (placa, modelo, ano, valor, disponivel) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT (placa) DO UPDATE SET modelo = excluded.modelo, ano = excluded.ano, "
+            "valor = excluded.valor, disponivel = excluded.disponivel",
+            (veiculo.placa, veiculo.modelo, str(veiculo.ano), veiculo.valor, int(veiculo.disponivel)))
+
+    def remover_veiculo(self, placa):
+        self._executar("DELETE FROM veiculos WHERE placa = ?", (placa,))
+
+    def carregar_veiculos(self):
+        linhas = self._consultar("SELECT modelo, placa, ano, valor, disponivel FROM veiculos ORDER BY rowid")
+        for modelo, placa, ano, valor, disponivel in linhas:
+            veiculo = (VeiculoBuilder()
+                       .com_modelo(modelo)
+                       .com_placa(placa)
+                       .com_ano(ano)
+                       .com_valor(valor)
+                       .build())
+            veiculo._disponivel = bool(disponivel)
+            veiculo._manutencao = NAO_CARREGADO # histórico carregado só quando for consultado
+            yield veiculo
+
+    def salvar_manutencao(self, veiculo, registro):
+        self._executar("INSERT INTO manutencoes (placa, descricao, data, custo, versao) VALUES (?, ?, ?, ?, ?)",
+                       (veiculo.placa, registro.descricao, registro.data_formatada, registro.custo, registro.versao))
+
+    def carregar_manutencoes(self, placa):
+        linhas = self._consultar(
+            "SELECT descricao, data, custo, versao FROM manutencoes WHERE placa = ? ORDER BY id", (placa,))
+        return [_registro_manutencao(*linha) for linha in linhas]
+
+    def carregar_todas_manutencoes(self):
+        linhas = self._consultar("SELECT placa, descricao, data, custo, versao FROM manutencoes ORDER BY id")
+        for placa, *linha in linhas:
+            yield placa, _registro_manutencao(*linha)
+
+    def carregar_manutencoes_alteradas(self, desde=None):
+        # Em blocos, pelo índice de versões: cada consulta recomeça da última linha entregue
+        condicao, parametros = "versao > ?", (-1 if desde is None else desde,)
+        while True:
+            linhas = self._consultar(
+                f"SELECT id, placa, descricao, data, custo, versao FROM manutencoes "
+                f"WHERE {condicao} ORDER BY versao, placa, id LIMIT ?", (*parametros, TAMANHO_BLOCO))
+            for id_registro, placa, *linha in linhas:
+                yield placa, _registro_manutencao(*linha)
+            if len(linhas) < TAMANHO_BLOCO:
+                return
+            id_registro, placa, *_, versao = linhas[-1]
+            condicao, parametros = "(versao, placa, id) > (?, ?, ?)", (versao, placa, id_registro)
+
+    # --- Reservas ---
+
+    def salvar_reserva(self, reserva, evento):
+        self._executar(
+            f"INSERT INTO reservas ({_COLUNAS_RESERVA}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (id) DO UPDATE SET inicio = excluded.inicio, dias = excluded.dias, total = excluded.total, "
+            "deposito = excluded.deposito, pago = excluded.pago, finalizada = excluded.finalizada, "
+            "caucao_retido = excluded.caucao_retido, avaliacao = excluded.avaliacao, comentario = excluded.comentario, "
+            "desconto_cupom = excluded.desconto_cupom, desconto_pagamento = excluded.desconto_pagamento, "
+            "versao = excluded.versao",
+            (reserva.id, reserva.cpf, reserva.placa, reserva.modelo,
+             reserva.inicio.isoformat(), reserva.dias, reserva.total,
+             reserva.deposito, int(reserva.pago), int(reserva.finalizada), int(reserva.caucao_retido),
+             reserva._avaliacao, reserva._comentario, reserva.desconto_cupom, reserva.desconto_pagamento,
+             reserva.versao))
+
+    def remover_reserva(self, reserva):
+        self._executar("DELETE FROM reservas WHERE id = ?", (reserva.id,))
+
+    def salvar_incidente(self, reserva, incidente):
+        with self.transacao():
+            self._conexao.execute("INSERT INTO incidentes (reserva_id, data, descricao) VALUES (?, ?, ?)",
+                                  (reserva.id, incidente['data'], incidente['descricao']))
+            self._conexao.execute("UPDATE reservas SET versao = ? WHERE id = ?", (reserva.versao, reserva.id))
+
+    def carregar_reservas(self, cpf=None, placa=None, finalizadas=None):
+        condicoes, parametros = [], []
+        if cpf is not None:
+            condicoes.append("cpf = ?")
+            parametros.append(cpf)
+        if placa is not None:
+            condicoes.append("placa = ?")
+            parametros.append(placa)
+        if finalizadas is not None:
+            condicoes.append("finalizada = ?")
+            parametros.append(int(finalizadas))
+        where = f"WHERE {' AND '.join(condicoes)}" if condicoes else ""
+        yield from self._reservas_com_incidentes(f"SELECT id FROM reservas {where}", parametros,
+                                                 f"SELECT {_COLUNAS_RESERVA} FROM reservas {where} ORDER BY id")
+
+    def carregar_reservas_alteradas(self, desde=None):
+        # Em blocos, pelo índice de versões: cada consulta recomeça da última reserva entregue
+        condicao, parametros = "versao > ?", (-1 if desde is None else desde,)
+        while True:
+            pagina = f"WHERE {condicao} ORDER BY versao, id LIMIT ?"
+            reservas = list(self._reservas_com_incidentes(
+                f"SELECT id FROM reservas {pagina}", (*parametros, TAMANHO_BLOCO),
+                f"SELECT {_COLUNAS_RESERVA} FROM reservas {pagina}"))
+            yield from reservas
+            if len(reservas) < TAMANHO_BLOCO:
+                return
+            condicao, parametros = "(versao, id) > (?, ?)", (reservas[-1].versao, reservas[-1].id)
+
+    def _reservas_com_incidentes(self, sql_ids, parametros, sql_reservas):
+        # As duas consultas sob a mesma trava: incidentes e reservas do mesmo instante
+        with self._trava:
+            linhas_incidentes = self._consultar(
+                f"SELECT reserva_id, data, descricao FROM incidentes "
+                f"WHERE reserva_id IN ({sql_ids}) ORDER BY id", parametros)
+            linhas = self._consultar(sql_reservas, parametros)
+        incidentes = {}
+        for reserva_id, data, descricao in linhas_incidentes:
+            incidentes.setdefault(reserva_id, []).append({'data': data, 'descricao': descricao})
+        for linha in linhas:
+            yield self._reserva_de_linha(linha, incidentes.get(linha[0]))
+
+    @staticmethod
+    def _reserva_de_linha(linha, incidentes):
+        (id_reserva, cpf, placa, modelo, inicio, dias, total, deposito,
+         pago, finalizada, caucao_retido, avaliacao, comentario, desconto_cupom, desconto_pagamento, versao) = linha
+        reserva = Reserva()
+        reserva._id = id_reserva
+        reserva._cpf = cpf
+        reserva._placa = placa
+        reserva._modelo = modelo
+        reserva._inicio = date.fromisoformat(inicio)
+        reserva._dias = dias
+        reserva._total = total
+        reserva._deposito = deposito
+        reserva._pago = bool(pago)
+        reserva._finalizada = bool(finalizada)
+        reserva._caucao_retido = bool(caucao_retido)
+        reserva._avaliacao = avaliacao
+        reserva._comentario = comentario
+        reserva._desconto_cupom = desconto_cupom
+        reserva._desconto_pagamento = desconto_pagamento
+        reserva._versao = versao
+        reserva._incidentes = incidentes
+        return reserva
+
+    def proximo_id_reserva(self):
+        return self._consultar("SELECT COALESCE(MAX(id), 0) + 1 FROM reservas")[0][0]
+
+    def resumir_reservas_finalizadas(self):
+        linha, = self._consultar(
+            "SELECT COUNT(*), COALESCE(SUM(total + deposito), 0), COALESCE(SUM(deposito), 0), "
+            "COALESCE(SUM(caucao_retido), 0), COALESCE(SUM(CASE WHEN caucao_retido THEN deposito ELSE 0 END), 0) "
+            "FROM reservas WHERE finalizada = 1")
+        return dict(zip(('quantidade', 'valor', 'caucao', 'retidas', 'caucao_retida'), linha))
+
+    # --- Cupons ---
+
+    def salvar_cupom(self, cupom):
+        self._executar(
+            "INSERT OR REPLACE INTO cupons (codigo, tipo, valor, expira_em, limite_usos, usos) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (cupom.codigo, cupom.tipo, cupom.valor, cupom.expira_em, cupom.limite_usos, cupom.usos))
+
+    def remover_cupom(self, codigo):
+        self._executar("DELETE FROM cupons WHERE codigo = ?", (codigo,))
+
+    def registrar_uso_cupom(self, codigo, delta):
+        self._executar("UPDATE cupons SET usos = MAX(usos + ?, 0) WHERE codigo = ?", (delta, codigo))
+
+    def carregar_cupons(self):
+        linhas = self._consultar("SELECT codigo, tipo, valor, expira_em, limite_usos, usos FROM cupons ORDER BY rowid")
+        return [Cupom(*linha) for linha in linhas]
+
+    def fechar(self):
+        with self._trava:
+            self._conexao.commit()
+            self._conexao.close()
+
+
+def repositorio_do_ambiente():
+    """Abre o repositório configurado por AV_RENTAL_DB (SQLite) ou AV_RENTAL_DIARIO (diário); None se nenhum."""
+    if os.environ.get('AV_RENTAL_DB'):
+        return RepositorioSQLite(os.environ['AV_RENTAL_DB'])
+    if os.environ.get('AV_RENTAL_DIARIO'):
+        from diario import RepositorioDiario
+        return RepositorioDiario(os.environ['AV_RENTAL_DIARIO'])
+    return None
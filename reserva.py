@@ -1,50 +1,87 @@
 import os
-from datetime import datetime, timedelta
-from clientes import Singleton
+import heapq
+from bisect import bisect_left, insort
+from itertools import islice
+from datetime import date, datetime, timedelta
+import threading
+from clientes import Singleton, Persistente, TravasPorChave
+from calendario import AgendaFrota
+from paginacao import (TAMANHO_PAGINA, Pagina, chave_de_ordenacao, exibir_paginado, selecionar, percorrer,
+                       validar_limite)
+from cotacao import MOTOR_COTACAO, VALOR_CAUCAO
+from cupons import CUPONS, CatalogoCupons
+from versoes import VERSOES, depois_da_versao
+from validacoes import validar_nota
 from abc import ABC, abstractclassmethod, abstractmethod
-from exceptions import ReservaJaPagaError, ReservaNaoPagaError, DadosInvalidosError, VeiculoNaoEncontradoError
+from exceptions import (ReservaJaPagaError, ReservaNaoPagaError, DadosInvalidosError, VeiculoNaoEncontradoError,
+                        VeiculoIndisponivelError, ReservaFinalizadaError, CupomInvalidoError, EnvioParcialError)
 
 # PADRÃO STRATEGY
 class IPaymentStrategy(ABC):
+    desconto = 0.0 # fração descontada das diárias
+
+    def calcular(self, total_diarias: float, caucao: float) -> float:
+        """Mesmo cálculo de process_payment, sem mensagens (camada de serviço)."""
+        return total_diarias * (1 - self.desconto) + caucao
+
     @abstractmethod
     def process_payment(self, total_diarias: float, caucao: float) -> float:
         pass
 
 class PagamentoAVistaStrategy(IPaymentStrategy):
+    desconto = 0.10
+
     def process_payment(self, total_diarias: float, caucao: float) -> float:
-        valor_com_desconto = total_diarias * 0.90
         print(f"INFO: Desconto de 10% para pagamento à vista aplicado sobre as diárias.")
-        return valor_com_desconto + caucao
+        return self.calcular(total_diarias, caucao)
 
 class PagamentoCartaoStrategy(IPaymentStrategy):
     def process_payment(self, total_diarias: float, caucao: float) -> float:
         print("INFO: Pagamento com cartão selecionado (sem desconto adicional).")
-        return total_diarias + caucao
+        return self.calcular(total_diarias, caucao)
         
 class PagamentoPixStrategy(IPaymentStrategy):
     """
     Uma nova estratégia! Pagamento via PIX com 5% de desconto.
     """
+    desconto = 0.05
+
     def process_payment(self, total_diarias: float, caucao: float) -> float:
-        valor_com_desconto = total_diarias * 0.95
         print(f"INFO: Desconto de 5% para pagamento via PIX aplicado sobre as diárias.")
-        return valor_com_desconto + caucao
+        return self.calcular(total_diarias, caucao)
+
+# Formas de pagamento aceitas pela camada de serviço
+FORMAS_PAGAMENTO = {
+    'avista': PagamentoAVistaStrategy,
+    'cartao': PagamentoCartaoStrategy,
+    'pix': PagamentoPixStrategy,
+}
 # implementor
 class INotificationSender(ABC):
     @abstractclassmethod
-    def send(self, message: str):
+    def send(self, message: str, destinatario=None):
+        # destinatario identifica o cliente (CPF); canais que não o usam podem ignorá-lo
         pass
 
+    def send_batch(self, envios: list):
+        # Envio de vários pares (mensagem, destinatário) de uma vez; canais com API de lote podem sobrescrever.
+        # Numa falha, EnvioParcialError informa quantas já saíram, para que só o resto seja repetido.
+        for entregues, (message, destinatario) in enumerate(envios):
+            try:
+                self.send(message, destinatario)
+            except Exception as erro:
+                raise EnvioParcialError(entregues, erro) from erro
+
 # Concrete Implementors
 class ConsoleSender(INotificationSender):
-    def send(self, message: str):
+    def send(self, message: str, destinatario=None):
         print("\n--- [NOTIFICAÇÃO VIA CONSOLE] ---")
         print(message)
         print("----------------------------------\n")
 
 class EmailSender(INotificationSender):
     """Simula o envio de uma notificação por email."""
-    def send(self, message: str):
+    def send(self, message: str, destinatario=None):
         print("\n--- [SIMULANDO ENVIO DE EMAIL] ---")
         print(f"Para: cliente@email.com")
         print(f"Assunto: Novidades da sua Reserva")
@@ -53,15 +90,15 @@ class EmailSender(INotificationSender):
         
 class SmsSender(INotificationSender):
     """Simula o envio de uma notificação por SMS."""
-    def send(self, message: str):
+    def send(self, message: str, destinatario=None):
         print(f"\n--- [SMS PARA +5511999998888]: {message} ---\n")
 
 # Abstraction
 class Notification:
     def __init__(self, sender: INotificationSender):
         self._sender = sender
-    def send_message(self, message: str):
-        self._sender.send(message)
+    def send_message(self, message: str, destinatario=None):
+        self._sender.send(message, destinatario)
 
 # Refined Abstractions
 class ConfirmationNotification(Notification):
@@ -73,7 +110,7 @@ class ConfirmationNotification(Notification):
                    f"por {self._reserva.dias} dias foi confirmada com sucesso. "
                    f"Valor total: R${self._reserva.total:.2f}")
         print("-> Preparando notificação de confirmação...")
-        self.send_message(message)
+        self.send_message(message, self._reserva.cpf)
 
 class PaymentNotification(Notification):
     def __init__(self, sender: INotificationSender, reserva):
@@ -83,24 +120,45 @@ class PaymentNotification(Notification):
         message = (f"Seu pagamento no valor de R${self._reserva.total + self._reserva.VALOR_CAUCAO:.2f} "
                    f"para a reserva do veículo {self._reserva.modelo} foi processado. Obrigado!")
         print("-> Preparando notificação de pagamento...")
-        self.send_message(message)
+        self.send_message(message, self._reserva.cpf)
+
+# Travas das transições de estado, escolhidas pela identidade da reserva
+TRAVAS_RESERVAS = TravasPorChave()
 
 class Reserva:
-    VALOR_CAUCAO = 250.00
+    VALOR_CAUCAO = VALOR_CAUCAO
+
+    # Estados do ciclo de vida (usados pelos índices do Gerenciar_Reserva)
+    PENDENTE = 'pendente'
+    PAGA = 'paga'
+    FINALIZADA = 'finalizada'
+
+    __slots__ = ('_id', '_observador', '_cpf', '_placa', '_modelo', '_inicio', '_dias', '_total',
+                 '_deposito', '_incidentes', '_pago', '_finalizada', '_caucao_retido', '_avaliacao', '_comentario',
+                 '_desconto_cupom', '_desconto_pagamento', '_versao')
 
     def __init__(self):
+        self._id = None
+        self._observador = None # Observer: gerenciador avisado nas mudanças de estado
         self._cpf = ''
         self._placa = ''
         self._modelo = ''
+        self._inicio = None # data de retirada, definida em confirmar
         self._dias = 0
         self._total = 0.0
         self._deposito = 0.0
-        self._incidentes = []
+        self._incidentes = None # lista alocada só no primeiro incidente
         self._pago = False
         self._finalizada = False
+        self._caucao_retido = False # definido na devolução: houve dano, o caução não volta ao cliente
         self._avaliacao = None
         self._comentario = None
+        self._desconto_cupom = 0.0     # descontos concedidos no pagamento
+        self._desconto_pagamento = 0.0
+        self._versao = 0 # versão da última alteração (exportação incremental), atribuída pelo gerenciador
 
+    @property
+    def id(self): return self._id
     @property
     def cpf(self): return self._cpf
     @property
@@ -112,45 +170,175 @@ class Reserva:
     @property
     def total(self): return self._total
     @property
+    def deposito(self): return self._deposito
+    @property
     def pago(self): return self._pago
     @property
     def finalizada(self): return self._finalizada
     @property
-    def incidentes(self): return self._incidentes
+    def caucao_retido(self): return self._caucao_retido
+    @property
+    def incidentes(self): return self._incidentes or ()
+    @property
+    def inicio(self): return self._inicio
+    @property
+    def versao(self): return self._versao
+    @property
+    def desconto_cupom(self): return self._desconto_cupom
+    @property
+    def desconto_pagamento(self): return self._desconto_pagamento
+
+    @property
+    def fim(self):
+        """Data de devolução prevista: o período ocupado é [inicio, fim)."""
+        return self._inicio + timedelta(days=self._dias)
+
+    @property
+    def retirada_ate_hoje(self) -> bool:
+        """Se a retirada já chegou: só então a reserva ocupa o veículo (ver confirmar)."""
+        return self._inicio <= date.today()
+
+    @property
+    def estado(self):
+        if self._finalizada:
+            return self.FINALIZADA
+        return self.PAGA if self._pago else self.PENDENTE
 
     @dias.setter
     def dias(self, valor): self._dias = valor
     @total.setter
     def total(self, valor): self._total = valor
 
-    def fazer_reserva(self, cliente, veiculo, dias):
+    # Transições compare-and-set: a verificação e a troca acontecem sob a trava,
+    # então dois pagamentos (ou devoluções) simultâneos não passam os dois.
+    def _marcar_paga(self, desconto_cupom=0.0, desconto_pagamento=0.0):
+        with TRAVAS_RESERVAS(id(self)):
+            if self._pago:
+                raise ReservaJaPagaError("Pagamento já realizado.")
+            if self._finalizada:
+                raise ReservaFinalizadaError("A reserva já foi finalizada.")
+            self._pago = True
+            self._desconto_cupom = desconto_cupom
+            self._desconto_pagamento = desconto_pagamento
+        self._avisar_observador(self.PENDENTE)
+
+    def _marcar_finalizada(self, caucao_retido=False):
+        with TRAVAS_RESERVAS(id(self)):
+            if self._finalizada:
+                raise ReservaFinalizadaError("O veículo desta reserva já foi devolvido.")
+            if not self._pago:
+                raise ReservaNaoPagaError("Não é possível devolver o veículo antes de efetuar o pagamento.")
+            self._finalizada = True
+            self._caucao_retido = caucao_retido
+        self._avisar_observador(self.PAGA)
+
+    def _avisar_observador(self, estado_anterior):
+        if self._observador is not None and estado_anterior != self.estado:
+            self._observador.atualizar_estado(self, estado_anterior)
+
+    # --- Operações sem entrada/saída (camada de serviço) ---
+
+    def confirmar(self, cliente, veiculo, dias, inicio=None, agenda=None) -> float:
+        """Preenche a reserva e ocupa o veículo a partir de 'inicio' (hoje por padrão).
+
+        Só uma retirada para hoje ocupa o veículo agora; com uma agenda (calendario.AgendaFrota)
+        o período também é marcado no calendário dele. Devolve o desconto de longa duração.
+        """
         if not cliente or not veiculo or dias <= 0:
             raise DadosInvalidosError("Dados inválidos para reserva (cliente, veiculo ou dias).")
+        hoje = date.today()
+        inicio = hoje if inicio is None else inicio
+        if isinstance(inicio, datetime):
+            inicio = inicio.date()
+        if inicio < hoje:
+            raise DadosInvalidosError("A data de retirada não pode estar no passado.")
+        retirada_hoje = inicio == hoje
+        if retirada_hoje and not veiculo.ocupar():
+            raise VeiculoIndisponivelError(f"O veículo {veiculo.placa} não está disponível.")
+        if agenda is not None:
+            try:
+                agenda.reservar(veiculo.placa, inicio, inicio + timedelta(days=dias), self)
+            except VeiculoIndisponivelError:
+                if retirada_hoje:
+                    veiculo.disponivel = True
+                raise
 
+        self._inicio = inicio
         self._cpf = cliente.cpf
         self._placa = veiculo.placa
         self._modelo = veiculo.modelo
         self._dias = dias
-        
-        total_bruto = veiculo.valor * dias
-        desconto_longa_duracao = 0.0
-        if dias >= 7:
-            desconto_longa_duracao = total_bruto * 0.10
-            print(f"INFO: Desconto de longa duração (10%) aplicado: -R$ {desconto_longa_duracao:.2f}")
+        cotacao = MOTOR_COTACAO.cotar(veiculo.valor, dias, caucao=self.VALOR_CAUCAO)
+        self.total = cotacao.subtotal
+        self._deposito = cotacao.caucao
+        return cotacao.desconto_longa_duracao
+
+    def cotar(self, estrategia=None, cupom=None, promo_codes=None):
+        """Cotação itemizada do pagamento desta reserva (ver cotacao.py); cupons do catálogo CUPONS por padrão."""
+        promo_codes = CUPONS if promo_codes is None else promo_codes
+        return MOTOR_COTACAO.cotar_subtotal(self.total, cupom, estrategia, promo_codes, self._deposito, self.dias)
+
+    def calcular_pagamento(self, estrategia, cupom=None, promo_codes=None) -> float:
+        """Valor final (diárias com descontos + caução), sem alterar a reserva."""
+        return self.cotar(estrategia, cupom, promo_codes).total
+
+    def pagar(self, estrategia, cupom=None, promo_codes=None) -> float:
+        promo_codes = CUPONS if promo_codes is None else promo_codes
+        cotacao = self.cotar(estrategia, cupom, promo_codes)
+        # Com um catálogo, o uso do cupom é contado antes de cobrar e devolvido se o pagamento não sair
+        resgatado = bool(cupom) and isinstance(promo_codes, CatalogoCupons)
+        if resgatado:
+            promo_codes.resgatar(cupom)
+        try:
+            self._marcar_paga(cotacao.desconto_cupom, cotacao.desconto_pagamento)
+        except Exception:
+            if resgatado:
+                promo_codes.estornar(cupom)
+            raise
+        return cotacao.total
+
+    def devolver(self, veiculo, descricao_incidente=None) -> bool:
+        """Finaliza a reserva e libera o veículo. Devolve True se o caução foi retido."""
+        if not veiculo:
+            raise VeiculoNaoEncontradoError(f"Veículo com placa {self.placa} não encontrado na frota.")
+
+        self._marcar_finalizada(caucao_retido=descricao_incidente is not None)
+        if descricao_incidente is not None:
+            self.incluir_incidente(datetime.now().strftime("%d/%m/%Y"), descricao_incidente)
+        # Uma reserva futura não ocupou o veículo: ele pode estar com outro cliente agora
+        if self.retirada_ate_hoje:
+            veiculo.disponivel = True
+        return descricao_incidente is not None
 
-        self.total = total_bruto - desconto_longa_duracao
-        self._deposito = self.VALOR_CAUCAO
-        veiculo.disponivel = False
+    def avaliar(self, nota, comentario=''):
+        validar_nota(nota)
+        self._comentario = comentario
+        self._avaliacao = nota
+        if self._observador is not None:
+            self._observador.reserva_avaliada(self)
+
+    def incluir_incidente(self, data, descricao):
+        incidente = {'data': data, 'descricao': descricao}
+        if self._incidentes is None:
+            self._incidentes = []
+        self._incidentes.append(incidente)
+        if self._observador is not None:
+            self._observador.incidente_adicionado(self, incidente)
+        return incidente
+
+    # --- Fluxos interativos ---
+
+    def fazer_reserva(self, cliente, veiculo, dias, inicio=None, agenda=None):
+        desconto_longa_duracao = self.confirmar(cliente, veiculo, dias, inicio, agenda)
+        if desconto_longa_duracao:
+            print(f"INFO: Desconto de longa duração (10%) aplicado: -R$ {desconto_longa_duracao:.2f}")
         
         print(f"\nReserva realizada com sucesso para {cliente.nome}.")
+        print(f"Período: {self.inicio.strftime('%d/%m/%Y')} a {self.fim.strftime('%d/%m/%Y')}")
         print(f"Valor das diárias (com desconto, se aplicável): R${self.total:.2f}")
         print(f"Caução a ser pago: R${self._deposito:.2f}")
 
-# Dentro da classe Reserva, substitua o método inteiro:
-
     def efetuar_pagamento(self):
-        from main import PROMO_CODES
-        
         if self.pago:
             print("Pagamento já realizado.")
             return
@@ -158,20 +346,18 @@ class Reserva:
         total_diarias = self.total
         
         cupom = input("Você possui um cupom de desconto? (Deixe em branco se não tiver): ").upper()
-        if cupom and cupom in PROMO_CODES:
-            tipo, valor = PROMO_CODES[cupom]
-            desconto_cupom = 0
-            if tipo == 'perc':
-                desconto_cupom = self.total * valor
-                print(f"Cupom '{cupom}' aplicado! Desconto de {valor*100:.0f}%: -R$ {desconto_cupom:.2f}")
-            elif tipo == 'fixo':
-                desconto_cupom = valor
-                print(f"Cupom '{cupom}' aplicado! Desconto de R$ {desconto_cupom:.2f}")
-            
-            total_diarias -= desconto_cupom
-            if total_diarias < 0: total_diarias = 0
-        elif cupom:
-            print("Cupom inválido ou expirado.")
+        if cupom:
+            try:
+                cotacao = self.cotar(cupom=cupom)
+                tipo, valor = CUPONS[cupom]
+                if tipo == 'perc':
+                    print(f"Cupom '{cupom}' aplicado! Desconto de {valor*100:.0f}%: -R$ {cotacao.desconto_cupom:.2f}")
+                else:
+                    print(f"Cupom '{cupom}' aplicado! Desconto de R$ {cotacao.desconto_cupom:.2f}")
+                total_diarias = cotacao.diarias_a_pagar
+            except CupomInvalidoError as e:
+                print(e)
+                cupom = None
 
         print(f"\nTotal das diárias (com descontos de cupom, se houver): R$ {total_diarias:.2f}")
         print(f"Valor do caução: R$ {self._deposito:.2f}")
@@ -208,35 +394,39 @@ class Reserva:
 
         confirmar = input("Confirmar pagamento? (s/n) ").lower()
         if confirmar == 's':
-            self._pago = True
+            try:
+                self.pagar(strategy, cupom)
+            except CupomInvalidoError as e:
+                print(f"{e} Pagamento não efetuado.")
+                return
             print("Pagamento efetuado com sucesso!")
             
             # (Opcional, mas mantém a consistência do padrão Bridge que fizemos antes)
-            sender_sms = SmsSender()
-            notificacao_pagamento = PaymentNotification(sender_sms, self)
-            notificacao_pagamento.notify()
+            if self._observador is not None:
+                self._observador.notificar_pagamento(self) # canais configurados no gerenciador
+            else:
+                PaymentNotification(SmsSender(), self).notify()
         else:
             print("Pagamento cancelado.")
     
-    def devolver_veiculo(self, lista_veiculos):
+    def devolver_veiculo(self, ger_vei):
         if not self.pago:
             raise ReservaNaoPagaError("Não é possível devolver o veículo antes de efetuar o pagamento.")
 
-        veiculo = next((v for v in lista_veiculos if v.placa == self.placa), None)
+        veiculo = ger_vei.buscar_por_placa(self.placa)
         if not veiculo:
             raise VeiculoNaoEncontradoError(f"Veículo com placa {self.placa} não encontrado na frota.")
 
-        status_reembolso = ""
+        descricao_incidente = None
         incidente_devolucao = input("Houve algum novo dano ou incidente com o veículo? (s/n) ").lower()
         if incidente_devolucao == 's':
             print(f"O valor do caução será retido para cobrir os danos.")
-            self.registrar_incidente_devolucao()
+            descricao_incidente = input("Descreva o dano/incidente ocorrido: ")
+
+        if self.devolver(veiculo, descricao_incidente):
             status_reembolso = f"Status do Caução: Retido (R${self._deposito:.2f}) para cobrir novos danos."
         else:
             status_reembolso = f"Status do Caução: Reembolsado integralmente (R${self._deposito:.2f})."
-
-        veiculo.disponivel = True
-        self._finalizada = True
         
         avaliar = input("Deseja avaliar o aluguel? (s/n): ").strip().lower()
         if avaliar == 's':
@@ -258,100 +448,501 @@ class Reserva:
                 else: print("Digite uma nota entre 1 e 5.")
             except ValueError: print("Por favor, digite um número válido.")
         
-        self._comentario = input("Deseja deixar um comentário? (opcional): ").strip()
-        self._avaliacao = nota
+        self.avaliar(nota, input("Deseja deixar um comentário? (opcional): ").strip())
         print("Avaliação registrada com sucesso!\n")
 
     def exibir_contrato(self, cliente):
-        # Simula data de retirada como sendo "dias" atrás a partir de agora
-        data_retirada = datetime.now() - timedelta(days=self.dias)
-        data_devolucao_prevista = data_retirada + timedelta(days=self.dias)
         print("\n========== CONTRATO DE LOCAÇÃO ==========")
         print(f"Cliente: {cliente.nome} | CPF: {cliente.cpf}")
         print(f"Veículo: {self.modelo} | Placa: {self.placa}")
         print(f"Período: {self.dias} dias | Valor Diárias: R${self.total:.2f}")
         print(f"Valor Caução: R${self._deposito:.2f}")
         print(f"Pagamento: {'Pago' if self.pago else 'Pendente'}")
-        print(f"Data de Retirada: {data_retirada.strftime('%d/%m/%Y')}")
-        print(f"Data de Devolução Prevista: {data_devolucao_prevista.strftime('%d/%m/%Y')}")
+        print(f"Data de Retirada: {self.inicio.strftime('%d/%m/%Y')}")
+        print(f"Data de Devolução Prevista: {self.fim.strftime('%d/%m/%Y')}")
         print("="*50 + "\n")
 
     def adicionar_incidente(self, data, descricao):
-        self._incidentes.append({'data': data, 'descricao': descricao})
+        self.incluir_incidente(data, descricao)
         print("Incidente registrado com sucesso!")
 
-    def registrar_incidente_devolucao(self):
-        data = datetime.now().strftime("%d/%m/%Y")
-        descricao = input("Descreva o dano/incidente ocorrido: ")
-        self.adicionar_incidente(data, descricao)
+class TotaisReservas:
+    """Quantidades e valores por estado, mantidos a cada transição.
+
+    O relatório de pagamentos lê estes contadores em vez de percorrer as
+    reservas. Valor = diárias + caução, como no controle de pagamentos.
+    """
+    ESTADOS = (Reserva.PENDENTE, Reserva.PAGA, Reserva.FINALIZADA)
 
-class Gerenciar_Reserva(Singleton):
     def __init__(self):
-        if hasattr(self, '_initialized'):
-            return
-        
-        self.reservas = []
+        self.quantidade = dict.fromkeys(self.ESTADOS, 0)
+        self.valor = dict.fromkeys(self.ESTADOS, 0.0)
+        self.caucao = dict.fromkeys(self.ESTADOS, 0.0)
+        self.retidas = 0           # devoluções com dano (caução retido)
+        self.caucao_retida = 0.0
+
+    def incluir(self, reserva, sinal=1, estado=None):
+        estado = reserva.estado if estado is None else estado
+        self.quantidade[estado] += sinal
+        self.valor[estado] += sinal * (reserva.total + reserva.deposito)
+        self.caucao[estado] += sinal * reserva.deposito
+        if estado == Reserva.FINALIZADA and reserva.caucao_retido:
+            self.retidas += sinal
+            self.caucao_retida += sinal * reserva.deposito
+
+    def remover(self, reserva, estado=None):
+        self.incluir(reserva, -1, estado)
+
+    def mover(self, reserva, estado_anterior):
+        self.remover(reserva, estado_anterior)
+        self.incluir(reserva)
+
+    def ajustar_total(self, reserva, total_anterior):
+        self.valor[reserva.estado] += reserva.total - total_anterior
+
+    def somar_finalizadas(self, resumo):
+        """Histórico que ainda está só no repositório (ver IRepositorio.resumir_reservas_finalizadas)."""
+        self.quantidade[Reserva.FINALIZADA] += resumo['quantidade']
+        self.valor[Reserva.FINALIZADA] += resumo['valor']
+        self.caucao[Reserva.FINALIZADA] += resumo['caucao']
+        self.retidas += resumo['retidas']
+        self.caucao_retida += resumo['caucao_retida']
+
+    def como_dict(self) -> dict:
+        finalizadas = self.quantidade[Reserva.FINALIZADA]
+        return {
+            'pendentes': {'quantidade': self.quantidade[Reserva.PENDENTE],
+                          'valor': round(self.valor[Reserva.PENDENTE], 2)},
+            'pagas': {'quantidade': self.quantidade[Reserva.PAGA] + finalizadas,
+                      'valor': round(self.valor[Reserva.PAGA] + self.valor[Reserva.FINALIZADA], 2)},
+            'caucao': {'em_garantia': round(self.caucao[Reserva.PAGA], 2),
+                       'devolvida': round(self.caucao[Reserva.FINALIZADA] - self.caucao_retida, 2),
+                       'retida': round(self.caucao_retida, 2),
+                       'devolucoes_sem_dano': finalizadas - self.retidas,
+                       'devolucoes_com_dano': self.retidas},
+        }
+
+
+class Gerenciar_Reserva(Singleton, Persistente):
+    def __init__(self):
+        self._reservas = {}        # Índice principal: id -> Reserva (ordem de criação)
+        self._por_cpf = {}         # cpf -> {id: Reserva}
+        self._por_placa = {}       # placa -> {id: Reserva}
+        self._por_estado = {Reserva.PENDENTE: {}, Reserva.PAGA: {}, Reserva.FINALIZADA: {}}
+        self._por_cpf_estado = {}  # (cpf, estado) -> {id: Reserva}
+        self._por_versao = []      # (versão, id) em ordem: alterações para a exportação incremental
+        self._ids = []             # ids em ordem crescente: as consultas andam por ele a partir do cursor
+        self._proximo_id = 1
+        # Calendário por veículo das reservas em aberto (datas de retirada e devolução)
+        self._agenda = AgendaFrota()
+        # Contadores do relatório de pagamentos, atualizados junto com os índices
+        self._totais = TotaisReservas()
+        # Com repositório, só as reservas em aberto são carregadas na conexão;
+        # as finalizadas (histórico) entram nos índices quando consultadas.
+        self._historico_carregado = True
+        self._historico_cpfs = set()
+        self._historico_placas = set()
+        # Bridge: canais usados nas notificações (a camada de serviço pode trocá-los)
+        self.canais_confirmacao = [ConsoleSender(), EmailSender()]
+        self.canais_pagamento = [SmsSender()]
+        # Protege só os índices e a numeração; nunca é mantida durante uma gravação no repositório
+        self._trava = threading.RLock()
+        self._trava_historico = threading.Lock() # uma carga do histórico por vez (ver _carregar_historico)
         self._initialized = True
 
-    def fazer_reserva(self, cliente, veiculo, dias):
+    def conectar_repositorio(self, repositorio):
+        # Reservas criadas antes da conexão ainda não foram gravadas: recebem
+        # novos ids para não colidirem com as que já estão no repositório.
+        em_memoria = list(self._reservas.values())
+        for reserva in em_memoria:
+            self.remover_reserva(reserva)
+            reserva._id = None
+
+        self._repositorio = repositorio
+        self._proximo_id = repositorio.proximo_id_reserva()
+        for reserva in repositorio.carregar_reservas(finalizadas=False):
+            self._indexar(reserva, ordenar=False)
+        # O histórico entra nos índices sob demanda, mas nos totais já na conexão
+        with self._trava:
+            self._ordenar_indices()
+            self._totais.somar_finalizadas(repositorio.resumir_reservas_finalizadas())
+        self._historico_carregado = False
+
+        with self._transacao():
+            for reserva in em_memoria:
+                self.adicionar_reserva(reserva)
+
+    def _carregar_historico(self, cpf=None, placa=None, estados=None):
+        if self._historico_carregado or (estados is not None and Reserva.FINALIZADA not in estados):
+            return
+        # Uma trava só para a carga: a leitura do repositório não pode acontecer sob self._trava,
+        # que as transações do repositório tomam por dentro (ex: criar_reserva)
+        with self._trava_historico:
+            if self._historico_carregado:
+                return
+            if cpf is not None:
+                if cpf in self._historico_cpfs:
+                    return
+                origem = list(self._repositorio.carregar_reservas(cpf=cpf, finalizadas=True))
+            elif placa is not None:
+                if placa in self._historico_placas:
+                    return
+                origem = list(self._repositorio.carregar_reservas(placa=placa, finalizadas=True))
+            else:
+                origem = list(self._repositorio.carregar_reservas(finalizadas=True))
+
+            with self._trava:
+                for reserva in origem:
+                    if reserva.id not in self._reservas:
+                        self._indexar(reserva, contabilizar=False, ordenar=False) # já somada na conexão
+                self._ordenar_indices()
+                if cpf is not None:
+                    self._historico_cpfs.add(cpf)
+                elif placa is not None:
+                    self._historico_placas.add(placa)
+                else:
+                    self._historico_carregado = True
+
+    @property
+    def reservas(self):
+        self._carregar_historico()
+        with self._trava:
+            return sorted(self._reservas.values(), key=lambda r: r.id)
+
+    def reservas_alteradas(self, desde=None):
+        """Gerador das reservas alteradas depois da versão 'desde' (todas, se None), em ordem de versão.
+
+        As reservas em memória saem do índice de versões, a partir da marca d'água; o histórico
+        que ainda está só no repositório vem direto dele, sem entrar nos índices.
+        """
+        # As versões são atribuídas sob a mesma trava que mantém o índice: um bloco nunca pula
+        # uma alteração anterior à mais recente que ele contém
+        em_memoria = percorrer(self._por_versao, self._trava, lambda chave: (*chave, self._reservas[chave[1]]),
+                               depois_de=depois_da_versao(desde))
+        if self._repositorio is None or self._historico_carregado:
+            return (reserva for _, _, reserva in em_memoria)
+        return self._mesclar_gravadas(em_memoria, self._repositorio.carregar_reservas_alteradas(desde))
+
+    def _mesclar_gravadas(self, em_memoria, gravadas):
+        # Alterar uma reserva gravada exige carregá-la: uma linha do repositório só fica de fora se a
+        # cópia em memória já tem uma versão mais nova. Se o histórico for carregado no meio da
+        # exportação, a mesma (versão, id) pode vir dos dois lados, e sai uma vez só
+        gravadas = ((r.versao, r.id, r) for r in gravadas
+                    if self._reservas.get(r.id, r).versao == r.versao)
+        anterior = None
+        for versao, id_reserva, reserva in heapq.merge(em_memoria, gravadas, key=lambda e: e[:2]):
+            if (versao, id_reserva) != anterior:
+                anterior = (versao, id_reserva)
+                yield reserva
+
+    def _indexar(self, reserva, contabilizar=True, ordenar=True):
+        # Em lote (ordenar=False), quem chama ordena as listas uma vez no fim, com _ordenar_indices
+        with self._trava:
+            if reserva._id is None: # reserva nova (as carregadas do repositório já têm id e versão)
+                reserva._id = self._proximo_id
+                reserva._versao = VERSOES.proxima()
+            else:
+                VERSOES.observar(reserva._versao)
+            self._proximo_id = max(self._proximo_id, reserva._id + 1)
+            self._reservas[reserva.id] = reserva
+            if ordenar:
+                insort(self._por_versao, (reserva._versao, reserva._id))
+                insort(self._ids, reserva._id)
+            else:
+                self._por_versao.append((reserva._versao, reserva._id))
+                self._ids.append(reserva._id)
+            self._por_cpf.setdefault(reserva.cpf, {})[reserva.id] = reserva
+            self._por_placa.setdefault(reserva.placa, {})[reserva.id] = reserva
+            self._indexar_estado(reserva, reserva.estado)
+            reserva._observador = self
+            if contabilizar:
+                self._totais.incluir(reserva)
+        self._agendar(reserva)
+
+    def _ordenar_indices(self):
+        # Chamado sob self._trava. No lugar, e barato: são duas sequências já ordenadas (a do índice
+        # e a do lote acrescentado), que o sort junta numa passada
+        self._por_versao.sort()
+        self._ids.sort()
+
+    def _agendar(self, reserva):
+        # Reservas carregadas do repositório: as confirmadas nesta execução já entraram na agenda
+        if reserva.finalizada or reserva in self._agenda:
+            return
+        try:
+            self._agenda.reservar(reserva.placa, reserva.inicio, reserva.fim, reserva)
+        except VeiculoIndisponivelError as e:
+            print(f"[AGENDA] Reserva {reserva.id} fora do calendário: {e}")
+
+    def adicionar_reserva(self, reserva):
+        self._indexar(reserva)
+        if self._repositorio is not None:
+            self._repositorio.salvar_reserva(reserva, 'criada')
+
+    def remover_reserva(self, reserva):
+        with self._trava:
+            if self._reservas.pop(reserva.id, None) is None:
+                return
+            self._remover_do_indice(self._por_cpf, reserva.cpf, reserva.id)
+            self._remover_do_indice(self._por_placa, reserva.placa, reserva.id)
+            self._desindexar_estado(reserva, reserva.estado)
+            self._desindexar_versao(reserva)
+            i = bisect_left(self._ids, reserva.id)
+            if i < len(self._ids) and self._ids[i] == reserva.id:
+                del self._ids[i]
+            self._totais.remover(reserva)
+            reserva._observador = None
+        self._agenda.liberar(reserva)
+        if self._repositorio is not None:
+            self._repositorio.remover_reserva(reserva)
+
+    # Observer: chamado pela Reserva quando ela é paga ou finalizada
+    def atualizar_estado(self, reserva, estado_anterior):
+        with self._trava:
+            if reserva.id not in self._reservas:
+                return
+            self._desindexar_estado(reserva, estado_anterior)
+            self._indexar_estado(reserva, reserva.estado)
+            self._totais.mover(reserva, estado_anterior)
+            self._nova_versao(reserva)
+        if reserva.finalizada:
+            self._agenda.liberar(reserva) # devolvido: o restante do período volta a ficar livre
+        if self._repositorio is not None:
+            self._repositorio.salvar_reserva(reserva, reserva.estado)
+
+    def incidente_adicionado(self, reserva, incidente):
+        with self._trava:
+            self._nova_versao(reserva)
+        if self._repositorio is not None:
+            self._repositorio.salvar_incidente(reserva, incidente)
+
+    def reserva_avaliada(self, reserva):
+        with self._trava:
+            self._nova_versao(reserva)
+        if self._repositorio is not None:
+            self._repositorio.salvar_reserva(reserva, 'avaliada')
+
+    def _indexar_estado(self, reserva, estado):
+        self._por_estado[estado][reserva.id] = reserva
+        self._por_cpf_estado.setdefault((reserva.cpf, estado), {})[reserva.id] = reserva
+
+    def _desindexar_estado(self, reserva, estado):
+        self._por_estado[estado].pop(reserva.id, None)
+        self._remover_do_indice(self._por_cpf_estado, (reserva.cpf, estado), reserva.id)
+
+    def _nova_versao(self, reserva):
+        # Chamado sob self._trava: a reserva vai para o fim do índice de versões
+        indexada = reserva.id in self._reservas
+        if indexada:
+            self._desindexar_versao(reserva)
+        reserva._versao = VERSOES.proxima()
+        if indexada:
+            self._por_versao.append((reserva._versao, reserva._id)) # a versão mais nova de todas
+
+    def _desindexar_versao(self, reserva):
+        chave = (reserva._versao, reserva._id)
+        i = bisect_left(self._por_versao, chave)
+        if i < len(self._por_versao) and self._por_versao[i] == chave:
+            del self._por_versao[i]
+
+    @staticmethod
+    def _remover_do_indice(indice, chave, id_reserva):
+        grupo = indice.get(chave)
+        if grupo is not None:
+            grupo.pop(id_reserva, None)
+            if not grupo:
+                del indice[chave]
+
+    def buscar_por_id(self, id_reserva):
+        return self._reservas.get(id_reserva)
+
+    # Chaves de ordenação das consultas; o id desempata, então cada chave identifica uma reserva (cursor)
+    ORDENACOES = {
+        'id': lambda r: r.id,
+        'inicio': lambda r: (r.inicio, r.id),
+        'dias': lambda r: (r.dias, r.id),
+        'total': lambda r: (r.total, r.id),
+    }
+
+    def buscar_reservas(self, cpf=None, placa=None, estados=None):
+        """Consulta os índices e devolve as reservas em ordem de criação."""
+        return list(self.consultar(cpf, placa, estados))
+
+    def consultar(self, cpf=None, placa=None, estados=None, filtro=None, ordenar_por='id',
+                  decrescente=False, depois_de=None, limite=None):
+        """Gerador sobre as reservas que atendem aos critérios, na ordem pedida.
+
+        'filtro' é um predicado extra; 'depois_de' é o cursor de uma Pagina (ver paginar)
+        e 'limite', o máximo de reservas devolvidas.
+        """
+        chave = chave_de_ordenacao(self.ORDENACOES, ordenar_por)
+        validar_limite(limite)
+        self._carregar_historico(cpf, placa, estados)
+        por_id = ordenar_por == 'id'
+        with self._trava:
+            # As reservas de um cliente ou de um veículo são poucas: só os ids delas são copiados
+            # e ordenados. Sem esses critérios, a consulta anda pelo índice de ids inteiro
+            if cpf is not None and estados is not None:
+                ids = sorted(i for e in estados for i in self._por_cpf_estado.get((cpf, e), ()))
+            elif cpf is not None:
+                ids = sorted(self._por_cpf.get(cpf, ()))
+            elif placa is not None:
+                ids = sorted(self._por_placa.get(placa, ()))
+            else:
+                ids = self._ids
+        # Um bloco por vez sob a trava; o estado pode mudar entre um bloco e outro, então é conferido ao entregar
+        reservas = percorrer(ids, self._trava, self._reservas.get,
+                             depois_de if por_id else None, decrescente and por_id)
+        candidatos = (r for r in reservas if r is not None
+                      and (cpf is None or r.cpf == cpf)
+                      and (placa is None or r.placa == placa)
+                      and (estados is None or r.estado in estados))
+        if not por_id:
+            # Sem índice na ordem pedida: a seleção guarda só 'limite' reservas, se houver limite
+            yield from selecionar(candidatos, chave, filtro, depois_de, limite, decrescente)
+            return
+        if filtro is not None:
+            candidatos = filter(filtro, candidatos)
+        yield from islice(candidatos, limite)
+
+    def paginar(self, limite=TAMANHO_PAGINA, **criterios) -> Pagina:
+        """Uma página de consultar(**criterios); o cursor dela, passado em depois_de, traz a seguinte."""
+        chave = chave_de_ordenacao(self.ORDENACOES, criterios.get('ordenar_por', 'id'))
+        return Pagina.de(list(self.consultar(limite=limite + 1, **criterios)), limite, chave)
+
+    # --- Operações sem entrada/saída (camada de serviço) ---
+
+    def criar_reserva(self, cliente, veiculo, dias, inicio=None):
         nova_reserva = Reserva()
-        nova_reserva.fazer_reserva(cliente, veiculo, dias)
-        self.reservas.append(nova_reserva)
-        # Canal 1: Console
-        sender_console = ConsoleSender()
-        notificacao_console = ConfirmationNotification(sender_console, nova_reserva)
-        notificacao_console.notify()
-        
-        # Canal 2: Email (a notificação não muda, só o "enviador")
-        sender_email = EmailSender()
-        notificacao_email = ConfirmationNotification(sender_email, nova_reserva)
-        notificacao_email.notify()
+        with self._transacao():
+            nova_reserva.confirmar(cliente, veiculo, dias, inicio, self._agenda)
+            self.adicionar_reserva(nova_reserva)
+        return nova_reserva
 
-    def cancelar_reserva(self, reserva, lista_veiculos):
+    def alterar_dias(self, reserva, veiculo, novos_dias):
         if reserva.pago:
-            print("\nNão é possível cancelar uma reserva que já foi paga.")
-            return
+            raise ReservaJaPagaError("Não é possível modificar uma reserva que já foi paga.")
+        if not veiculo:
+            raise VeiculoNaoEncontradoError("Veículo da reserva não encontrado.")
+        if novos_dias <= 0:
+            raise DadosInvalidosError("A quantidade de dias deve ser positiva.")
+
+        if reserva in self._agenda:
+            self._agenda.mover(reserva, reserva.inicio, reserva.inicio + timedelta(days=novos_dias))
+        reserva.dias = novos_dias
+        with self._trava:
+            total_anterior = reserva.total
+            reserva.total = MOTOR_COTACAO.cotar(veiculo.valor, novos_dias).subtotal
+            if reserva.id in self._reservas:
+                self._totais.ajustar_total(reserva, total_anterior)
+            self._nova_versao(reserva)
+        if self._repositorio is not None:
+            self._repositorio.salvar_reserva(reserva, 'modificada')
+        return reserva
+
+    def cancelar(self, reserva, ger_vei):
+        if reserva.pago:
+            raise ReservaJaPagaError("Não é possível cancelar uma reserva que já foi paga.")
 
-        veiculo = next((v for v in lista_veiculos if v.placa == reserva.placa), None)
-        if veiculo:
-            veiculo.disponivel = True
+        with self._transacao():
+            veiculo = ger_vei.buscar_por_placa(reserva.placa)
+            # Uma reserva futura não ocupou o veículo: ele pode estar com outro cliente agora
+            if veiculo and reserva.retirada_ate_hoje:
+                veiculo.disponivel = True
+
+            self.remover_reserva(reserva)
 
-        self.reservas.remove(reserva)
+    # --- Disponibilidade por período ---
+
+    def placas_ocupadas(self, inicio, fim) -> frozenset:
+        """Placas com alguma reserva em aberto cruzando [inicio, fim)."""
+        return self._agenda.ocupados(inicio, fim)
+
+    def veiculos_livres(self, ger_vei, inicio, fim) -> list:
+        """Veículos que podem ser reservados de 'inicio' até 'fim' (exclusive)."""
+        ocupadas = self.placas_ocupadas(inicio, fim)
+        # Retirada hoje: só os disponíveis agora (índice do Gerenciar_Veiculos);
+        # mais à frente, qualquer veículo da frota sem período no caminho
+        candidatos = ger_vei if inicio <= date.today() else ger_vei.iter_todos_veiculos()
+        return [v for v in candidatos if v.placa not in ocupadas]
+
+    def agenda_veiculo(self, placa) -> list:
+        """Reservas em aberto do veículo, em ordem de data de retirada."""
+        return [reserva for _, _, reserva in self._agenda.periodos(placa)]
+
+    def notificar_confirmacao(self, reserva):
+        # A notificação não muda, só o "enviador"
+        for canal in self.canais_confirmacao:
+            ConfirmationNotification(canal, reserva).notify()
+
+    def notificar_pagamento(self, reserva):
+        for canal in self.canais_pagamento:
+            PaymentNotification(canal, reserva).notify()
+
+    def usar_despacho_assincrono(self, **opcoes):
+        """Passa os canais remotos (e-mail, SMS...) para despachantes em segundo plano (despacho.py).
+
+        O console continua síncrono: é local e sua saída deve aparecer junto do menu.
+        """
+        from despacho import DespachanteAssincrono
+        self._envolver_canais_remotos(DespachanteAssincrono, **opcoes)
+
+    def usar_envio_agrupado(self, **opcoes):
+        """Junta as mensagens de um mesmo cliente em resumos e limita a vazão de cada canal remoto (despacho.py).
+
+        Chamado depois de usar_despacho_assincrono, o agrupamento fica na frente do despachante:
+        agrupa -> respeita o limite do provedor -> entrega em segundo plano com repetição.
+        """
+        from despacho import EnvioAgrupado
+        self._envolver_canais_remotos(EnvioAgrupado, **opcoes)
+
+    def _envolver_canais_remotos(self, classe, **opcoes):
+        envolver = lambda canal: (canal if isinstance(canal, (classe, ConsoleSender))
+                                  else classe(canal, **opcoes))
+        self.canais_confirmacao = [envolver(c) for c in self.canais_confirmacao]
+        self.canais_pagamento = [envolver(c) for c in self.canais_pagamento]
+
+    # --- Fluxos interativos ---
+
+    def fazer_reserva(self, cliente, veiculo, dias, inicio=None):
+        nova_reserva = Reserva()
+        with self._transacao():
+            nova_reserva.fazer_reserva(cliente, veiculo, dias, inicio, self._agenda)
+            self.adicionar_reserva(nova_reserva)
+        self.notificar_confirmacao(nova_reserva)
+
+    def cancelar_reserva(self, reserva, ger_vei):
+        try:
+            self.cancelar(reserva, ger_vei)
+        except ReservaJaPagaError as e:
+            print(f"\n{e}")
+            return
         print("\nReserva cancelada com sucesso!")
 
-    def modificar_reserva(self, reserva, lista_veiculos):
+    def modificar_reserva(self, reserva, ger_vei):
         if reserva.pago:
             print("\nNão é possível modificar uma reserva que já foi paga.")
             return
 
-        veiculo = next((v for v in lista_veiculos if v.placa == reserva.placa), None)
+        veiculo = ger_vei.buscar_por_placa(reserva.placa)
         if not veiculo:
             print("Veículo da reserva não encontrado.")
             return
 
         try:
             novos_dias = int(input(f"A reserva atual é de {reserva.dias} dias. Digite a nova quantidade de dias: "))
-            if novos_dias <= 0:
-                print("A quantidade de dias deve ser positiva.")
-                return
-            
-            # Recalcula o total com base nos novos dias e aplica desconto se necessário
-            total_bruto = veiculo.valor * novos_dias
-            desconto_longa_duracao = 0.0
-            if novos_dias >= 7:
-                desconto_longa_duracao = total_bruto * 0.10
-
-            reserva.dias = novos_dias
-            reserva.total = total_bruto - desconto_longa_duracao
+            self.alterar_dias(reserva, veiculo, novos_dias)
             
             print("\nReserva modificada com sucesso!")
             print(f"Novo período: {reserva.dias} dias. Novo total das diárias: R${reserva.total:.2f}")
 
+        except (DadosInvalidosError, VeiculoIndisponivelError) as e:
+            print(e)
         except ValueError:
             print("Entrada inválida. Digite um número de dias.")
 
     def listar_incidentes_por_placa(self, placa):
-        reservas_veiculo = [r for r in self.reservas if r.placa == placa]
+        reservas_veiculo = self.buscar_reservas(placa=placa)
         if not reservas_veiculo:
             print(f"Nenhuma reserva encontrada para a placa {placa}.")
             return
@@ -367,21 +958,29 @@ class Gerenciar_Reserva(Singleton):
         if not incidentes_encontrados:
             print("Nenhum incidente registrado para este veículo.")
 
+    def totais_pagamentos(self) -> dict:
+        """Quantidades e valores pendentes/pagos e a situação dos cauções, em O(1)."""
+        with self._trava:
+            return self._totais.como_dict()
+
     def controle_pagamentos(self):
-        pendentes = [r for r in self.reservas if not r.pago and not r.finalizada]
-        pagas = [r for r in self.reservas if r.pago]
-        
+        totais = self.totais_pagamentos()
+        caucao = totais['caucao']
         print("\n=== CONTROLE DE PAGAMENTOS ===")
+        print(f"Pendentes: {totais['pendentes']['quantidade']} reserva(s) - R${totais['pendentes']['valor']:.2f}")
+        print(f"Realizados: {totais['pagas']['quantidade']} reserva(s) - R${totais['pagas']['valor']:.2f}")
+        print(f"Caução em garantia (veículos ainda não devolvidos): R${caucao['em_garantia']:.2f}")
+        print(f"Caução devolvido: R${caucao['devolvida']:.2f} ({caucao['devolucoes_sem_dano']} devolução(ões) sem dano)")
+        print(f"Caução retido: R${caucao['retida']:.2f} ({caucao['devolucoes_com_dano']} devolução(ões) com dano)")
+
+        if input("\nListar as reservas? (s/n): ").strip().lower() != 's':
+            return
         print("\n--- Pagamentos Pendentes ---")
-        if not pendentes:
-            print("Nenhum pagamento pendente.")
-        else:
-            for r in pendentes:
-                print(f"Cliente (CPF {r.cpf}) - Veículo {r.modelo} - R${r.total + r.deposito:.2f}")
+        exibir_paginado(lambda cursor: self.paginar(estados=(Reserva.PENDENTE,), depois_de=cursor),
+                        lambda _, r: f"Cliente (CPF {r.cpf}) - Veículo {r.modelo} - R${r.total + r.deposito:.2f}",
+                        vazio="Nenhum pagamento pendente.")
         
         print("\n--- Pagamentos Realizados ---")
-        if not pagas:
-            print("Nenhum pagamento realizado.")
-        else:
-             for r in pagas:
-                 print(f"Cliente (CPF {r.cpf}) - Veículo {r.modelo} - R${r.total + r.deposito:.2f}")
\ No newline at end of file
+        exibir_paginado(lambda cursor: self.paginar(estados=(Reserva.PAGA, Reserva.FINALIZADA), depois_de=cursor),
+                        lambda _, r: f"Cliente (CPF {r.cpf}) - Veículo {r.modelo} - R${r.total + r.deposito:.2f}",
+                        vazio="Nenhum pagamento realizado.")
\ No newline at end of file
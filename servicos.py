@@ -0,0 +1,197 @@
+"""Camada de serviço da locadora, sem input()/print().
+
+Recebe argumentos tipados, devolve objetos de domínio e sinaliza falhas com as
+exceções de exceptions.py; os comandos interativos e os scripts em lote usam as
+mesmas regras através dela.
+"""
+from clientes import GerenciarCliente
+from veiculos import GerenciarVeiculo
+from reserva import Gerenciar_Reserva, Reserva, FORMAS_PAGAMENTO
+from cotacao import MOTOR_COTACAO, Cotacao
+from cupons import CUPONS
+from manutencoes import INTERVALO_REVISAO_DIAS, ultimo_trimestre
+import exportacao
+from analitica import AnaliticaFrota
+from validacoes import validar_nota, validar_data
+from exceptions import (ClienteNaoEncontradoError, VeiculoNaoEncontradoError,
+                        ReservaNaoEncontradaError, DadosInvalidosError)
+
+
+class ServicoLocadora: # Facade
+    def __init__(self, ger_cli=None, ger_vei=None, ger_res=None, cupons=None, notificar=True):
+        self._ger_cli = ger_cli or GerenciarCliente()
+        self._ger_vei = ger_vei or GerenciarVeiculo()
+        self._ger_res = ger_res or Gerenciar_Reserva()
+        # Catálogo de cupons (com validade e limite de usos); um dict {código: (tipo, valor)} também serve
+        self._cupons = cupons if cupons is not None else CUPONS
+        self._notificar = notificar
+
+    # --- Clientes ---
+
+    def cadastrar_cliente(self, nome: str, cpf: str):
+        return self._ger_cli.registrar_cliente(nome, cpf)
+
+    def buscar_cliente(self, cpf: str):
+        cliente = self._ger_cli.buscar_por_cpf(cpf)
+        if cliente is None:
+            raise ClienteNaoEncontradoError(f"Cliente com CPF {cpf} não encontrado.")
+        return cliente
+
+    def listar_clientes(self) -> list:
+        return self._ger_cli.clientes
+
+    # --- Veículos ---
+
+    def cadastrar_veiculo(self, modelo: str, placa: str, ano, valor):
+        return self._ger_vei.registrar_veiculo(modelo, placa, ano, valor)
+
+    def buscar_veiculo(self, placa: str):
+        veiculo = self._ger_vei.buscar_por_placa(placa)
+        if veiculo is None:
+            raise VeiculoNaoEncontradoError(f"Veículo com placa {placa} não encontrado na frota.")
+        return veiculo
+
+    def listar_disponiveis(self) -> list:
+        return list(self._ger_vei)
+
+    def registrar_manutencao(self, placa: str, descricao: str, data: str, custo: float):
+        return self.buscar_veiculo(placa).adicionar_manutencao(descricao, data, custo)
+
+    def custo_manutencoes(self, inicio=None, fim=None) -> float:
+        """Custo das manutenções da frota em [inicio, fim); sem período, o do último trimestre."""
+        if inicio is None and fim is None:
+            inicio, fim = ultimo_trimestre()
+        return self._ger_vei.custo_manutencoes(inicio, fim)
+
+    def veiculos_em_atraso(self, dias: int = INTERVALO_REVISAO_DIAS) -> list:
+        return self._ger_vei.veiculos_em_atraso(dias)
+
+    def estatisticas_frota(self) -> dict:
+        return self._ger_vei.resumo_utilizacao()
+
+    def localizar_veiculo(self, placa: str) -> dict:
+        return self.buscar_veiculo(placa).coordenadas
+
+    def localizar_frota(self, placas=None) -> dict:
+        """Posição de toda a frota (ou das placas dadas) com uma única consulta em lote ao GPS."""
+        return self._ger_vei.atualizar_localizacoes(placas)
+
+    def veiculos_proximos(self, lat: float, lon: float, k: int = None, raio_km: float = None) -> list:
+        """Os k veículos disponíveis mais próximos (1 sem k), ou os dentro de raio_km (até k, se dado): [(Veiculo, km)]."""
+        if raio_km is not None:
+            no_raio = self._ger_vei.disponiveis_no_raio(lat, lon, raio_km)
+            return no_raio if k is None else no_raio[:k]
+        return self._ger_vei.mais_proximos(lat, lon, 1 if k is None else k)
+
+    def veiculos_livres(self, inicio, fim) -> list:
+        """Veículos sem reserva no período [inicio, fim) (datas; fim é o dia da devolução)."""
+        return self._ger_res.veiculos_livres(self._ger_vei, inicio, fim)
+
+    def agenda_veiculo(self, placa: str) -> list:
+        """Reservas em aberto do veículo, em ordem de data de retirada."""
+        return self._ger_res.agenda_veiculo(self.buscar_veiculo(placa).placa)
+
+    # --- Reservas ---
+
+    def buscar_reserva(self, id_reserva: int) -> Reserva:
+        reserva = self._ger_res.buscar_por_id(id_reserva)
+        if reserva is None:
+            raise ReservaNaoEncontradaError(f"Reserva {id_reserva} não encontrada.")
+        return reserva
+
+    def reservas_do_cliente(self, cpf: str, estados=None) -> list:
+        return self._ger_res.buscar_reservas(cpf=cpf, estados=estados)
+
+    def reservar(self, cpf: str, placa: str, dias: int, inicio=None) -> Reserva:
+        """Reserva a partir da data 'inicio' (hoje por padrão)."""
+        reserva = self._ger_res.criar_reserva(self.buscar_cliente(cpf), self.buscar_veiculo(placa), dias, inicio)
+        if self._notificar:
+            self._ger_res.notificar_confirmacao(reserva)
+        return reserva
+
+    def modificar_reserva(self, id_reserva: int, dias: int) -> Reserva:
+        reserva = self.buscar_reserva(id_reserva)
+        return self._ger_res.alterar_dias(reserva, self._ger_vei.buscar_por_placa(reserva.placa), dias)
+
+    def cancelar_reserva(self, id_reserva: int):
+        self._ger_res.cancelar(self.buscar_reserva(id_reserva), self._ger_vei)
+
+    def cotar_pagamento(self, id_reserva: int, forma: str, cupom: str = None) -> float:
+        return self.buscar_reserva(id_reserva).calcular_pagamento(self._estrategia(forma), cupom, self._cupons)
+
+    def detalhar_pagamento(self, id_reserva: int, forma: str = None, cupom: str = None) -> Cotacao:
+        """Cotação itemizada do pagamento; sem forma, sem desconto de pagamento."""
+        estrategia = self._estrategia(forma) if forma else None
+        return self.buscar_reserva(id_reserva).cotar(estrategia, cupom, self._cupons)
+
+    def cotar(self, placa: str, dias: int, forma: str = None, cupom: str = None) -> Cotacao:
+        """Cotação itemizada de uma reserva ainda não feita."""
+        estrategia = self._estrategia(forma) if forma else None
+        return MOTOR_COTACAO.cotar(self.buscar_veiculo(placa).valor, dias, cupom, estrategia, self._cupons)
+
+    def comparar_precos(self, placas: list, lista_dias: list, forma: str = None, cupom: str = None) -> dict:
+        """Tabela de comparação {placa: {dias: total}}, calculada de uma vez pelo motor de cotação."""
+        veiculos = [self.buscar_veiculo(placa) for placa in placas]
+        estrategia = self._estrategia(forma) if forma else None
+        tabela = MOTOR_COTACAO.cotar_tabela([v.valor for v in veiculos], lista_dias, cupom, estrategia, self._cupons)
+        return {v.placa: dict(zip(lista_dias, linha)) for v, linha in zip(veiculos, tabela)}
+
+    def pagar(self, id_reserva: int, forma: str, cupom: str = None) -> float:
+        """Paga a reserva e devolve o valor cobrado (diárias com descontos + caução)."""
+        reserva = self.buscar_reserva(id_reserva)
+        total = reserva.pagar(self._estrategia(forma), cupom, self._cupons)
+        if self._notificar:
+            self._ger_res.notificar_pagamento(reserva)
+        return total
+
+    def devolver(self, id_reserva: int, incidente: str = None, nota: int = None, comentario: str = '') -> bool:
+        """Finaliza a reserva; devolve True se o caução foi retido por causa de um incidente."""
+        reserva = self.buscar_reserva(id_reserva)
+        if nota is not None:
+            validar_nota(nota) # antes da devolução: uma nota inválida não pode deixá-la pela metade
+        retido = reserva.devolver(self._ger_vei.buscar_por_placa(reserva.placa), incidente)
+        if nota is not None:
+            reserva.avaliar(nota, comentario)
+        return retido
+
+    def relatar_incidente(self, id_reserva: int, descricao: str, data: str) -> dict:
+        """Registra um incidente na reserva; data no formato dd/mm/aaaa (gravada normalizada)."""
+        data = validar_data(data).strftime("%d/%m/%Y")
+        return self.buscar_reserva(id_reserva).incluir_incidente(data, descricao)
+
+    # --- Relatórios ---
+
+    def incidentes_por_placa(self, placa: str) -> list:
+        """Lista de (reserva, incidente) do veículo, em ordem de criação das reservas."""
+        return [(r, inc) for r in self._ger_res.buscar_reservas(placa=placa) for inc in r.incidentes]
+
+    def exportar(self, tipo: str, caminho: str, incremental: bool = False):
+        """Exporta 'reservas', 'manutencoes' ou 'incidentes' para caminho (.csv/.jsonl, .gz opcional)."""
+        if tipo == 'manutencoes':
+            return exportacao.exportar_manutencoes(caminho, self._ger_vei, incremental)
+        if tipo == 'reservas':
+            return exportacao.exportar_reservas(caminho, self._ger_res, incremental)
+        if tipo == 'incidentes':
+            return exportacao.exportar_incidentes(caminho, self._ger_res, incremental)
+        raise DadosInvalidosError(f"Tipo de exportação inválido: '{tipo}' (use {', '.join(exportacao.COLUNAS)}).")
+
+    def analisar_frota(self) -> AnaliticaFrota:
+        """Métricas de receita, utilização, descontos e avaliações sobre todo o histórico (ver analitica.py)."""
+        return AnaliticaFrota.de_gerenciadores(self._ger_res, self._ger_vei)
+
+    def totais_pagamentos(self) -> dict:
+        """Quantidade e valor pendentes/pagos e cauções em garantia, devolvidos e retidos (contadores, O(1))."""
+        return self._ger_res.totais_pagamentos()
+
+    def resumo_pagamentos(self) -> dict:
+        return {
+            'pendentes': self._ger_res.buscar_reservas(estados=(Reserva.PENDENTE,)),
+            'pagas': self._ger_res.buscar_reservas(estados=(Reserva.PAGA, Reserva.FINALIZADA)),
+        }
+
+    @staticmethod
+    def _estrategia(forma):
+        if forma not in FORMAS_PAGAMENTO:
+            raise DadosInvalidosError(f"Forma de pagamento inválida: '{forma}' "
+                                      f"(use {', '.join(FORMAS_PAGAMENTO)}).")
+        return FORMAS_PAGAMENTO[forma]()
@@ -0,0 +1,370 @@
+"""Servidor HTTP/JSON (asyncio, só biblioteca padrão) sobre a camada de serviço.
+
+Expõe as operações dos menus de administrador e de cliente como rotas REST.
+O laço de eventos só faz E/S de rede; cada operação de domínio roda num
+executor, então uma gravação lenta no repositório não trava as outras conexões.
+Uso (a partir da raiz do projeto):
+
+    python servidor.py [--host 127.0.0.1] [--porta 8080] [--sem-notificacoes]
+
+As reservas e pagamentos feitos pela API notificam o cliente como no menu
+(e-mail e SMS pelo despacho em segundo plano configurado em main.py).
+
+Rotas:
+    POST   /clientes                       {nome, cpf}
+    GET    /clientes
+    POST   /veiculos                       {modelo, placa, ano, valor}
+    GET    /veiculos                       (disponíveis)
+    GET    /veiculos/proximos?lat=&lon=&k=&raio=
+    GET    /veiculos/livres?inicio=dd/mm/aaaa&fim=dd/mm/aaaa
+    GET    /veiculos/{placa}
+    POST   /veiculos/{placa}/manutencoes   {descricao, data, custo}
+    GET    /veiculos/{placa}/incidentes
+    GET    /veiculos/{placa}/localizacao
+    GET    /veiculos/{placa}/agenda
+    GET    /localizacoes                   (frota inteira, consulta em lote ao GPS)
+    POST   /reservas                       {cpf, placa, dias, inicio?}
+    GET    /reservas?cpf=...
+    GET    /reservas/{id}
+    PATCH  /reservas/{id}                  {dias}
+    DELETE /reservas/{id}
+    GET    /reservas/{id}/cotacao?forma=&cupom=
+    POST   /reservas/{id}/pagamento        {forma, cupom?}
+    POST   /reservas/{id}/devolucao        {incidente?, nota?, comentario?}
+    POST   /reservas/{id}/incidentes       {descricao, data?}
+    GET    /cotacoes?placa=...&placa=...&dias=...&dias=...&forma=&cupom=
+    GET    /relatorios/frota
+    GET    /relatorios/pagamentos
+    GET    /relatorios/analitica
+    GET    /relatorios/manutencoes?inicio=dd/mm/aaaa&fim=dd/mm/aaaa&dias=   (padrão: último trimestre)
+"""
+import argparse
+import asyncio
+import json
+import re
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from http import HTTPStatus
+from urllib.parse import urlsplit, parse_qs
+from servicos import ServicoLocadora
+from validacoes import validar_data
+from manutencoes import INTERVALO_REVISAO_DIAS, ultimo_trimestre
+from exceptions import (AppError, ClienteNaoEncontradoError, VeiculoNaoEncontradoError,
+                        ReservaNaoEncontradaError, CpfJaCadastradoError, PlacaJaCadastradaError,
+                        VeiculoIndisponivelError, ReservaJaPagaError, ReservaNaoPagaError,
+                        ReservaFinalizadaError)
+
+TAMANHO_MAXIMO_CORPO = 1 << 20
+
+# Exceções de domínio -> status HTTP (as demais AppError viram 400)
+STATUS_POR_ERRO = (
+    ((ClienteNaoEncontradoError, VeiculoNaoEncontradoError, ReservaNaoEncontradaError), HTTPStatus.NOT_FOUND),
+    ((CpfJaCadastradoError, PlacaJaCadastradaError, VeiculoIndisponivelError,
+      ReservaJaPagaError, ReservaNaoPagaError, ReservaFinalizadaError), HTTPStatus.CONFLICT),
+)
+
+
+class ErroHttp(Exception):
+    def __init__(self, status, mensagem):
+        super().__init__(mensagem)
+        self.status = status
+
+
+# --- Conversão dos objetos de domínio para JSON ---
+
+def _cliente_json(c):
+    return {'nome': c.nome, 'cpf': c.cpf}
+
+def _veiculo_json(v):
+    return {'modelo': v.modelo, 'placa': v.placa, 'ano': v.ano, 'valor': v.valor, 'disponivel': v.disponivel}
+
+def _data_json(d):
+    return d.strftime('%d/%m/%Y')
+
+def _reserva_json(r):
+    return {'id': r.id, 'cpf': r.cpf, 'placa': r.placa, 'modelo': r.modelo, 'dias': r.dias,
+            'inicio': _data_json(r.inicio), 'fim': _data_json(r.fim),
+            'total': round(r.total, 2), 'caucao': round(r.deposito, 2), 'caucao_retido': r.caucao_retido,
+            'estado': r.estado, 'incidentes': list(r.incidentes)}
+
+
+def _campo(corpo, nome, tipo=str, obrigatorio=True):
+    valor = corpo.get(nome)
+    if valor is None:
+        if obrigatorio:
+            raise ErroHttp(HTTPStatus.BAD_REQUEST, f"Campo obrigatório ausente: '{nome}'.")
+        return None
+    try:
+        return tipo(valor)
+    except (TypeError, ValueError):
+        raise ErroHttp(HTTPStatus.BAD_REQUEST, f"Campo '{nome}' inválido.")
+
+
+def _data(texto):
+    # Datas da API no mesmo formato dos menus (dd/mm/aaaa)
+    return validar_data(texto).date()
+
+
+def _parametro(query, nome, tipo=str):
+    # Parâmetro opcional da query string (primeiro valor)
+    return _campo({nome: query[nome][0]} if nome in query else {}, nome, tipo, obrigatorio=False)
+
+
+class ServidorLocadora:
+    def __init__(self, servico=None, trabalhadores=8):
+        self._servico = servico or ServicoLocadora()
+        # Os gerenciadores são thread-safe: várias threads deixam operações que
+        # esperam pelo repositório (ex: fsync do diário) avançar juntas.
+        self._executor = ThreadPoolExecutor(max_workers=trabalhadores, thread_name_prefix='locadora')
+        self._rotas = []
+        s = self._servico
+        self._rota('POST', r'/clientes', lambda p, q, c: (HTTPStatus.CREATED, _cliente_json(
+            s.cadastrar_cliente(_campo(c, 'nome'), _campo(c, 'cpf')))))
+        self._rota('GET', r'/clientes', lambda p, q, c: [_cliente_json(x) for x in s.listar_clientes()])
+        self._rota('POST', r'/veiculos', lambda p, q, c: (HTTPStatus.CREATED, _veiculo_json(
+            s.cadastrar_veiculo(_campo(c, 'modelo'), _campo(c, 'placa'), _campo(c, 'ano'), _campo(c, 'valor')))))
+        self._rota('GET', r'/veiculos', lambda p, q, c: [_veiculo_json(v) for v in s.listar_disponiveis()])
+        self._rota('GET', r'/veiculos/proximos', self._veiculos_proximos)
+        self._rota('GET', r'/veiculos/livres', self._veiculos_livres)
+        self._rota('GET', r'/veiculos/(?P<placa>\w+)', self._detalhar_veiculo)
+        self._rota('POST', r'/veiculos/(?P<placa>\w+)/manutencoes', lambda p, q, c: (HTTPStatus.CREATED,
+            s.registrar_manutencao(p['placa'].upper(), _campo(c, 'descricao'), _campo(c, 'data'),
+                                   _campo(c, 'custo', float)).como_dict()))
+        self._rota('GET', r'/veiculos/(?P<placa>\w+)/incidentes', lambda p, q, c: [
+            dict(inc, cpf=r.cpf, reserva=r.id) for r, inc in s.incidentes_por_placa(p['placa'].upper())])
+        self._rota('GET', r'/veiculos/(?P<placa>\w+)/localizacao', lambda p, q, c: s.localizar_veiculo(
+            p['placa'].upper()))
+        self._rota('GET', r'/veiculos/(?P<placa>\w+)/agenda', lambda p, q, c: [
+            _reserva_json(r) for r in s.agenda_veiculo(p['placa'].upper())])
+        self._rota('GET', r'/localizacoes', lambda p, q, c: s.localizar_frota())
+        self._rota('POST', r'/reservas', lambda p, q, c: (HTTPStatus.CREATED, _reserva_json(
+            s.reservar(_campo(c, 'cpf'), _campo(c, 'placa').upper(), _campo(c, 'dias', int),
+                       _campo(c, 'inicio', _data, obrigatorio=False)))))
+        self._rota('GET', r'/reservas', self._listar_reservas)
+        self._rota('GET', r'/reservas/(?P<id>\d+)', lambda p, q, c: _reserva_json(s.buscar_reserva(int(p['id']))))
+        self._rota('PATCH', r'/reservas/(?P<id>\d+)', lambda p, q, c: _reserva_json(
+            s.modificar_reserva(int(p['id']), _campo(c, 'dias', int))))
+        self._rota('DELETE', r'/reservas/(?P<id>\d+)', lambda p, q, c: (
+            HTTPStatus.NO_CONTENT, s.cancelar_reserva(int(p['id']))))
+        self._rota('GET', r'/reservas/(?P<id>\d+)/cotacao', lambda p, q, c: s.detalhar_pagamento(
+            int(p['id']), _parametro(q, 'forma'), _parametro(q, 'cupom', str.upper)).como_dict())
+        self._rota('POST', r'/reservas/(?P<id>\d+)/pagamento', lambda p, q, c: {
+            'valor_pago': round(s.pagar(int(p['id']), _campo(c, 'forma'),
+                                        _campo(c, 'cupom', str.upper, obrigatorio=False)), 2)})
+        self._rota('POST', r'/reservas/(?P<id>\d+)/devolucao', lambda p, q, c: {
+            'caucao_retido': s.devolver(int(p['id']), _campo(c, 'incidente', obrigatorio=False),
+                                        _campo(c, 'nota', int, obrigatorio=False),
+                                        _campo(c, 'comentario', obrigatorio=False) or '')})
+        self._rota('POST', r'/reservas/(?P<id>\d+)/incidentes', lambda p, q, c: (HTTPStatus.CREATED,
+            s.relatar_incidente(int(p['id']), _campo(c, 'descricao'),
+                                _campo(c, 'data', obrigatorio=False) or datetime.now().strftime("%d/%m/%Y"))))
+        self._rota('GET', r'/cotacoes', self._comparar_precos)
+        self._rota('GET', r'/relatorios/frota', lambda p, q, c: s.estatisticas_frota())
+        self._rota('GET', r'/relatorios/pagamentos', lambda p, q, c: s.totais_pagamentos())
+        self._rota('GET', r'/relatorios/manutencoes', self._relatorio_manutencoes)
+        self._rota('GET', r'/relatorios/analitica', self._relatorio_analitica)
+
+    def _rota(self, metodo, padrao, tratador):
+        self._rotas.append((metodo, re.compile(padrao + r'/?'), tratador))
+
+    def _detalhar_veiculo(self, params, query, corpo):
+        veiculo = self._servico.buscar_veiculo(params['placa'].upper())
+        return dict(_veiculo_json(veiculo), manutencoes=[m.como_dict() for m in veiculo.manutencao])
+
+    def _veiculos_proximos(self, params, query, corpo):
+        parametros = {nome: valores[0] for nome, valores in query.items()}
+        proximos = self._servico.veiculos_proximos(
+            _campo(parametros, 'lat', float), _campo(parametros, 'lon', float),
+            _campo(parametros, 'k', int, obrigatorio=False),
+            _campo(parametros, 'raio', float, obrigatorio=False))
+        return [dict(_veiculo_json(v), distancia_km=round(d, 3)) for v, d in proximos]
+
+    def _veiculos_livres(self, params, query, corpo):
+        if 'inicio' not in query or 'fim' not in query:
+            raise ErroHttp(HTTPStatus.BAD_REQUEST, "Informe os parâmetros 'inicio' e 'fim' (dd/mm/aaaa).")
+        livres = self._servico.veiculos_livres(_data(query['inicio'][0]), _data(query['fim'][0]))
+        return [_veiculo_json(v) for v in livres]
+
+    def _relatorio_analitica(self, params, query, corpo):
+        resumo = self._servico.analisar_frota().resumo()
+        resumo['receita_por_mes'] = [{'mes': mes.strftime('%m/%Y'), 'receita': round(valor, 2)}
+                                     for mes, valor in resumo['receita_por_mes']]
+        return resumo
+
+    def _relatorio_manutencoes(self, params, query, corpo):
+        if ('inicio' in query) != ('fim' in query):
+            raise ErroHttp(HTTPStatus.BAD_REQUEST, "Informe 'inicio' e 'fim' juntos (dd/mm/aaaa).")
+        if 'inicio' in query:
+            inicio, fim = _data(query['inicio'][0]), _data(query['fim'][0])
+        else:
+            inicio, fim = ultimo_trimestre()
+        dias = _parametro(query, 'dias', int) or INTERVALO_REVISAO_DIAS
+        return {'inicio': _data_json(inicio), 'fim': _data_json(fim),
+                'custo': round(self._servico.custo_manutencoes(inicio, fim), 2),
+                'em_atraso': [v.placa for v in self._servico.veiculos_em_atraso(dias)]}
+
+    def _comparar_precos(self, params, query, corpo):
+        placas = [placa.upper() for placa in query.get('placa', [])]
+        try:
+            lista_dias = [int(dias) for dias in query.get('dias', [])]
+        except ValueError:
+            raise ErroHttp(HTTPStatus.BAD_REQUEST, "Parâmetro 'dias' inválido.")
+        if not placas or not lista_dias:
+            raise ErroHttp(HTTPStatus.BAD_REQUEST, "Informe ao menos um parâmetro 'placa' e um 'dias'.")
+        tabela = self._servico.comparar_precos(placas, lista_dias, _parametro(query, 'forma'),
+                                               _parametro(query, 'cupom', str.upper))
+        return {placa: {str(dias): round(total, 2) for dias, total in totais.items()}
+                for placa, totais in tabela.items()}
+
+    def _listar_reservas(self, params, query, corpo):
+        if 'cpf' not in query:
+            raise ErroHttp(HTTPStatus.BAD_REQUEST, "Informe o parâmetro 'cpf'.")
+        return [_reserva_json(r) for r in self._servico.reservas_do_cliente(query['cpf'][0])]
+
+    # --- Despacho ---
+
+    def _resolver(self, metodo, caminho):
+        metodo_errado = False
+        for metodo_rota, padrao, tratador in self._rotas:
+            encontrado = padrao.fullmatch(caminho)
+            if encontrado:
+                if metodo_rota == metodo:
+                    return tratador, encontrado.groupdict()
+                metodo_errado = True
+        if metodo_errado:
+            raise ErroHttp(HTTPStatus.METHOD_NOT_ALLOWED, "Método não suportado nesta rota.")
+        raise ErroHttp(HTTPStatus.NOT_FOUND, "Rota não encontrada.")
+
+    @staticmethod
+    def _executar(tratador, params, query, corpo):
+        # Roda no executor; converte o resultado/erro em (status, payload)
+        try:
+            resultado = tratador(params, query, corpo)
+        except ErroHttp as e:
+            return e.status, {'erro': str(e)}
+        except AppError as e:
+            for tipos, status in STATUS_POR_ERRO:
+                if isinstance(e, tipos):
+                    return status, {'erro': str(e), 'tipo': type(e).__name__}
+            return HTTPStatus.BAD_REQUEST, {'erro': str(e), 'tipo': type(e).__name__}
+        except Exception as e:
+            return HTTPStatus.INTERNAL_SERVER_ERROR, {'erro': f"Erro interno: {e}"}
+        if isinstance(resultado, tuple):
+            return resultado
+        return HTTPStatus.OK, resultado
+
+    async def despachar(self, metodo, alvo, corpo_bruto):
+        url = urlsplit(alvo)
+        try:
+            tratador, params = self._resolver(metodo, url.path)
+            corpo = json.loads(corpo_bruto) if corpo_bruto else {}
+            if not isinstance(corpo, dict):
+                raise ErroHttp(HTTPStatus.BAD_REQUEST, "O corpo deve ser um objeto JSON.")
+        except ErroHttp as e:
+            return e.status, {'erro': str(e)}
+        except ValueError:
+            return HTTPStatus.BAD_REQUEST, {'erro': "JSON inválido."}
+        laco = asyncio.get_running_loop()
+        return await laco.run_in_executor(self._executor, self._executar,
+                                          tratador, params, parse_qs(url.query), corpo)
+
+    async def atender(self, leitor, escritor):
+        try:
+            while True:
+                try:
+                    requisicao = await self._ler_requisicao(leitor)
+                except ErroHttp as e:
+                    # Requisição malformada: responde e fecha, pois o resto do fluxo não é confiável
+                    await self._responder(escritor, e.status, {'erro': str(e)}, False)
+                    break
+                if requisicao is None:
+                    break
+                metodo, alvo, corpo, manter = requisicao
+                status, payload = await self.despachar(metodo, alvo, corpo)
+                await self._responder(escritor, status, payload, manter)
+                if not manter:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            escritor.close()
+
+    @staticmethod
+    async def _ler_linha(leitor, status):
+        try:
+            return await leitor.readline()
+        except (ValueError, asyncio.LimitOverrunError): # linha maior que o limite do StreamReader
+            raise ErroHttp(status, "Linha da requisição grande demais.")
+
+    async def _ler_requisicao(self, leitor):
+        """(método, alvo, corpo, manter a conexão) da próxima requisição; None quando o cliente fecha."""
+        linha = await self._ler_linha(leitor, HTTPStatus.REQUEST_URI_TOO_LONG)
+        if not linha:
+            return None
+        try:
+            metodo, alvo, versao = linha.decode('latin-1').split()
+        except ValueError:
+            raise ErroHttp(HTTPStatus.BAD_REQUEST, "Requisição inválida.")
+
+        cabecalhos = {}
+        while True:
+            linha = await self._ler_linha(leitor, HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE)
+            if linha in (b'\r\n', b'\n', b''):
+                break
+            nome, _, valor = linha.decode('latin-1').partition(':')
+            cabecalhos[nome.strip().lower()] = valor.strip()
+
+        tamanho = cabecalhos.get('content-length') or '0'
+        if not (tamanho.isascii() and tamanho.isdigit()):
+            raise ErroHttp(HTTPStatus.BAD_REQUEST, "Content-Length inválido.")
+        tamanho = int(tamanho)
+        if tamanho > TAMANHO_MAXIMO_CORPO:
+            raise ErroHttp(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "Corpo muito grande.")
+        corpo = await leitor.readexactly(tamanho) if tamanho else b''
+
+        conexao = cabecalhos.get('connection', '').lower()
+        manter = conexao != 'close' if versao == 'HTTP/1.1' else conexao == 'keep-alive'
+        return metodo.upper(), alvo, corpo, manter
+
+    @staticmethod
+    async def _responder(escritor, status, payload, manter):
+        corpo = b'' if status == HTTPStatus.NO_CONTENT else json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        cabecalho = (f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+                     f"Content-Type: application/json; charset=utf-8\r\n"
+                     f"Content-Length: {len(corpo)}\r\n"
+                     f"Connection: {'keep-alive' if manter else 'close'}\r\n\r\n")
+        escritor.write(cabecalho.encode('latin-1') + corpo)
+        await escritor.drain()
+
+    async def iniciar(self, host='127.0.0.1', porta=8080):
+        return await asyncio.start_server(self.atender, host, porta)
+
+    def fechar(self):
+        self._executor.shutdown(wait=True)
+
+
+async def _servir(host, porta, notificar=True):
+    import main  # inicialização do sistema: repositório, cupons e dados de exemplo
+    if notificar:
+        main.usar_despacho()
+    servidor = ServidorLocadora(ServicoLocadora(main.ger_cli, main.ger_vei, main.ger_res,
+                                                notificar=notificar))
+    async with await servidor.iniciar(host, porta) as tcp:
+        print(f"AV Rental Car servindo em http://{host}:{porta}")
+        try:
+            await tcp.serve_forever()
+        finally:
+            servidor.fechar()
+
+
+if __name__ == '__main__':
+    argumentos = argparse.ArgumentParser(description="Servidor HTTP/JSON da locadora")
+    argumentos.add_argument('--host', default='127.0.0.1')
+    argumentos.add_argument('--porta', type=int, default=8080)
+    argumentos.add_argument('--sem-notificacoes', action='store_true',
+                            help="não envia as confirmações de reserva e pagamento aos clientes")
+    opcoes = argumentos.parse_args()
+    try:
+        asyncio.run(_servir(opcoes.host, opcoes.porta, not opcoes.sem_notificacoes))
+    except KeyboardInterrupt:
+        pass
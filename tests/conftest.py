@@ -0,0 +1,22 @@
+import os
+import sys
+import pytest
+
+# Os módulos do projeto ficam na raiz e são importados pelo nome (from clientes import ...)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def servico():
+    """ServicoLocadora sobre gerenciadores novos (os gerenciadores são Singletons), sem notificações."""
+    from clientes import GerenciarCliente, Singleton
+    from veiculos import GerenciarVeiculo
+    from reserva import Gerenciar_Reserva
+    from servicos import ServicoLocadora
+
+    classes = (GerenciarCliente, GerenciarVeiculo, Gerenciar_Reserva)
+    for classe in classes:
+        Singleton._instances.pop(classe, None)
+    yield ServicoLocadora(notificar=False)
+    for classe in classes:
+        Singleton._instances.pop(classe, None)
@@ -0,0 +1,63 @@
+import random
+from array import array
+from datetime import date, timedelta
+import pytest
+from analitica import AnaliticaFrota, ColunasReservas
+
+np = pytest.importorskip('numpy')
+
+PLACAS = [f"ANA{i:04d}" for i in range(12)]
+MODELOS = ['Fiat Mobi', 'Fiat Uno', 'Jeep Renegade'] * 4 # o último veículo de cada modelo fica sem reservas
+HOJE = date(2026, 6, 15)
+
+
+def _colunas(quantidade=3000):
+    sorteio = random.Random(24)
+    colunas = {campo: [] for campo, _ in ColunasReservas.CAMPOS}
+    for _ in range(quantidade):
+        dias = sorteio.randrange(0, 15)
+        total = dias * sorteio.choice([80.0, 95.5, 150.0])
+        estado = sorteio.choice([0, 1, 2, 2])
+        pago = estado > 0
+        colunas['veiculo'].append(sorteio.randrange(len(PLACAS) - 3))
+        colunas['inicio'].append((HOJE - timedelta(days=sorteio.randrange(-30, 400))).toordinal())
+        colunas['dias'].append(dias)
+        colunas['total'].append(total)
+        colunas['desconto_cupom'].append(sorteio.choice([0.0, 0.0, 50.0]) if pago else 0.0)
+        colunas['desconto_pagamento'].append(round(total * sorteio.choice([0.0, 0.05, 0.10]), 2) if pago else 0.0)
+        colunas['estado'].append(estado)
+        colunas['avaliacao'].append(sorteio.randrange(0, 6) if estado == 2 else 0)
+    return {campo: array(tipo, colunas[campo]) for campo, tipo in ColunasReservas.CAMPOS}
+
+
+def _metricas():
+    analitica = AnaliticaFrota(ColunasReservas(PLACAS, MODELOS, **_colunas()))
+    inicio, fim = date(2025, 9, 10), date(2026, 7, 1)
+    return {
+        'por_veiculo': analitica.utilizacao_por_veiculo(inicio, fim),
+        'por_modelo': analitica.utilizacao_por_modelo(inicio, fim),
+        'por_dia': analitica.receita_por_dia(inicio, fim),
+        'resumo': analitica.resumo(HOJE),
+        'avaliacoes': analitica.avaliacoes_por_veiculo(),
+    }
+
+
+def _aproximado(obtido, esperado):
+    """Compara estruturas aninhadas (dicts, listas, tuplas) com tolerância só nos floats."""
+    if isinstance(esperado, dict):
+        return obtido.keys() == esperado.keys() and all(_aproximado(obtido[k], esperado[k]) for k in esperado)
+    if isinstance(esperado, (list, tuple)):
+        return len(obtido) == len(esperado) and all(map(_aproximado, obtido, esperado))
+    if isinstance(esperado, float):
+        return obtido == pytest.approx(esperado)
+    return obtido == esperado
+
+
+def test_numpy_e_lacos_chegam_aos_mesmos_numeros(monkeypatch):
+    vetorizado = _metricas()
+    monkeypatch.setattr('analitica.np', None)
+    com_lacos = _metricas()
+    for nome, esperado in com_lacos.items():
+        assert _aproximado(vetorizado[nome], esperado), nome
+    assert vetorizado['por_veiculo'][PLACAS[-1]] == 0.0
+    assert vetorizado['resumo']['ticket']['pagas'] > 0
@@ -0,0 +1,92 @@
+from datetime import date, timedelta
+import pytest
+from calendario import AgendaFrota
+from exceptions import DadosInvalidosError, VeiculoIndisponivelError
+from reserva import Reserva
+
+D = [date(2030, 1, 1) + timedelta(days=i) for i in range(10)]
+
+
+def _frota(servico):
+    servico.cadastrar_cliente('Ana Souza', '11111111111')
+    servico.cadastrar_cliente('Bruno Lima', '22222222222')
+    servico.cadastrar_veiculo('Fiat Mobi', 'ABC1234', 2022, 95.5)
+
+
+def test_devolver_reserva_futura_nao_libera_veiculo_em_uso(servico):
+    _frota(servico)
+    hoje = date.today()
+    atual = servico.reservar('11111111111', 'ABC1234', 3)
+    futura = servico.reservar('22222222222', 'ABC1234', 2, inicio=hoje + timedelta(days=10))
+    servico.pagar(futura.id, 'pix')
+
+    servico.devolver(futura.id)
+    assert futura.estado == Reserva.FINALIZADA
+    assert not servico.buscar_veiculo('ABC1234').disponivel # continua com o cliente da reserva atual
+
+    servico.pagar(atual.id, 'pix')
+    servico.devolver(atual.id)
+    assert servico.buscar_veiculo('ABC1234').disponivel
+
+
+@pytest.mark.parametrize('inicio, fim, livre', [
+    (D[0], D[2], True),   # devolve no dia da retirada da outra
+    (D[5], D[7], True),   # retira no dia da devolução da outra
+    (D[1], D[3], False),  # cruza o começo
+    (D[4], D[6], False),  # cruza o fim
+    (D[3], D[4], False),  # dentro
+    (D[1], D[6], False),  # contém
+    (D[2], D[5], False),  # o mesmo período
+])
+def test_limites_do_periodo(inicio, fim, livre):
+    agenda = AgendaFrota()
+    agenda.reservar('ABC1234', D[2], D[5], 'existente')
+    assert agenda.livre('ABC1234', inicio, fim) is livre
+    assert ('ABC1234' not in agenda.ocupados(inicio, fim)) is livre
+    if livre:
+        agenda.reservar('ABC1234', inicio, fim, 'nova')
+    else:
+        with pytest.raises(VeiculoIndisponivelError):
+            agenda.reservar('ABC1234', inicio, fim, 'nova')
+
+
+def test_periodo_vazio_e_recusado():
+    with pytest.raises(DadosInvalidosError):
+        AgendaFrota().reservar('ABC1234', D[3], D[3], 'chave')
+
+
+def test_mover_ignora_o_proprio_periodo_mas_nao_os_vizinhos():
+    agenda = AgendaFrota()
+    agenda.reservar('ABC1234', D[0], D[2], 'a')
+    agenda.reservar('ABC1234', D[2], D[4], 'b')
+    agenda.reservar('ABC1234', D[6], D[8], 'c')
+    agenda.mover('b', D[2], D[6])  # estende até a retirada de 'c'
+    with pytest.raises(VeiculoIndisponivelError):
+        agenda.mover('b', D[2], D[7])
+    with pytest.raises(VeiculoIndisponivelError):
+        agenda.mover('b', D[1], D[4])
+    assert [(i, f, k) for i, f, k in agenda.periodos('ABC1234')] == [
+        (D[0], D[2], 'a'), (D[2], D[6], 'b'), (D[6], D[8], 'c')]
+
+
+def test_consulta_em_cache_acompanha_liberacao():
+    agenda = AgendaFrota()
+    agenda.reservar('ABC1234', D[2], D[5], 'a')
+    assert agenda.ocupados(D[4], D[6]) == {'ABC1234'}
+    agenda.liberar('a')
+    assert agenda.ocupados(D[4], D[6]) == frozenset()
+    agenda.reservar('ABC1234', D[5], D[6], 'b')
+    assert agenda.ocupados(D[4], D[6]) == {'ABC1234'}
+    assert agenda.ocupados(D[4], D[5]) == frozenset()
+
+
+def test_retirada_no_dia_da_devolucao_pela_camada_de_servico(servico):
+    _frota(servico)
+    hoje = date.today()
+    servico.reservar('11111111111', 'ABC1234', 3)
+    with pytest.raises(VeiculoIndisponivelError):
+        servico.reservar('22222222222', 'ABC1234', 2, inicio=hoje + timedelta(days=2))
+    seguinte = servico.reservar('22222222222', 'ABC1234', 2, inicio=hoje + timedelta(days=3))
+    assert seguinte.inicio == hoje + timedelta(days=3)
+    assert [v.placa for v in servico.veiculos_livres(hoje + timedelta(days=5), hoje + timedelta(days=6))] == ['ABC1234']
+    assert servico.veiculos_livres(hoje + timedelta(days=4), hoje + timedelta(days=6)) == []
@@ -0,0 +1,99 @@
+import pytest
+from clientes import Admin, AdminFactory, Cliente, ClienteFactory, GerenciarCliente
+from exceptions import CpfJaCadastradoError, DadosInvalidosError
+from persistencia import RepositorioSQLite
+
+
+@pytest.mark.parametrize('lote', [
+    [('Ana Souza', '11111111111'), ('Bruno Lima', '22222222222'), ('Ana Souza', '11111111111')],
+    [('Ana Souza', '11111111111'), ('Carla Dias', '99999999999')],
+])
+def test_lote_com_cpf_repetido_nao_cadastra_ninguem(servico, lote):
+    servico.cadastrar_cliente('Carla Dias', '99999999999')
+    ger_cli = GerenciarCliente()
+    with pytest.raises(CpfJaCadastradoError):
+        ger_cli.registrar_clientes(lote)
+    assert [c.cpf for c in ger_cli.clientes] == ['99999999999']
+    assert ger_cli.buscar_por_cpf('11111111111') is None
+    assert ger_cli.buscar_por_nome('Ana Souza') == []
+
+
+def test_lote_com_registro_invalido_nao_cadastra_ninguem(servico):
+    ger_cli = GerenciarCliente()
+    with pytest.raises(DadosInvalidosError, match='Registro 2'):
+        ger_cli.registrar_clientes([('Ana Souza', '11111111111'), ('Bruno Lima', '123')])
+    assert ger_cli.clientes == []
+
+
+def test_lote_valido_fica_visivel_de_uma_vez(servico):
+    ger_cli = GerenciarCliente()
+    novos = ger_cli.registrar_clientes([('Ana Souza', '11111111111'), ('Bruno Lima', '22222222222')])
+    assert [c.cpf for c in novos] == ['11111111111', '22222222222']
+    assert ger_cli.buscar_por_cpf('22222222222') is novos[1]
+    assert ger_cli.buscar_por_nome('  ana   SOUZA ') == [novos[0]]
+
+
+def test_lote_com_cpf_que_so_esta_no_repositorio(servico, tmp_path):
+    repositorio = RepositorioSQLite(str(tmp_path / 'locadora.db'))
+    repositorio.salvar_cliente(ClienteFactory().criar_usuario('Carla Dias', '99999999999'))
+    ger_cli = GerenciarCliente()
+    ger_cli.conectar_repositorio(repositorio) # os clientes gravados só entram nos índices sob demanda
+    with pytest.raises(CpfJaCadastradoError):
+        ger_cli.registrar_clientes([('Ana Souza', '11111111111'), ('Carla Dias', '99999999999')])
+    assert repositorio.buscar_cliente('11111111111') is None
+    assert [c.cpf for c in ger_cli.clientes] == ['99999999999']
+    repositorio.fechar()
+
+
+def test_gerenciador_e_inicializado_uma_vez_so(servico):
+    ger_cli = GerenciarCliente()
+    ger_cli.registrar_cliente('Ana Souza', '11111111111')
+    assert GerenciarCliente() is ger_cli
+    assert [c.cpf for c in GerenciarCliente().clientes] == ['11111111111']
+
+
+def _indices_conferem(ger_cli):
+    clientes = ger_cli.clientes
+    por_nome = {}
+    for cliente in clientes:
+        por_nome.setdefault(GerenciarCliente._normalizar_nome(cliente.nome), {})[cliente.cpf] = cliente
+    assert ger_cli._por_nome == por_nome
+    for ordenar_por, chave in GerenciarCliente.ORDENACOES.items():
+        assert ger_cli._ordenados[ordenar_por] == sorted(chave(c) for c in clientes)
+
+
+def test_indices_acompanham_cadastros_e_remocoes(servico):
+    ger_cli = GerenciarCliente()
+    ger_cli.registrar_clientes([('Ana Souza', '33333333333'), ('ana  souza', '11111111111'),
+                                ('Bruno Lima', '22222222222')])
+    ger_cli.registrar_cliente('Carla Dias', '44444444444')
+    _indices_conferem(ger_cli)
+    assert sorted(c.cpf for c in ger_cli.buscar_por_nome('ANA SOUZA')) == ['11111111111', '33333333333']
+
+    assert ger_cli.remover_cliente('33333333333').cpf == '33333333333'
+    assert ger_cli.remover_cliente('33333333333') is None
+    ger_cli.remover_cliente('22222222222')
+    _indices_conferem(ger_cli)
+    assert ger_cli.buscar_por_cpf('33333333333') is None
+    assert [c.cpf for c in ger_cli.buscar_por_nome('Ana Souza')] == ['11111111111']
+    assert ger_cli.buscar_por_nome('Bruno Lima') == []
+    assert [c.cpf for c in ger_cli.consultar(ordenar_por='cpf')] == ['11111111111', '44444444444']
+
+
+def test_clone_nao_compartilha_estado_com_o_prototipo():
+    fabrica = ClienteFactory()
+    ana = fabrica.criar_usuario('Ana Souza', '11111111111')
+    bruno = fabrica.criar_usuario('Bruno Lima', '22222222222')
+    ana.nome = 'Ana Lima'
+    assert (bruno.nome, bruno.cpf) == ('Bruno Lima', '22222222222')
+    assert (fabrica._prototype.nome, fabrica._prototype.cpf) == ('', '')
+    assert type(ana) is Cliente and not hasattr(ana, '__dict__')
+    assert ana.permissoes is Cliente.permissoes
+
+    admin = Admin('Carla Dias', '33333333333', cargo='Gerente', nivel_acesso=3)
+    copia = admin.clone()
+    copia.nome = 'Outra'
+    copia.nivel_acesso = 1
+    assert (admin.nome, admin.cargo, admin.nivel_acesso) == ('Carla Dias', 'Gerente', 3)
+    assert (copia.cpf, copia.cargo) == ('33333333333', 'Gerente')
+    assert AdminFactory().criar_usuario('Davi', '44444444444').nivel_acesso == 1
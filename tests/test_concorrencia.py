@@ -0,0 +1,84 @@
+import sys
+import threading
+from datetime import date, timedelta
+import pytest
+from cupons import CatalogoCupons
+from exceptions import CupomInvalidoError, VeiculoIndisponivelError
+from persistencia import RepositorioSQLite
+from veiculos import VeiculoBuilder
+
+THREADS = 16
+
+
+@pytest.fixture(autouse=True)
+def trocas_frequentes():
+    # Troca de thread a cada poucos microssegundos: as corridas aparecem bem mais
+    anterior = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    yield
+    sys.setswitchinterval(anterior)
+
+
+def _em_paralelo(funcao):
+    """Roda funcao(i) em THREADS threads liberadas juntas; devolve [(resultado, erro)] por thread."""
+    largada = threading.Barrier(THREADS)
+    resultados = [None] * THREADS
+
+    def rodar(i):
+        largada.wait()
+        try:
+            resultados[i] = (funcao(i), None)
+        except Exception as e:
+            resultados[i] = (None, e)
+    threads = [threading.Thread(target=rodar, args=(i,)) for i in range(THREADS)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return resultados
+
+
+def test_ocupar_so_tem_um_vencedor():
+    for rodada in range(50):
+        veiculo = VeiculoBuilder().com_modelo('Fiat Mobi').com_placa(f"CAS{rodada:04d}").com_ano('2022').com_valor(95.5).build()
+        resultados = _em_paralelo(lambda i: veiculo.ocupar())
+        assert [r for r, _ in resultados].count(True) == 1
+        assert not veiculo.disponivel
+
+
+@pytest.mark.parametrize('dias_ate_retirada', [0, 7])
+def test_reservas_simultaneas_do_mesmo_carro(servico, dias_ate_retirada):
+    for i in range(THREADS):
+        servico.cadastrar_cliente('Cliente Teste', f"{i:011d}")
+    servico.cadastrar_veiculo('Fiat Mobi', 'ABC1234', 2022, 95.5)
+    inicio = date.today() + timedelta(days=dias_ate_retirada)
+
+    resultados = _em_paralelo(lambda i: servico.reservar(f"{i:011d}", 'ABC1234', 3, inicio=inicio))
+    reservas = [r for r, erro in resultados if erro is None]
+    erros = [erro for _, erro in resultados if erro is not None]
+    assert len(reservas) == 1
+    assert all(isinstance(erro, VeiculoIndisponivelError) for erro in erros)
+    assert len(servico.agenda_veiculo('ABC1234')) == 1
+    assert servico.buscar_veiculo('ABC1234').disponivel == (dias_ate_retirada > 0)
+
+
+def test_resgates_simultaneos_respeitam_o_limite_de_usos(tmp_path):
+    caminho = str(tmp_path / 'locadora.db')
+    repositorio = RepositorioSQLite(caminho)
+    catalogo = CatalogoCupons()
+    catalogo.conectar_repositorio(repositorio)
+    catalogo.adicionar('PROMO', 'perc', 0.1, limite_usos=5)
+
+    resultados = _em_paralelo(lambda i: catalogo.resgatar('PROMO'))
+    erros = [erro for _, erro in resultados if erro is not None]
+    assert len(erros) == THREADS - 5
+    assert all(isinstance(erro, CupomInvalidoError) for erro in erros)
+    assert catalogo.buscar('PROMO').usos == 5
+
+    # Estornos concorrentes também não se perdem, nem no repositório
+    _em_paralelo(lambda i: catalogo.estornar('PROMO') if i < 3 else None)
+    repositorio.fechar()
+    repositorio = RepositorioSQLite(caminho)
+    cupom, = repositorio.carregar_cupons()
+    repositorio.fechar()
+    assert cupom.usos == 2
@@ -0,0 +1,43 @@
+import pytest
+from cotacao import MotorCotacao
+from reserva import FORMAS_PAGAMENTO
+from servicos import ServicoLocadora
+
+CUPONS = {'FERIAS50': ('fixo', 50.00)}
+
+
+@pytest.mark.parametrize('dias', [3, 7, 10])
+def test_pagamento_mostra_os_mesmos_itens_da_cotacao(servico, dias):
+    servico = ServicoLocadora(cupons=CUPONS, notificar=False)
+    servico.cadastrar_cliente('Ana Souza', '11111111111')
+    servico.cadastrar_veiculo('Fiat Mobi', 'ABC1234', 2022, 95.5)
+    cotacao = servico.cotar('ABC1234', dias, forma='pix', cupom='FERIAS50')
+    reserva = servico.reservar('11111111111', 'ABC1234', dias)
+
+    pagamento = servico.detalhar_pagamento(reserva.id, forma='pix', cupom='FERIAS50')
+    assert pagamento.como_dict() == cotacao.como_dict()
+    assert (pagamento.desconto_longa_duracao > 0) == (dias >= 7)
+    assert servico.pagar(reserva.id, 'pix', cupom='FERIAS50') == pytest.approx(cotacao.total)
+
+
+def test_cache_separa_as_cotacoes_por_estrategia_e_cupom():
+    motor = MotorCotacao()
+    cupons = dict(CUPONS)
+    sem_forma = motor.cotar(100.0, 3, 'FERIAS50', None, cupons)
+    por_forma = {forma: motor.cotar(100.0, 3, 'FERIAS50', classe(), cupons)
+                 for forma, classe in FORMAS_PAGAMENTO.items()}
+    assert motor.acertos == 0
+    assert por_forma['pix'].total == pytest.approx((300 - 50) * 0.95 + 250)
+    assert por_forma['avista'].total == pytest.approx((300 - 50) * 0.90 + 250)
+    assert sem_forma.total == pytest.approx(300 - 50 + 250)
+
+    # Uma nova instância da mesma estratégia reaproveita a cotação
+    assert motor.cotar(100.0, 3, 'FERIAS50', FORMAS_PAGAMENTO['pix'](), cupons) is por_forma['pix']
+    assert motor.acertos == 1
+    # O cupom mudou de valor: a cotação antiga não serve mais
+    cupons['FERIAS50'] = ('perc', 0.20)
+    pix = motor.cotar(100.0, 3, 'FERIAS50', FORMAS_PAGAMENTO['pix'](), cupons)
+    assert pix.total == pytest.approx(300 * 0.8 * 0.95 + 250)
+    assert motor.acertos == 1
+    motor.limpar_cache()
+    assert motor.cotar(100.0, 3, 'FERIAS50', FORMAS_PAGAMENTO['pix'](), cupons) is not pix
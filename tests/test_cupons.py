@@ -0,0 +1,34 @@
+import pytest
+from cupons import Cupom
+from diario import RepositorioDiario
+from persistencia import RepositorioSQLite
+
+
+@pytest.fixture(params=['sqlite', 'diario'])
+def abrir(request, tmp_path):
+    """Abre (ou reabre, fechando o anterior) sempre o mesmo repositório do backend do parâmetro."""
+    abertos = []
+
+    def abrir():
+        if abertos:
+            abertos.pop().fechar()
+        if request.param == 'sqlite':
+            repositorio = RepositorioSQLite(str(tmp_path / 'locadora.db'))
+        else:
+            repositorio = RepositorioDiario(tmp_path / 'diario', sincronizar=False)
+        abertos.append(repositorio)
+        return repositorio
+    yield abrir
+    for repositorio in abertos:
+        repositorio.fechar()
+
+
+def test_repositorio_so_e_novo_na_criacao(abrir):
+    repositorio = abrir()
+    assert repositorio.novo
+    repositorio.salvar_cupom(Cupom('BEMVINDO15', 'perc', 0.15))
+    repositorio.remover_cupom('BEMVINDO15') # o operador apagou todos os cupons
+
+    repositorio = abrir()
+    assert not repositorio.novo
+    assert list(repositorio.carregar_cupons()) == []
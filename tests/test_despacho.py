@@ -0,0 +1,112 @@
+import threading
+from benchmarks.notificacoes import SenderLento
+from despacho import DespachanteAssincrono, EnvioAgrupado, BaldeDeFichas
+from reserva import INotificationSender
+
+
+class _SenderInstavel(INotificationSender):
+    """Usa o send_batch padrão (um envio por vez); cada mensagem em 'falhas' falha essa quantidade de vezes."""
+    def __init__(self, falhas):
+        self._falhas = dict(falhas)
+        self._trava = threading.Lock()
+        self.recebidas = []
+
+    def send(self, message, destinatario=None):
+        with self._trava:
+            if self._falhas.get(message, 0) > 0:
+                self._falhas[message] -= 1
+                raise ConnectionError("provedor indisponível")
+            self.recebidas.append(message)
+
+
+def _despachar(sender, mensagens, tentativas=3):
+    despachante = DespachanteAssincrono(sender, trabalhadores=1, tamanho_lote=50,
+                                        tentativas=tentativas, espera_inicial=0.001)
+    for mensagem in mensagens:
+        despachante.send(mensagem)
+    despachante.fechar()
+    return despachante
+
+
+def test_repeticao_nao_reenvia_mensagens_ja_entregues():
+    mensagens = [f"m{i}" for i in range(20)]
+    sender = _SenderInstavel({'m5': 2, 'm12': 1})
+    despachante = _despachar(sender, mensagens)
+    assert sorted(sender.recebidas) == sorted(mensagens)
+    assert len(sender.recebidas) == len(set(sender.recebidas))
+    assert (despachante.enviadas, despachante.falhas, despachante.repeticoes) == (20, 0, 3)
+
+
+def test_mensagem_que_sempre_falha_nao_derruba_as_outras():
+    mensagens = [f"m{i}" for i in range(10)]
+    sender = _SenderInstavel({'m3': 99})
+    despachante = _despachar(sender, mensagens)
+    assert sender.recebidas == [m for m in mensagens if m != 'm3']
+    assert (despachante.enviadas, despachante.falhas) == (9, 1)
+
+
+def test_lote_atomico_e_repetido_inteiro_uma_vez():
+    sender = SenderLento(atraso=0, falhas=2)
+    despachante = _despachar(sender, [f"m{i}" for i in range(5)])
+    assert sorted(sender.recebidas) == [f"m{i}" for i in range(5)]
+    assert (despachante.enviadas, despachante.falhas) == (5, 0)
+
+
+def test_lote_atomico_perdido_conta_cada_mensagem():
+    sender = SenderLento(atraso=0, falhas=99)
+    despachante = _despachar(sender, [f"m{i}" for i in range(5)], tentativas=2)
+    assert sender.recebidas == []
+    assert (despachante.enviadas, despachante.falhas) == (0, 5)
+
+
+class _SenderRegistro(INotificationSender):
+    def __init__(self):
+        self.recebidas = []
+
+    def send(self, message, destinatario=None):
+        self.recebidas.append((destinatario, message))
+
+
+def test_mensagens_do_mesmo_destinatario_saem_num_resumo():
+    sender = _SenderRegistro()
+    agrupado = EnvioAgrupado(sender, janela=60, taxa=None)
+    for i in range(3):
+        agrupado.send(f"ana {i}", 'ana@x')
+    agrupado.send("bruno", 'bruno@x')
+    agrupado.send("avulsa")
+    agrupado.esvaziar()
+    assert sender.recebidas[0] == (None, "avulsa") # sem destinatário não espera a janela
+    resumos = dict(sender.recebidas[1:])
+    assert resumos['bruno@x'] == "bruno"
+    assert resumos['ana@x'].startswith("Você tem 3 novidades")
+    assert all(f"{i + 1}) ana {i}" in resumos['ana@x'] for i in range(3))
+    assert (agrupado.recebidas, agrupado.enviadas, agrupado.economizadas) == (5, 3, 2)
+
+    agrupado.send("ana depois", 'ana@x') # a janela anterior já fechou: abre outra
+    agrupado.fechar()
+    assert sender.recebidas[-1] == ('ana@x', "ana depois")
+    assert agrupado.pendentes == 0
+
+
+def test_balde_de_fichas_limita_a_vazao(monkeypatch):
+    agora = [100.0]
+    monkeypatch.setattr('despacho.time.monotonic', lambda: agora[0])
+    balde = BaldeDeFichas(taxa=2, capacidade=3)
+    assert [balde.tentar() for _ in range(3)] == [0.0] * 3 # a rajada
+    assert balde.tentar() == 0.5
+    agora[0] += 0.25
+    assert balde.tentar() == 0.25
+    agora[0] += 0.25
+    assert balde.tentar() == 0.0
+    agora[0] += 60 # as fichas não passam da capacidade
+    assert [balde.tentar() for _ in range(4)] == [0.0, 0.0, 0.0, 0.5]
+
+
+def test_envio_agrupado_espera_por_fichas_acima_da_taxa():
+    sender = _SenderRegistro()
+    agrupado = EnvioAgrupado(sender, janela=0, taxa=200, rajada=2)
+    for i in range(6):
+        agrupado.send(f"m{i}")
+    agrupado.fechar()
+    assert [m for _, m in sender.recebidas] == [f"m{i}" for i in range(6)]
+    assert 0 < agrupado.limitadas <= 4 # a rajada de 2 sai sem esperar
@@ -0,0 +1,144 @@
+import os
+import threading
+import pytest
+from cupons import Cupom
+from diario import RepositorioDiario, ARQUIVO_DIARIO
+
+
+def _codigos(repositorio):
+    return sorted(c.codigo for c in repositorio.carregar_cupons())
+
+
+def _cortar_ultima_linha(diretorio, bytes_mantidos):
+    caminho = os.path.join(diretorio, ARQUIVO_DIARIO)
+    with open(caminho, 'rb+') as f:
+        linhas = f.read().splitlines(keepends=True)
+        f.truncate(sum(map(len, linhas[:-1])) + bytes_mantidos)
+
+
+def test_linha_incompleta_e_cortada_na_recuperacao(tmp_path):
+    repositorio = RepositorioDiario(tmp_path, sincronizar=False)
+    repositorio.salvar_cupom(Cupom('A', 'fixo', 10))
+    repositorio.salvar_cupom(Cupom('QUEDA', 'fixo', 10))
+    repositorio.fechar()
+    _cortar_ultima_linha(tmp_path, 7) # queda no meio da gravação do segundo evento
+
+    repositorio = RepositorioDiario(tmp_path, sincronizar=False)
+    assert _codigos(repositorio) == ['A']
+    repositorio.salvar_cupom(Cupom('B', 'fixo', 10))
+    repositorio.salvar_cupom(Cupom('C', 'fixo', 10))
+    repositorio.fechar()
+
+    repositorio = RepositorioDiario(tmp_path, sincronizar=False)
+    assert _codigos(repositorio) == ['A', 'B', 'C']
+    repositorio.fechar()
+
+
+def test_linha_sem_quebra_final_nao_e_aplicada(tmp_path):
+    repositorio = RepositorioDiario(tmp_path, sincronizar=False)
+    repositorio.salvar_cupom(Cupom('A', 'fixo', 10))
+    repositorio.salvar_cupom(Cupom('B', 'fixo', 10))
+    repositorio.fechar()
+    caminho = os.path.join(tmp_path, ARQUIVO_DIARIO)
+    with open(caminho, 'rb+') as f:
+        f.truncate(os.path.getsize(caminho) - 1) # JSON completo, mas sem o '\n'
+
+    repositorio = RepositorioDiario(tmp_path, sincronizar=False)
+    repositorio.salvar_cupom(Cupom('C', 'fixo', 10))
+    repositorio.fechar()
+    repositorio = RepositorioDiario(tmp_path, sincronizar=False)
+    assert _codigos(repositorio) == ['A', 'C']
+    repositorio.fechar()
+
+
+class _ArquivoComDefeito:
+    def write(self, texto):
+        raise OSError(28, "No space left on device")
+
+    def close(self):
+        pass
+
+
+def test_falha_de_gravacao_chega_a_quem_espera(tmp_path):
+    repositorio = RepositorioDiario(tmp_path, sincronizar=False)
+    repositorio.salvar_cupom(Cupom('A', 'fixo', 10))
+    repositorio._arquivo.close()
+    repositorio._arquivo = _ArquivoComDefeito()
+
+    erros = []
+
+    def publicar(codigo):
+        try:
+            repositorio.salvar_cupom(Cupom(codigo, 'fixo', 10))
+        except OSError as e:
+            erros.append(e)
+    threads = [threading.Thread(target=publicar, args=(f"C{i}",)) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(timeout=5)
+    assert not any(t.is_alive() for t in threads)
+    assert len(erros) == 8
+    with pytest.raises(OSError):
+        repositorio.salvar_cupom(Cupom('DEPOIS', 'fixo', 10))
+    with pytest.raises(OSError):
+        repositorio.compactar()
+    repositorio.fechar()
+
+    repositorio = RepositorioDiario(tmp_path, sincronizar=False)
+    assert _codigos(repositorio) == ['A']
+    repositorio.fechar()
+
+
+def test_compactar_durante_gravacoes_nao_perde_eventos(tmp_path):
+    repositorio = RepositorioDiario(tmp_path, sincronizar=False)
+    parar = threading.Event()
+
+    def compactar():
+        while not parar.is_set():
+            repositorio.compactar()
+    compactador = threading.Thread(target=compactar)
+    compactador.start()
+
+    def publicar(inicio):
+        for i in range(inicio, inicio + 200):
+            repositorio.salvar_cupom(Cupom(f"C{i}", 'fixo', 10))
+    threads = [threading.Thread(target=publicar, args=(k * 200,)) for k in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    parar.set()
+    compactador.join()
+    repositorio.fechar()
+
+    repositorio = RepositorioDiario(tmp_path, sincronizar=False)
+    assert _codigos(repositorio) == sorted(f"C{i}" for i in range(800))
+    repositorio.fechar()
+
+
+def test_snapshot_e_gravado_sem_segurar_a_trava_do_diario(tmp_path, monkeypatch):
+    repositorio = RepositorioDiario(tmp_path, sincronizar=False)
+    repositorio.salvar_cupom(Cupom('ANTES', 'fixo', 10))
+    gravar_snapshot = repositorio._gravar_snapshot
+    durante = []
+
+    def gravar(snapshot):
+        # Outra thread publica enquanto o snapshot é gravado: só espera a gravação terminar
+        t = threading.Thread(target=repositorio.salvar_cupom, args=(Cupom('DURANTE', 'fixo', 10),))
+        t.start()
+        durante.append(t)
+        livre = repositorio._cond.acquire(timeout=5)
+        if livre:
+            repositorio._cond.release()
+        assert livre
+        gravar_snapshot(snapshot)
+    monkeypatch.setattr(repositorio, '_gravar_snapshot', gravar)
+    repositorio.compactar()
+    durante[0].join(timeout=5)
+    assert not durante[0].is_alive()
+    repositorio.fechar()
+
+    repositorio = RepositorioDiario(tmp_path, sincronizar=False)
+    assert _codigos(repositorio) == ['ANTES', 'DURANTE']
+    repositorio.fechar()
@@ -0,0 +1,111 @@
+import json
+from datetime import date, timedelta
+import pytest
+from clientes import GerenciarCliente, Singleton
+from veiculos import GerenciarVeiculo
+from reserva import Gerenciar_Reserva
+from servicos import ServicoLocadora
+from diario import RepositorioDiario
+from persistencia import RepositorioSQLite
+from paginacao import TAMANHO_BLOCO
+
+# Mais de um bloco de leitura, para passar pela continuação do cursor
+FINALIZADAS = TAMANHO_BLOCO + 20
+MANUTENCOES = TAMANHO_BLOCO + 5
+PLACAS = [f"EXP{i:04d}" for i in range(10)]
+
+
+@pytest.fixture(params=['sqlite', 'diario'])
+def repositorio(request, tmp_path, servico):
+    if request.param == 'sqlite':
+        repositorio = RepositorioSQLite(str(tmp_path / 'locadora.db'))
+    else:
+        repositorio = RepositorioDiario(tmp_path / 'diario', sincronizar=False)
+    yield repositorio
+    repositorio.fechar()
+
+
+def _nova_execucao(repositorio):
+    """Gerenciadores novos ligados ao repositório, como numa nova execução do programa."""
+    for classe in (GerenciarCliente, GerenciarVeiculo, Gerenciar_Reserva):
+        Singleton._instances.pop(classe, None)
+    servico = ServicoLocadora(notificar=False)
+    for gerenciador in (servico._ger_cli, servico._ger_vei, servico._ger_res):
+        gerenciador.conectar_repositorio(repositorio)
+    return servico
+
+
+def _historico(repositorio):
+    """Uma execução anterior: reservas finalizadas (algumas com incidente), duas pendentes e manutenções."""
+    servico = _nova_execucao(repositorio)
+    servico.cadastrar_cliente('Ana Souza', '11111111111')
+    for placa in PLACAS:
+        servico.cadastrar_veiculo('Fiat Mobi', placa, 2022, 100)
+    for i in range(FINALIZADAS):
+        inicio = date.today() + timedelta(days=2 * (i // len(PLACAS)))
+        reserva = servico.reservar('11111111111', PLACAS[i % len(PLACAS)], 1, inicio=inicio)
+        servico.pagar(reserva.id, 'pix')
+        servico.devolver(reserva.id, incidente='Arranhão' if i % 50 == 0 else None)
+    fim = date.today() + timedelta(days=2 * (FINALIZADAS // len(PLACAS) + 1))
+    pendentes = [servico.reservar('11111111111', placa, 1, inicio=fim).id for placa in PLACAS[:2]]
+    for i in range(MANUTENCOES):
+        servico.registrar_manutencao(PLACAS[i % len(PLACAS)], 'Troca de óleo', '05/01/2026', 50)
+    return pendentes
+
+
+def _ler(caminho):
+    with open(caminho, encoding='utf-8') as f:
+        return [json.loads(linha) for linha in f]
+
+
+def test_exportacao_le_o_historico_do_repositorio_sem_carrega_lo(repositorio, tmp_path):
+    _historico(repositorio)
+    servico = _nova_execucao(repositorio)
+    ger_res = servico._ger_res
+    em_memoria = len(ger_res._reservas) # só as pendentes entram nos índices na conexão
+
+    servico.exportar('reservas', str(tmp_path / 'reservas.jsonl'))
+    servico.exportar('incidentes', str(tmp_path / 'incidentes.jsonl'))
+    servico.exportar('manutencoes', str(tmp_path / 'manutencoes.jsonl'))
+
+    reservas = _ler(tmp_path / 'reservas.jsonl')
+    assert sorted(r['id'] for r in reservas) == list(range(1, FINALIZADAS + 3))
+    assert [r['versao'] for r in reservas] == sorted(r['versao'] for r in reservas)
+    assert len(_ler(tmp_path / 'incidentes.jsonl')) == len(range(0, FINALIZADAS, 50))
+    manutencoes = _ler(tmp_path / 'manutencoes.jsonl')
+    assert len(manutencoes) == MANUTENCOES
+    assert [m['versao'] for m in manutencoes] == sorted(m['versao'] for m in manutencoes)
+    assert not ger_res._historico_carregado
+    assert len(ger_res._reservas) == em_memoria
+    assert servico._ger_vei._indice_manutencoes is None
+
+
+def test_exportacao_incremental_intercala_memoria_e_repositorio(repositorio, tmp_path):
+    pendentes = _historico(repositorio)
+    servico = _nova_execucao(repositorio)
+    caminho = str(tmp_path / 'reservas.jsonl')
+    assert servico.exportar('reservas', caminho, incremental=True).exportados == FINALIZADAS + 2
+    assert servico.exportar('manutencoes', str(tmp_path / 'manutencoes.jsonl'), incremental=True).exportados \
+        == MANUTENCOES
+
+    servico.pagar(pendentes[1], 'pix')
+    servico.registrar_manutencao(PLACAS[3], 'Alinhamento', '06/01/2026', 80)
+    assert servico.exportar('reservas', caminho, incremental=True).exportados == 1
+    assert [r['id'] for r in _ler(caminho)] == [pendentes[1]]
+    servico.exportar('manutencoes', str(tmp_path / 'manutencoes.jsonl'), incremental=True)
+    assert [m['descricao'] for m in _ler(tmp_path / 'manutencoes.jsonl')] == ['Alinhamento']
+
+
+def test_reserva_alterada_vai_para_o_fim_do_indice_de_versoes(servico):
+    servico.cadastrar_cliente('Ana Souza', '11111111111')
+    servico.cadastrar_veiculo('Fiat Mobi', 'ABC1234', 2022, 100)
+    inicio = date.today() + timedelta(days=10)
+    ids = [servico.reservar('11111111111', 'ABC1234', 2, inicio=inicio + timedelta(days=3 * i)).id for i in range(3)]
+    ger_res = servico._ger_res
+    marca = servico.buscar_reserva(ids[2]).versao
+
+    servico.pagar(ids[0], 'pix')
+    servico.cancelar_reserva(ids[1])
+    assert [r.id for r in ger_res.reservas_alteradas()] == [ids[2], ids[0]]
+    assert [r.id for r in ger_res.reservas_alteradas(marca)] == [ids[0]]
+    assert ger_res._por_versao == sorted((r.versao, r.id) for r in ger_res.reservas)
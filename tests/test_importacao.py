@@ -0,0 +1,52 @@
+import json
+from clientes import GerenciarCliente
+from veiculos import GerenciarVeiculo
+from importacao import importar_clientes, importar_veiculos, ler_registros
+
+
+def test_importacao_de_clientes_rejeita_linha_a_linha(servico, tmp_path):
+    servico.cadastrar_cliente('Carla Dias', '99999999999')
+    caminho = tmp_path / 'clientes.csv'
+    caminho.write_text('nome,cpf\n'
+                       'Ana Souza,11111111111\n'
+                       'Bruno Lima,123\n'
+                       'Carla Dias,99999999999\n'
+                       'Davi Alves,22222222222\n'
+                       ',33333333333\n'
+                       'Ana Repetida,11111111111\n'
+                       'Eva Rocha,22222222222\n', encoding='utf-8')
+
+    resultado = importar_clientes(str(caminho), tamanho_lote=2)
+    assert resultado.importados == 2
+    # O repetido do lote anterior já está cadastrado; o do mesmo lote é barrado na gravação
+    assert [linha for linha, _ in resultado.rejeitados] == [3, 4, 6, 7, 8]
+    assert sorted(c.cpf for c in GerenciarCliente().clientes) == ['11111111111', '22222222222', '99999999999']
+
+
+def test_importacao_de_veiculos_grava_em_lotes_enquanto_le(servico, tmp_path, monkeypatch):
+    caminho = tmp_path / 'frota.jsonl'
+    linhas = [json.dumps({'modelo': 'fiat mobi', 'placa': f"imp{i:04d}", 'ano': 2022, 'valor': '99,90'})
+              for i in range(7)]
+    linhas[3] = '{"modelo": "gol", "placa":'
+    caminho.write_text('\n'.join(linhas[:5]) + '\n\n' + '\n'.join(linhas[5:]) + '\n', encoding='utf-8')
+
+    ger_vei = GerenciarVeiculo()
+    lidas, lotes = [], []
+    def ler(caminho):
+        for numero, registro in ler_registros(caminho):
+            lidas.append(numero)
+            yield numero, registro
+    def adicionar(veiculos):
+        lotes.append((len(lidas), [v.placa for v in veiculos]))
+        return GerenciarVeiculo.adicionar_veiculos(ger_vei, veiculos)
+    monkeypatch.setattr('importacao.ler_registros', ler)
+    monkeypatch.setattr(ger_vei, 'adicionar_veiculos', adicionar)
+
+    resultado = importar_veiculos(str(caminho), ger_vei, tamanho_lote=2)
+    assert resultado.importados == 6
+    assert resultado.rejeitados[0][0] == 4
+    # Cada lote é gravado logo depois de lido (registros lidos até ali), antes dos seguintes
+    assert lotes == [(2, ['IMP0000', 'IMP0001']), (5, ['IMP0002', 'IMP0004']),
+                     (7, ['IMP0005', 'IMP0006'])]
+    veiculo = ger_vei.buscar_por_placa('IMP0006')
+    assert (veiculo.modelo, veiculo.ano, veiculo.valor) == ('Fiat Mobi', '2022', 99.9)
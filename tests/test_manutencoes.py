@@ -0,0 +1,102 @@
+import random
+from datetime import date, timedelta
+import pytest
+from exceptions import DadosInvalidosError
+from manutencoes import IndiceManutencoes, RegistroManutencao, ultimo_trimestre
+
+PLACAS = [f"MAN{i:04d}" for i in range(8)]
+INICIO = date(2024, 1, 1)
+
+
+@pytest.fixture
+def registros():
+    """(placa, registro) sorteados em dois anos; o último veículo nunca teve manutenção."""
+    sorteio = random.Random(22)
+    return [(sorteio.choice(PLACAS[:-1]),
+             RegistroManutencao(INICIO + timedelta(days=sorteio.randrange(730)), 'Revisão',
+                                round(sorteio.uniform(50, 900), 2)))
+            for _ in range(400)]
+
+
+@pytest.fixture
+def indice(registros):
+    indice = IndiceManutencoes()
+    for placa in PLACAS:
+        indice.adicionar_veiculo(placa)
+    for placa, registro in registros:
+        indice.incluir(placa, registro)
+    return indice
+
+
+def _custo(registros, inicio, fim):
+    return sum(r.custo for _, r in registros if inicio <= r.data < fim)
+
+
+def test_custo_por_periodo_igual_a_soma_dos_registros(indice, registros):
+    sorteio = random.Random(7)
+    periodos = [(date(2024, 3, 1), date(2024, 6, 1)), (date(2024, 3, 15), date(2024, 3, 20)),
+                (date(2023, 1, 1), date(2027, 1, 1)), ultimo_trimestre(date(2025, 2, 10))]
+    for _ in range(50):
+        inicio = INICIO + timedelta(days=sorteio.randrange(-30, 760))
+        periodos.append((inicio, inicio + timedelta(days=sorteio.randrange(1, 400))))
+    for inicio, fim in periodos:
+        assert indice.custo_periodo(inicio, fim) == pytest.approx(_custo(registros, inicio, fim))
+    assert indice.custo_total == pytest.approx(sum(r.custo for _, r in registros))
+    with pytest.raises(DadosInvalidosError):
+        indice.custo_periodo(date(2024, 2, 1), date(2024, 2, 1))
+
+
+def test_consultas_por_veiculo_data_e_pagina(indice, registros):
+    for placa in PLACAS:
+        datas = [r.data for p, r in registros if p == placa]
+        custo = indice.custo_veiculo(placa)
+        assert (custo['quantidade'], custo['ultima']) == (len(datas), max(datas, default=None))
+        assert custo['custo'] == pytest.approx(sum(r.custo for p, r in registros if p == placa))
+
+    limite = date(2025, 10, 1)
+    ultimas = {}
+    for placa, registro in registros:
+        ultimas[placa] = max(ultimas.get(placa, registro.data), registro.data)
+    atrasadas = sorted((data, placa) for placa, data in ultimas.items() if data < limite)
+    assert indice.em_atraso(limite) == [PLACAS[-1]] + [placa for _, placa in atrasadas]
+
+    em_ordem = sorted(registros, key=lambda e: e[1].data)
+    assert [r.data for _, r in indice.registros()] == [r.data for _, r in em_ordem]
+    assert [r.data for _, r in indice.registros(date(2024, 5, 1), date(2024, 7, 1), decrescente=True)] \
+        == sorted((r.data for _, r in registros if date(2024, 5, 1) <= r.data < date(2024, 7, 1)), reverse=True)
+    vistas, cursor = [], None
+    while True:
+        entradas, cursor = indice.pagina(30, cursor)
+        vistas += entradas
+        if cursor is None:
+            break
+    assert vistas == list(indice.registros(decrescente=True))
+
+
+def test_remover_veiculo_tira_o_historico_dos_acumulados(indice, registros):
+    indice.remover_veiculo(PLACAS[0])
+    restantes = [(p, r) for p, r in registros if p != PLACAS[0]]
+    assert len(indice) == len(restantes)
+    assert indice.custo_total == pytest.approx(sum(r.custo for _, r in restantes))
+    assert indice.custo_periodo(date(2024, 1, 1), date(2025, 1, 1)) \
+        == pytest.approx(_custo(restantes, date(2024, 1, 1), date(2025, 1, 1)))
+    assert indice.custo_veiculo(PLACAS[0]) == {'quantidade': 0, 'custo': 0.0, 'ultima': None}
+    assert PLACAS[0] not in indice.em_atraso(date(2030, 1, 1))
+
+
+@pytest.mark.parametrize('data, custo', [('31/02/2024', 10), ('01/01/2024', 'caro'), ('01/01/2024', -1)])
+def test_registro_invalido(data, custo):
+    with pytest.raises(DadosInvalidosError):
+        RegistroManutencao.criar('Revisão', data, custo)
+
+
+def test_custos_da_frota_pelo_servico(servico):
+    servico.cadastrar_veiculo('Fiat Mobi', 'ABC1234', 2022, 100)
+    servico.cadastrar_veiculo('Fiat Uno', 'XYZ9876', 2020, 80)
+    servico.registrar_manutencao('ABC1234', 'Troca de óleo', '10/01/2026', 150)
+    servico.registrar_manutencao('ABC1234', 'Pneus', '20/02/2026', 800)
+    assert servico.custo_manutencoes(date(2026, 1, 1), date(2026, 2, 1)) == pytest.approx(150)
+    assert servico._ger_vei.custo_manutencao_veiculo('ABC1234')['ultima'] == date(2026, 2, 20)
+    servico.registrar_manutencao('XYZ9876', 'Freios', '05/02/2026', 300)
+    assert servico._ger_vei.custo_manutencoes() == pytest.approx(1250)
+    assert [v.placa for v in servico._ger_vei.veiculos_em_atraso(30, hoje=date(2026, 3, 15))] == ['XYZ9876']
@@ -0,0 +1,122 @@
+import threading
+from datetime import date, timedelta
+import pytest
+from clientes import GerenciarCliente
+from reserva import Gerenciar_Reserva, Reserva
+from exceptions import DadosInvalidosError
+
+CLIENTES = 5000
+
+
+def _nome(i):
+    # Nomes só com letras, na mesma ordem dos números
+    return 'Cliente ' + ''.join(chr(ord('a') + i // 26 ** k % 26) for k in (3, 2, 1, 0))
+
+
+class Contador:
+    """Predicado que aceita tudo e conta quantos itens examinou."""
+    def __init__(self):
+        self.chamadas = 0
+
+    def __call__(self, item):
+        self.chamadas += 1
+        return True
+
+
+def _livre(trava):
+    # De outra thread: a RLock deixaria a própria dona entrar de novo
+    livre = []
+    def tentar():
+        if trava.acquire(blocking=False):
+            trava.release()
+            livre.append(True)
+    t = threading.Thread(target=tentar)
+    t.start()
+    t.join()
+    return bool(livre)
+
+
+@pytest.fixture
+def clientes(servico):
+    ger_cli = GerenciarCliente()
+    ger_cli.registrar_clientes((_nome(i), f"{i:011d}") for i in range(CLIENTES, 0, -1))
+    return ger_cli
+
+
+def test_consulta_de_clientes_nao_examina_alem_do_limite(clientes):
+    contador = Contador()
+    primeiros = list(clientes.consultar(filtro=contador, limite=3))
+    assert [c.cpf for c in primeiros] == [f"{i:011d}" for i in (1, 2, 3)]
+    assert contador.chamadas == 3
+
+
+def test_consulta_de_clientes_solta_a_trava_entre_os_itens(clientes):
+    consulta = clientes.consultar(ordenar_por='cpf', decrescente=True)
+    assert next(consulta).cpf == f"{CLIENTES:011d}"
+    assert _livre(clientes._trava)
+    # Removido depois do começo da consulta, num bloco ainda não lido: não aparece
+    clientes.remover_cliente(f"{1:011d}")
+    restantes = [c.cpf for c in consulta]
+    assert restantes == [f"{i:011d}" for i in range(CLIENTES - 1, 1, -1)]
+
+
+def test_paginas_de_clientes_seguem_o_cursor_com_cadastros_no_meio(clientes):
+    pagina = clientes.paginar(limite=2, nome='cliente aaa')
+    assert [c.nome for c in pagina] == [_nome(1), _nome(2)]
+    clientes.registrar_cliente(_nome(1) + 'z', '99999999999') # antes do cursor: fica de fora
+    clientes.registrar_cliente(_nome(2) + 'z', '88888888888')
+    pagina = clientes.paginar(limite=3, nome='cliente aaa', depois_de=pagina.cursor)
+    assert [c.nome for c in pagina] == [_nome(2) + 'z', _nome(3), _nome(4)]
+    assert clientes._ordenados['nome'] == sorted(GerenciarCliente.ORDENACOES['nome'](c) for c in clientes.clientes)
+
+
+def test_limite_invalido(clientes):
+    with pytest.raises(DadosInvalidosError):
+        list(clientes.consultar(limite=0))
+
+
+@pytest.fixture
+def reservas(servico):
+    servico.cadastrar_cliente('Ana Souza', '11111111111')
+    servico.cadastrar_cliente('Bruno Lima', '22222222222')
+    for i in range(10):
+        servico.cadastrar_veiculo('Fiat Mobi', f"PAG{i:04d}", 2022, 100)
+    inicio = date.today() + timedelta(days=1)
+    for i in range(600):
+        servico.reservar(['11111111111', '22222222222'][i % 3 == 0], f"PAG{i % 10:04d}", 1,
+                         inicio=inicio + timedelta(days=2 * (i // 10)))
+    for id_reserva in range(1, 600, 7):
+        servico.pagar(id_reserva, 'pix')
+    return Gerenciar_Reserva()
+
+
+def test_consulta_de_reservas_nao_examina_alem_do_limite(reservas):
+    contador = Contador()
+    assert [r.id for r in reservas.consultar(filtro=contador, limite=2)] == [1, 2]
+    assert contador.chamadas == 2
+    contador = Contador()
+    ultimas = reservas.consultar(estados=[Reserva.PAGA], filtro=contador, decrescente=True, limite=3)
+    assert [r.id for r in ultimas] == [596, 589, 582]
+    assert contador.chamadas == 3
+
+
+def test_consulta_de_reservas_solta_a_trava_entre_os_itens(reservas):
+    consulta = reservas.consultar(cpf='22222222222')
+    assert next(consulta).id == 1
+    assert _livre(reservas._trava)
+    assert next(consulta).id == 4
+
+
+def test_paginas_de_reservas_cobrem_a_consulta_inteira(reservas):
+    esperadas = reservas.buscar_reservas(cpf='11111111111', estados=[Reserva.PENDENTE])
+    assert [r.id for r in esperadas] == sorted(r.id for r in esperadas)
+    vistas, cursor = [], None
+    while True:
+        pagina = reservas.paginar(limite=50, cpf='11111111111', estados=[Reserva.PENDENTE], depois_de=cursor)
+        vistas += pagina.itens
+        if pagina.cursor is None:
+            break
+        cursor = pagina.cursor
+    assert vistas == esperadas
+    por_total = list(reservas.consultar(placa='PAG0003', ordenar_por='total', limite=5))
+    assert [r.placa for r in por_total] == ['PAG0003'] * 5
@@ -0,0 +1,92 @@
+import threading
+import time
+from datetime import date, timedelta
+from clientes import ClienteFactory, GerenciarCliente
+from persistencia import RepositorioSQLite
+from reserva import Reserva
+
+
+def test_leituras_nao_enxergam_transacao_de_outra_thread_pela_metade(tmp_path):
+    repositorio = RepositorioSQLite(str(tmp_path / 'locadora.db'))
+    fabrica = ClienteFactory()
+    parar = threading.Event()
+    erros = []
+
+    def gravar():
+        for i in range(100):
+            with repositorio.transacao(): # clientes sempre entram em pares
+                repositorio.salvar_cliente(fabrica.criar_usuario('Ana', f"{2 * i:011d}"))
+                time.sleep(0.0005) # deixa os leitores rodarem no meio da transação
+                repositorio.salvar_cliente(fabrica.criar_usuario('Ana', f"{2 * i + 1:011d}"))
+        parar.set()
+
+    def ler():
+        try:
+            while not parar.is_set():
+                quantidade = len(list(repositorio.carregar_clientes()))
+                if quantidade % 2:
+                    erros.append(quantidade)
+                repositorio.buscar_cliente('00000000000')
+        except Exception as e:
+            erros.append(e)
+
+    threads = [threading.Thread(target=gravar)] + [threading.Thread(target=ler) for _ in range(2)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    repositorio.fechar()
+    assert erros == []
+
+
+def test_nova_data_de_retirada_e_gravada(tmp_path):
+    caminho = str(tmp_path / 'locadora.db')
+    repositorio = RepositorioSQLite(caminho)
+    reserva = Reserva()
+    reserva._id, reserva._cpf, reserva._placa, reserva._modelo = 1, '12345678900', 'ABC1234', 'Fiat Mobi'
+    reserva._inicio, reserva._dias, reserva._total = date.today(), 3, 300.0
+    repositorio.salvar_reserva(reserva, 'criada')
+    reserva._inicio = date.today() + timedelta(days=5)
+    repositorio.salvar_reserva(reserva, 'modificada')
+    repositorio.fechar()
+
+    repositorio = RepositorioSQLite(caminho)
+    recarregada, = repositorio.carregar_reservas()
+    assert recarregada.inicio == date.today() + timedelta(days=5)
+    repositorio.fechar()
+
+
+class RepositorioVigiado(RepositorioSQLite):
+    """Conta as leituras feitas enquanto a trava do gerenciador está tomada."""
+    def __init__(self, caminho, trava):
+        super().__init__(caminho)
+        self._trava_gerenciador = trava
+        self.leituras_sob_trava = 0
+
+    def _consultar(self, sql, parametros=()):
+        tomada = []
+        def tentar(): # de outra thread: a RLock deixaria a própria dona entrar de novo
+            if self._trava_gerenciador.acquire(blocking=False):
+                self._trava_gerenciador.release()
+            else:
+                tomada.append(True)
+        t = threading.Thread(target=tentar)
+        t.start()
+        t.join()
+        self.leituras_sob_trava += bool(tomada)
+        return super()._consultar(sql, parametros)
+
+
+def test_gerenciador_de_clientes_le_o_repositorio_fora_da_trava(servico, tmp_path):
+    ger_cli = GerenciarCliente()
+    repositorio = RepositorioVigiado(str(tmp_path / 'locadora.db'), ger_cli._trava)
+    repositorio.salvar_cliente(ClienteFactory().criar_usuario('Ana Souza', '11111111111'))
+    ger_cli.conectar_repositorio(repositorio)
+
+    ger_cli.registrar_cliente('Bruno Lima', '22222222222')
+    assert ger_cli.remover_cliente('11111111111').nome == 'Ana Souza'
+    assert ger_cli.remover_cliente('33333333333') is None
+    ger_cli.registrar_clientes([('Carla Dias', '44444444444')])
+    assert [c.cpf for c in ger_cli.clientes] == ['22222222222', '44444444444']
+    assert repositorio.leituras_sob_trava == 0
+    repositorio.fechar()
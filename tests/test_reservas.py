@@ -0,0 +1,106 @@
+from datetime import date, timedelta
+import pytest
+from clientes import Singleton
+from reserva import Gerenciar_Reserva, Reserva
+from persistencia import RepositorioSQLite
+
+CPFS = ['11111111111', '22222222222', '33333333333']
+PLACAS = ['RES0001', 'RES0002', 'RES0003', 'RES0004']
+
+
+@pytest.fixture
+def movimentado(servico):
+    """Reservas de vários clientes e carros, em todos os estados, com cancelamentos no meio."""
+    for i, cpf in enumerate(CPFS):
+        servico.cadastrar_cliente(f"Cliente {'abc'[i]}", cpf)
+    for placa in PLACAS:
+        servico.cadastrar_veiculo('Fiat Mobi', placa, 2022, 100)
+    inicio = date.today() + timedelta(days=1)
+    ids = [servico.reservar(CPFS[i % 3], PLACAS[i % 4], 1 + i % 3, inicio=inicio + timedelta(days=5 * (i // 4))).id
+           for i in range(24)]
+    for id_reserva in ids[::3]:
+        servico.pagar(id_reserva, 'pix')
+    for id_reserva in ids[:6:3]:
+        servico.devolver(id_reserva, incidente='Farol quebrado' if id_reserva == ids[0] else None)
+    for id_reserva in ids[1::6]:
+        servico.cancelar_reserva(id_reserva)
+    return Gerenciar_Reserva()
+
+
+def _indices_conferem(ger_res):
+    reservas = ger_res.reservas
+    assert ger_res._ids == sorted(r.id for r in reservas)
+    for estado in (Reserva.PENDENTE, Reserva.PAGA, Reserva.FINALIZADA):
+        assert list(ger_res._por_estado[estado]) == [r.id for r in reservas if r.estado == estado]
+    agrupados = {'_por_cpf': {}, '_por_placa': {}, '_por_cpf_estado': {}}
+    for r in reservas:
+        agrupados['_por_cpf'].setdefault(r.cpf, {})[r.id] = r
+        agrupados['_por_placa'].setdefault(r.placa, {})[r.id] = r
+        agrupados['_por_cpf_estado'].setdefault((r.cpf, r.estado), {})[r.id] = r
+    for nome, esperado in agrupados.items():
+        assert getattr(ger_res, nome) == esperado
+
+
+def test_indices_acompanham_pagamentos_devolucoes_e_cancelamentos(movimentado):
+    _indices_conferem(movimentado)
+
+
+@pytest.mark.parametrize('criterios', [
+    {'cpf': CPFS[1]},
+    {'placa': PLACAS[2]},
+    {'estados': [Reserva.PAGA]},
+    {'cpf': CPFS[0], 'estados': [Reserva.PENDENTE, Reserva.FINALIZADA]},
+    {'cpf': CPFS[2], 'placa': PLACAS[1]},
+    {'placa': PLACAS[0], 'estados': [Reserva.FINALIZADA]},
+])
+def test_busca_pelos_indices_igual_a_varredura(movimentado, criterios):
+    def atende(r):
+        return (r.cpf == criterios.get('cpf', r.cpf) and r.placa == criterios.get('placa', r.placa)
+                and r.estado in criterios.get('estados', [r.estado]))
+    esperadas = [r for r in movimentado.reservas if atende(r)]
+    assert esperadas
+    assert movimentado.buscar_reservas(**criterios) == esperadas
+
+
+def _recontar(reservas):
+    """O relatório de pagamentos refeito do zero, percorrendo todas as reservas."""
+    def soma(estados, valor):
+        return round(sum(valor(r) for r in reservas if r.estado in estados), 2)
+    pagas = (Reserva.PAGA, Reserva.FINALIZADA)
+    finalizadas = [r for r in reservas if r.estado == Reserva.FINALIZADA]
+    retidas = [r for r in finalizadas if r.caucao_retido]
+    return {
+        'pendentes': {'quantidade': sum(r.estado == Reserva.PENDENTE for r in reservas),
+                      'valor': soma([Reserva.PENDENTE], lambda r: r.total + r.deposito)},
+        'pagas': {'quantidade': sum(r.estado in pagas for r in reservas),
+                  'valor': soma(pagas, lambda r: r.total + r.deposito)},
+        'caucao': {'em_garantia': soma([Reserva.PAGA], lambda r: r.deposito),
+                   'devolvida': round(sum(r.deposito for r in finalizadas if not r.caucao_retido), 2),
+                   'retida': round(sum(r.deposito for r in retidas), 2),
+                   'devolucoes_sem_dano': len(finalizadas) - len(retidas),
+                   'devolucoes_com_dano': len(retidas)},
+    }
+
+
+def test_totais_batem_com_a_recontagem(servico, movimentado):
+    assert movimentado.totais_pagamentos() == _recontar(movimentado.reservas)
+    pendente = movimentado.buscar_reservas(estados=[Reserva.PENDENTE])[-1]
+    servico.modificar_reserva(pendente.id, pendente.dias + 2)
+    servico.devolver(movimentado.buscar_reservas(estados=[Reserva.PAGA])[-1].id, incidente='Pneu furado')
+    servico.cancelar_reserva(movimentado.buscar_reservas(estados=[Reserva.PENDENTE])[0].id)
+    assert movimentado.totais_pagamentos() == _recontar(movimentado.reservas)
+
+
+def test_totais_contam_o_historico_que_ficou_no_repositorio(movimentado, tmp_path):
+    repositorio = RepositorioSQLite(str(tmp_path / 'locadora.db'))
+    movimentado.conectar_repositorio(repositorio)
+    esperado = _recontar(movimentado.reservas)
+
+    Singleton._instances.pop(Gerenciar_Reserva) # uma nova execução do programa
+    ger_res = Gerenciar_Reserva()
+    ger_res.conectar_repositorio(repositorio)
+    assert not ger_res._historico_carregado
+    assert ger_res.totais_pagamentos() == esperado
+    ger_res.buscar_reservas(estados=[Reserva.FINALIZADA]) # traz o histórico para a memória
+    assert ger_res.totais_pagamentos() == esperado == _recontar(ger_res.reservas)
+    repositorio.fechar()
@@ -0,0 +1,38 @@
+import pytest
+from exceptions import DadosInvalidosError
+from reserva import Reserva
+
+
+def _reserva_paga(servico):
+    servico.cadastrar_cliente('Ana Souza', '12345678900')
+    servico.cadastrar_veiculo('Fiat Mobi', 'ABC1234', 2022, 95.5)
+    reserva = servico.reservar('12345678900', 'ABC1234', 3)
+    servico.pagar(reserva.id, 'pix')
+    return reserva
+
+
+@pytest.mark.parametrize('nota', [0, 6, '5', 4.5, True])
+def test_nota_invalida_nao_finaliza_a_devolucao(servico, nota):
+    reserva = _reserva_paga(servico)
+    with pytest.raises(DadosInvalidosError):
+        servico.devolver(reserva.id, nota=nota)
+    assert reserva.estado == Reserva.PAGA
+    assert not servico.buscar_veiculo('ABC1234').disponivel
+
+    assert servico.devolver(reserva.id, nota=5) is False
+    assert reserva.estado == Reserva.FINALIZADA
+    assert reserva._avaliacao == 5
+
+
+def test_busca_por_raio_devolve_todos_os_veiculos_dentro_dele(servico):
+    placas = [f"RAI{i:04d}" for i in range(5)]
+    for placa in placas:
+        servico.cadastrar_veiculo('Fiat Mobi', placa, 2022, 100)
+    centro = servico.localizar_frota()[placas[0]]
+
+    # As posições simuladas ficam a poucos km umas das outras
+    no_raio = servico.veiculos_proximos(centro['lat'], centro['lon'], raio_km=50)
+    assert sorted(v.placa for v, _ in no_raio) == placas
+    assert [d for _, d in no_raio] == sorted(d for _, d in no_raio)
+    assert servico.veiculos_proximos(centro['lat'], centro['lon'], k=2, raio_km=50) == no_raio[:2]
+    assert [v.placa for v, _ in servico.veiculos_proximos(centro['lat'], centro['lon'])] == [placas[0]]
@@ -0,0 +1,99 @@
+import asyncio
+import json
+import pytest
+from reserva import INotificationSender
+from servidor import ServidorLocadora
+
+
+async def _conversar(servidor, dados):
+    tcp = await servidor.iniciar('127.0.0.1', 0)
+    try:
+        porta = tcp.sockets[0].getsockname()[1]
+        leitor, escritor = await asyncio.open_connection('127.0.0.1', porta)
+        escritor.write(dados)
+        await escritor.drain()
+        resposta = await asyncio.wait_for(leitor.read(), timeout=5)
+        escritor.close()
+        return resposta
+    finally:
+        tcp.close()
+        await tcp.wait_closed()
+
+
+def _status(resposta):
+    return int(resposta.split(b' ', 2)[1])
+
+
+@pytest.mark.parametrize('tamanho', [b'abc', b'-5', b'1e3', b'\xc2\xb2'])
+def test_content_length_invalido_responde_400(servico, tamanho):
+    servidor = ServidorLocadora(servico)
+    requisicao = b"POST /clientes HTTP/1.1\r\nContent-Length: " + tamanho + b"\r\n\r\n{}"
+    assert _status(asyncio.run(_conversar(servidor, requisicao))) == 400
+    servidor.fechar()
+
+
+def test_cabecalho_grande_demais_responde_431(servico):
+    servidor = ServidorLocadora(servico)
+    requisicao = b"GET /clientes HTTP/1.1\r\nX-Grande: " + b"a" * 100_000 + b"\r\n\r\n"
+    assert _status(asyncio.run(_conversar(servidor, requisicao))) == 431
+    servidor.fechar()
+
+
+def test_requisicao_valida_continua_funcionando(servico):
+    servidor = ServidorLocadora(servico)
+    corpo = json.dumps({'nome': 'Ana Souza', 'cpf': '12345678900'}).encode()
+    requisicao = (b"POST /clientes HTTP/1.1\r\nConnection: close\r\nContent-Length: "
+                  + str(len(corpo)).encode() + b"\r\n\r\n" + corpo)
+    assert _status(asyncio.run(_conversar(servidor, requisicao))) == 201
+    servidor.fechar()
+
+
+class _Gravador(INotificationSender):
+    def __init__(self):
+        self.mensagens = []
+
+    def send(self, message, destinatario=None):
+        self.mensagens.append(message)
+
+
+def test_reserva_e_pagamento_pela_api_notificam_o_cliente(servico):
+    servidor = ServidorLocadora() # camada de serviço padrão, com notificações
+    gravador = _Gravador()
+    servico._ger_res.canais_confirmacao = [gravador]
+    servico._ger_res.canais_pagamento = [gravador]
+    servico.cadastrar_cliente('Ana Souza', '12345678900')
+    servico.cadastrar_veiculo('Fiat Mobi', 'ABC1234', 2022, 95.5)
+
+    async def fluxo():
+        status, reserva = await servidor.despachar(
+            'POST', '/reservas', json.dumps({'cpf': '12345678900', 'placa': 'ABC1234', 'dias': 3}).encode())
+        assert status == 201
+        status, _ = await servidor.despachar('POST', f"/reservas/{reserva['id']}/pagamento",
+                                             json.dumps({'forma': 'pix'}).encode())
+        assert status == 200
+    asyncio.run(fluxo())
+    servidor.fechar()
+    assert len(gravador.mensagens) == 2
+
+
+def test_reserva_mostra_a_caucao_cobrada_e_incidente_com_data_invalida_responde_400(servico):
+    servidor = ServidorLocadora(servico)
+    servico.cadastrar_cliente('Ana Souza', '12345678900')
+    servico.cadastrar_veiculo('Fiat Mobi', 'ABC1234', 2022, 95.5)
+    reserva = servico.reservar('12345678900', 'ABC1234', 3)
+    reserva._deposito = 300.0 # caução de uma reserva feita com outro valor padrão
+
+    async def fluxo():
+        status, dados = await servidor.despachar('GET', f"/reservas/{reserva.id}", b'')
+        assert status == 200
+        assert (dados['caucao'], dados['caucao_retido']) == (300.0, False)
+        for data in ('31/02/2024', '2024-01-05', 'ontem'):
+            status, _ = await servidor.despachar('POST', f"/reservas/{reserva.id}/incidentes",
+                                                 json.dumps({'descricao': 'Arranhão', 'data': data}).encode())
+            assert status == 400
+        status, incidente = await servidor.despachar(
+            'POST', f"/reservas/{reserva.id}/incidentes", json.dumps({'descricao': 'Arranhão', 'data': '5/1/2024'}).encode())
+        assert (status, incidente['data']) == (201, '05/01/2024')
+    asyncio.run(fluxo())
+    servidor.fechar()
+    assert len(reserva.incidentes) == 1
@@ -0,0 +1,137 @@
+import pytest
+from veiculos import GerenciarVeiculo, Veiculo, ExternalGpsService, GpsAdapter, TTL_LOCALIZACAO
+from exceptions import PlacaJaCadastradaError
+
+
+def _disponiveis_conferem(ger_vei):
+    assert set(ger_vei._disponiveis) == {v.placa for v in ger_vei.veiculos if v.disponivel}
+    assert [v.placa for v in ger_vei] == list(ger_vei._disponiveis)
+    assert ger_vei.total_disponiveis() == len(ger_vei._disponiveis)
+
+
+def test_indice_de_placas_e_conjunto_de_disponiveis(servico):
+    ger_vei = GerenciarVeiculo()
+    placas = [f"IDX{i:04d}" for i in range(6)]
+    for placa in placas:
+        servico.cadastrar_veiculo('Fiat Mobi', placa, 2022, 100)
+    assert ger_vei.buscar_por_placa('IDX0003').placa == 'IDX0003'
+    assert ger_vei.buscar_por_placa('XXX0000') is None
+    with pytest.raises(PlacaJaCadastradaError):
+        ger_vei.adicionar_veiculo(Veiculo('Gol', 'IDX0001', 2020, 90))
+
+    servico.cadastrar_cliente('Ana Souza', '11111111111')
+    reserva = servico.reservar('11111111111', 'IDX0002', 2)
+    servico.pagar(reserva.id, 'pix')
+    ger_vei.buscar_por_placa('IDX0004').disponivel = False
+    _disponiveis_conferem(ger_vei)
+    assert 'IDX0002' not in ger_vei._disponiveis
+    assert [v.placa for v in ger_vei.iter_todos_veiculos()] == placas
+
+    servico.devolver(reserva.id)
+    ger_vei.remover_veiculo('IDX0000')
+    _disponiveis_conferem(ger_vei)
+    assert list(ger_vei._disponiveis) == ['IDX0001', 'IDX0003', 'IDX0005', 'IDX0002']
+    assert not ger_vei.existe_placa('IDX0000')
+    # Removido, o veículo não avisa mais o gerenciador
+    removido = Veiculo('Gol', 'IDX9999', 2020, 90)
+    ger_vei.adicionar_veiculo(removido)
+    ger_vei.remover_veiculo('IDX9999')
+    removido.disponivel = False
+    removido.disponivel = True
+    assert 'IDX9999' not in ger_vei._disponiveis
+
+
+def test_ocupar_so_funciona_com_o_veiculo_disponivel(servico):
+    ger_vei = GerenciarVeiculo()
+    veiculo = servico.cadastrar_veiculo('Fiat Mobi', 'OCU1234', 2022, 100)
+    assert veiculo.ocupar()
+    assert not veiculo.ocupar()
+    assert ger_vei.total_disponiveis() == 0
+
+
+class Relogio:
+    def __init__(self):
+        self.agora = 1000.0
+
+    def __call__(self):
+        return self.agora
+
+
+class GpsContado(ExternalGpsService):
+    def __init__(self):
+        super().__init__()
+        self.consultas = []
+
+    def fetch_coords(self, placa_veiculo):
+        self.consultas.append([placa_veiculo])
+        return super().fetch_coords(placa_veiculo)
+
+    def fetch_coords_batch(self, placas):
+        placas = list(placas)
+        self.consultas.append(placas)
+        return super().fetch_coords_batch(placas)
+
+
+def test_cache_do_adapter_expira_com_o_ttl(monkeypatch):
+    relogio = Relogio()
+    monkeypatch.setattr('veiculos.time.monotonic', relogio)
+    gps = GpsContado()
+    adapter = GpsAdapter(gps, 'GPS0001', ttl=30)
+
+    primeira = adapter.coordenadas
+    relogio.agora += 29
+    assert adapter.coordenadas == primeira
+    assert len(gps.consultas) == 1
+    relogio.agora += 1
+    assert not adapter.em_cache()
+    adapter.coordenadas
+    assert len(gps.consultas) == 2
+    adapter.simular_movimentacao() # a posição mudou: o cache não vale mais
+    assert not adapter.em_cache()
+    assert adapter.coordenadas != primeira
+    assert len(gps.consultas) == 3
+
+
+def test_localizar_frota_consulta_em_lote_so_os_expirados(servico, monkeypatch):
+    relogio = Relogio()
+    monkeypatch.setattr('veiculos.time.monotonic', relogio)
+    gps = GpsContado()
+    monkeypatch.setattr('veiculos.GPS_COMPARTILHADO', gps)
+    placas = [f"GPS{i:04d}" for i in range(4)]
+    for placa in placas:
+        servico.cadastrar_veiculo('Fiat Mobi', placa, 2022, 100)
+
+    posicoes = servico.localizar_frota()
+    assert gps.consultas == [placas]
+    relogio.agora += TTL_LOCALIZACAO / 2
+    servico.localizar_veiculo('GPS0002')
+    assert servico.localizar_frota() == posicoes
+    assert len(gps.consultas) == 1
+    servico.buscar_veiculo('GPS0001').simular_movimentacao()
+    servico.localizar_frota()
+    assert gps.consultas[1:] == [['GPS0001']]
+    relogio.agora += TTL_LOCALIZACAO
+    servico.localizar_frota(['GPS0003', 'XXX0000'])
+    assert gps.consultas[2:] == [['GPS0003']]
+
+
+@pytest.mark.parametrize('com_numpy', [True, False])
+def test_passo_da_frota_move_todos_os_veiculos_de_uma_vez(monkeypatch, com_numpy):
+    if not com_numpy:
+        monkeypatch.setattr('veiculos.np', None)
+    gps = ExternalGpsService()
+    placas = [f"VET{i:04d}" for i in range(1500)] # passa da capacidade inicial dos vetores
+    antes = {placa: lat_lon for placa, *lat_lon in gps._posicoes(placas)}
+    avisos = []
+    class Ouvinte:
+        def frota_movida(self):
+            avisos.append(len(gps))
+    gps.inscrever(Ouvinte())
+
+    gps.step_all()
+    depois = {placa: lat_lon for placa, *lat_lon in gps._posicoes(placas)}
+    deslocamentos = [abs(d - a) for placa in placas for a, d in zip(antes[placa], depois[placa])]
+    assert max(deslocamentos) <= ExternalGpsService.PASSO
+    assert sum(1 for d in deslocamentos if d > 0) > len(deslocamentos) * 0.99
+    assert avisos == [len(placas)]
+    assert gps.fetch_coords('VET1499') == dict(zip(('lat', 'lon'), depois['VET1499']))
@@ -0,0 +1,48 @@
+from datetime import datetime
+from exceptions import DadosInvalidosError
+
+# Regras de validação compartilhadas pelo cadastro interativo e pelas operações em lote.
+# Cada função devolve o valor normalizado ou lança DadosInvalidosError com o motivo.
+
+def validar_nome(nome: str) -> str:
+    if not nome.replace(' ', '').isalpha():
+        raise DadosInvalidosError("Nome inválido! Digite apenas letras e espaços.")
+    return nome
+
+def validar_cpf(cpf: str) -> str:
+    if len(cpf) != 11 or not cpf.isdigit():
+        raise DadosInvalidosError("CPF inválido! Deve conter 11 dígitos numéricos.")
+    return cpf
+
+def validar_placa(placa: str) -> str:
+    placa = placa.strip().upper()
+    if len(placa) != 7:
+        raise DadosInvalidosError("Placa inválida! Deve conter 7 caracteres.")
+    return placa
+
+def validar_ano(ano) -> str:
+    ano = str(ano).strip()
+    ano_maximo = datetime.now().year + 1
+    if not (len(ano) == 4 and ano.isdigit() and 1960 < int(ano) <= ano_maximo):
+        raise DadosInvalidosError(f"O ano deve ser válido! (1961 - {ano_maximo})")
+    return ano
+
+def validar_valor(valor) -> float:
+    try:
+        valor = float(str(valor).replace(',', '.'))
+    except ValueError:
+        raise DadosInvalidosError("Entrada inválida! Digite um número válido.")
+    if valor <= 0:
+        raise DadosInvalidosError("O valor deve ser maior que zero.")
+    return valor
+
+def validar_data(data: str) -> datetime:
+    try:
+        return datetime.strptime(str(data).strip(), "%d/%m/%Y")
+    except ValueError:
+        raise DadosInvalidosError("Data inválida! Use o formato correto dd/mm/aaaa.")
+
+def validar_nota(nota) -> int:
+    if isinstance(nota, bool) or not isinstance(nota, int) or not 1 <= nota <= 5:
+        raise DadosInvalidosError("Digite uma nota entre 1 e 5.")
+    return nota
@@ -1,22 +1,30 @@
-from datetime import datetime
+from datetime import date, timedelta
 import random
-from clientes import Singleton
+import heapq
+import threading
+import time
+from bisect import insort
+from array import array
+from clientes import Singleton, Persistente, TravasPorChave
+from exceptions import PlacaJaCadastradaError, DadosInvalidosError
+from validacoes import validar_placa, validar_ano, validar_valor, validar_data
+from indice_espacial import IndiceEspacial
+from manutencoes import (RegistroManutencao, IndiceManutencoes, INTERVALO_REVISAO_DIAS,
+                         limite_revisao, ultimo_trimestre)
+from paginacao import TAMANHO_PAGINA, Pagina, exibir_paginado, percorrer
+from versoes import VERSOES, depois_da_versao
 from collections.abc import Iterator, Iterable
 from abc import ABC, abstractmethod
 
 # Iterator
 
 class VeiculoIterator(Iterator):
-    def __init__(self, colecao: list, filtro_disponivel: bool = True):
-        self._colecao = colecao
+    def __init__(self, colecao: Iterable, filtro_disponivel: bool = True):
+        self._iterador = iter(colecao)
         self._filtro_disponivel = filtro_disponivel
-        self._indice = 0
 
     def __next__(self):
-        while self._indice < len(self._colecao):
-            veiculo = self._colecao[self._indice]
-            self._indice += 1
-
+        for veiculo in self._iterador:
             if self._filtro_disponivel and not veiculo.disponivel:
                 continue
 
@@ -25,54 +33,176 @@ class VeiculoIterator(Iterator):
         raise StopIteration
     
 
+try:
+    import numpy as np
+except ImportError:  # NumPy é opcional: sem ele as posições ficam em array('d') e step_all usa um laço
+    np = None
+
 # Adapter
 class ExternalGpsService:
-    def __init__(self):
-        self._locations = {}
+    """Simula a API de GPS. As posições ficam em vetores contíguos de latitude e
+    longitude, um slot por veículo, para que a frota inteira ande num único passo."""
+    PASSO = 0.01 # deslocamento máximo (graus) por movimento
 
-    def _get_or_create_location(self, placa: str):
-        if placa not in self._locations:
-            self._locations[placa] = {
-                "lat": random.uniform(-23.5, -23.6),
-                "lon": random.uniform(-46.6, -46.7)
-            }
-        return self._locations[placa]
+    def __init__(self):
+        self._slots = {}  # placa -> índice nos vetores
+        self._placas = [] # índice -> placa
+        if np is not None:
+            self._lat = np.empty(1024)
+            self._lon = np.empty(1024)
+            self._rng = np.random.default_rng()
+        else:
+            self._lat = array('d')
+            self._lon = array('d')
+        self._trava = threading.Lock()
+        self._ouvintes = [] # Observer: avisados (fora da trava) quando veículos se movem
+
+    def inscrever(self, ouvinte):
+        """O ouvinte recebe posicao_alterada(placa, lat, lon) e frota_movida()."""
+        if ouvinte not in self._ouvintes:
+            self._ouvintes.append(ouvinte)
+
+    def __len__(self):
+        return len(self._placas)
+
+    def _slot(self, placa: str) -> int:
+        slot = self._slots.get(placa)
+        if slot is not None:
+            return slot
+        with self._trava:
+            slot = self._slots.get(placa)
+            if slot is None:
+                slot = len(self._placas)
+                self._reservar_espaco(slot + 1)
+                self._lat[slot] = random.uniform(-23.5, -23.6)
+                self._lon[slot] = random.uniform(-46.6, -46.7)
+                self._placas.append(placa)
+                self._slots[placa] = slot
+            return slot
+
+    def _reservar_espaco(self, tamanho):
+        if np is None:
+            if len(self._lat) < tamanho:
+                self._lat.append(0.0)
+                self._lon.append(0.0)
+        elif len(self._lat) < tamanho:
+            # Crescimento geométrico: realocação amortizada O(1) por veículo
+            novo = max(tamanho, 2 * len(self._lat))
+            self._lat = np.resize(self._lat, novo)
+            self._lon = np.resize(self._lon, novo)
+
+    def _coords(self, slot) -> dict:
+        return {"lat": float(self._lat[slot]), "lon": float(self._lon[slot])}
+
+    def _posicoes(self, placas) -> list:
+        # Leitura interna e silenciosa, em lote: [(placa, lat, lon)]
+        placas = list(placas)
+        slots = [self._slot(placa) for placa in placas]
+        with self._trava:
+            if np is not None:
+                # Só os slots pedidos: O(len(placas)), não O(frota) (ex: um veículo que mudou de estado)
+                indices = np.array(slots, dtype=np.intp)
+                return list(zip(placas, self._lat[indices].tolist(), self._lon[indices].tolist()))
+            lat, lon = self._lat, self._lon
+            return [(placa, lat[slot], lon[slot]) for placa, slot in zip(placas, slots)]
 
     def fetch_coords(self, placa_veiculo: str) -> dict:
         print("-> [API Externa] Buscando coordenadas...")
-        return self._get_or_create_location(placa_veiculo)
+        return self._coords(self._slot(placa_veiculo))
+
+    def fetch_coords_batch(self, placas) -> dict:
+        # Uma única chamada para vários veículos: {placa: {'lat': ..., 'lon': ...}}
+        placas = list(placas)
+        print(f"-> [API Externa] Buscando coordenadas de {len(placas)} veículo(s)...")
+        return {placa: self._coords(self._slot(placa)) for placa in placas}
 
     def update_coords(self, placa_veiculo: str):
         print("-> [API Externa] Veículo se moveu. Atualizando coordenadas...")
-        location = self._get_or_create_location(placa_veiculo)
-        location['lat'] += random.uniform(-0.01, 0.01)
-        location['lon'] += random.uniform(-0.01, 0.01)
+        slot = self._slot(placa_veiculo)
+        with self._trava:
+            self._lat[slot] += random.uniform(-self.PASSO, self.PASSO)
+            self._lon[slot] += random.uniform(-self.PASSO, self.PASSO)
+            lat, lon = float(self._lat[slot]), float(self._lon[slot])
+        for ouvinte in self._ouvintes:
+            ouvinte.posicao_alterada(placa_veiculo, lat, lon)
+
+    def step_all(self):
+        """Avança a frota inteira um passo do passeio aleatório (vetorizado com NumPy)."""
+        with self._trava:
+            n = len(self._placas)
+            if np is not None:
+                self._lat[:n] += self._rng.uniform(-self.PASSO, self.PASSO, n)
+                self._lon[:n] += self._rng.uniform(-self.PASSO, self.PASSO, n)
+            else:
+                # Sem NumPy: reconstruir o vetor numa list comprehension é mais rápido
+                # que atualizar índice a índice (random() escalado = uniform(-PASSO, PASSO))
+                sortear, amplitude = random.random, 2 * self.PASSO
+                self._lat = array('d', [x + (sortear() - 0.5) * amplitude for x in self._lat])
+                self._lon = array('d', [x + (sortear() - 0.5) * amplitude for x in self._lon])
+        for ouvinte in self._ouvintes:
+            ouvinte.frota_movida()
+
+# Por quanto tempo (s) uma posição lida da API externa é reaproveitada
+TTL_LOCALIZACAO = 30.0
 
 class GpsAdapter: # Adapter
-    def __init__(self, gps_service: ExternalGpsService, placa: str):
+    __slots__ = ('_adaptee', '_placa', '_ttl', '_coords', '_lido_em')
+
+    def __init__(self, gps_service: ExternalGpsService, placa: str, ttl: float = TTL_LOCALIZACAO):
         self._adaptee = gps_service
         self._placa = placa
- 
+        self._ttl = ttl
+        self._coords = None # cache da última posição lida
+        self._lido_em = 0.0
+
+    def armazenar(self, coords: dict):
+        """Guarda uma posição obtida fora do adapter (ex: numa consulta em lote da frota)."""
+        self._coords = dict(coords)
+        self._lido_em = time.monotonic()
+
+    def em_cache(self) -> bool:
+        return self._coords is not None and time.monotonic() - self._lido_em < self._ttl
+
+    @property
+    def coordenadas(self) -> dict:
+        if not self.em_cache():
+            print("-> [Adapter] Chamando API externa e formatando o resultado...")
+            self.armazenar(self._adaptee.fetch_coords(self._placa))
+        return self._coords
+
     @property 
     def localizacao(self) -> str:
-        print("-> [Adapter] Chamando API externa e formatando o resultado...")
-        coords = self._adaptee.fetch_coords(self._placa)
+        coords = self.coordenadas
         return f"Lat: {coords['lat']:.6f}, Lon: {coords['lon']:.6f} (Via API Externa)"
 
     def simular_movimentacao(self):
         print("-> [Adapter] Repassando simulação de movimento para a API externa...")
         self._adaptee.update_coords(self._placa)
+        self._coords = None # a posição mudou: a próxima leitura vai à API
+
+# Um único serviço de GPS atende toda a frota
+GPS_COMPARTILHADO = ExternalGpsService()
+
+# Marca o histórico de manutenções que ainda está no repositório (carga preguiçosa)
+NAO_CARREGADO = object()
+
+# Travas da disponibilidade, compartilhadas por placa: reservas de carros
+# diferentes quase nunca disputam a mesma trava e o Veiculo não carrega uma própria.
+TRAVAS_VEICULOS = TravasPorChave()
 
 class Veiculo:
+    __slots__ = ('_modelo', '_placa', '_ano', '_valor', '_disponivel',
+                 '_manutencao', '_observador', '_gps_tracker')
+
     def __init__(self, modelo='', placa='', ano='', valor=0.0):
         self._modelo = modelo
         self._placa = placa
         self._ano = ano
         self._valor = valor
         self._disponivel = True
-        self._manutencao = []
-        gps_service = ExternalGpsService()
-        self._gps_tracker = GpsAdapter(gps_service, self.placa) # Adapter
+        self._manutencao = None # lista alocada só no primeiro registro
+        self._observador = None # Observer: gerenciador avisado quando a disponibilidade muda
+        self._gps_tracker = None # Adapter criado na primeira consulta de localização
 
     @property
     def modelo(self):
@@ -92,29 +222,69 @@ class Veiculo:
 
     @disponivel.setter
     def disponivel(self, valor):
-        self._disponivel = valor
+        with TRAVAS_VEICULOS(self._placa):
+            if valor == self._disponivel:
+                return
+            self._disponivel = valor
+        self._avisar_observador()
+
+    def ocupar(self) -> bool:
+        """Compare-and-set: marca o veículo como alugado só se ele ainda estiver disponível."""
+        with TRAVAS_VEICULOS(self._placa):
+            if not self._disponivel:
+                return False
+            self._disponivel = False
+        self._avisar_observador()
+        return True
+
+    def _avisar_observador(self):
+        # Fora da trava: o gerenciador relê 'disponivel' e pode gravar no repositório
+        if self._observador is not None:
+            self._observador.atualizar_disponibilidade(self)
 
     @property
     def manutencao(self):
-        return self._manutencao
+        if self._manutencao is NAO_CARREGADO:
+            self._manutencao = self._observador.carregar_manutencoes(self) or None
+        return self._manutencao or ()
+
+    def _adicionar_manutencao(self, registro):
+        if self._manutencao is None or self._manutencao is NAO_CARREGADO:
+            self._manutencao = list(self.manutencao)
+        self._manutencao.append(registro)
+
+    def _rastreador(self):
+        if self._gps_tracker is None:
+            self._gps_tracker = GpsAdapter(GPS_COMPARTILHADO, self._placa) # Adapter
+        return self._gps_tracker
 
     @property
     def localizacao(self):
-        return self._gps_tracker.localizacao # Adapter
+        return self._rastreador().localizacao # Adapter
+
+    @property
+    def coordenadas(self):
+        return self._rastreador().coordenadas
 
     def simular_movimentacao(self):
-        self._gps_tracker.simular_movimentacao()
+        self._rastreador().simular_movimentacao()
+
+    def adicionar_manutencao(self, descricao, data, custo) -> RegistroManutencao:
+        """Versão sem entrada/saída de registrar_manutencao; data como date ou texto dd/mm/aaaa."""
+        registro = RegistroManutencao.criar(descricao, data, custo)
+        self._adicionar_manutencao(registro)
+        if self._observador is not None:
+            self._observador.manutencao_registrada(self, registro)
+        return registro
 
     def registrar_manutencao(self):
         desc = input(f"Descreva a manutenção do veículo {self._modelo} ({self._placa}): ").strip()
         while True:
-            data = input("Data da manutenção (dd/mm/aaaa): ").strip()
             try:
-                data_obj = datetime.strptime(data, "%d/%m/%Y")
-                data_f = data_obj.strftime("%d/%m/%Y")
+                data = validar_data(input("Data da manutenção (dd/mm/aaaa): "))
                 break
-            except ValueError:
-                print("Data inválida! Use o formato correto dd/mm/aaaa.")
+            except DadosInvalidosError as e:
+                print(e)
 
         while True:
             custo_input = input("Custo da manutenção: R$ ").replace(',', '.')
@@ -127,16 +297,16 @@ class Veiculo:
             except ValueError:
                 print("Por favor, digite um valor numérico válido para o custo.")
 
-        self._manutencao.append({'descricao': desc, 'data': data_f, 'custo': custo})
+        self.adicionar_manutencao(desc, data, custo)
         print("Manutenção registrada com sucesso!\n")
 
     def listar_manutencoes(self):
-        if not self._manutencao:
+        if not self.manutencao:
             print(f"O veículo {self._modelo} ({self._placa}) não possui manutenções.\n")
             return
         print(f"Manutenções do veículo {self._modelo} ({self._placa}):")
-        for i, m in enumerate(self._manutencao, 1):
-            print(f"{i}. Data: {m['data']} | Desc: {m['descricao']} | Custo: R${m['custo']:.2f}")
+        for i, m in enumerate(self.manutencao, 1):
+            print(f"{i}. Data: {m.data_formatada} | Desc: {m.descricao} | Custo: R${m.custo:.2f}")
 
 class VeiculoBuilder: # Build
     def __init__(self):
@@ -161,55 +331,320 @@ class VeiculoBuilder: # Build
     def build(self):
         return self._veiculo
 
-class GerenciarVeiculo(Singleton, Iterable):
+class GerenciarVeiculo(Singleton, Persistente, Iterable):
     def __init__(self):
-        if hasattr(self, '_initialized'):
-            return
-        self.veiculos = []
+        self._veiculos = {}    # Índice principal: placa -> Veiculo (ordem de cadastro)
+        self._disponiveis = {} # Conjunto ordenado dos veículos disponíveis: placa -> Veiculo
+        # Protege só os índices; nunca é mantida durante uma gravação no repositório
+        self._trava = threading.Lock()
+        # Grade espacial dos disponíveis, montada na primeira busca por proximidade
+        self._indice_espacial = None
+        # Manutenções da frota por data, com custos acumulados; montado na primeira consulta
+        self._indice_manutencoes = None
+        # (versão, placa, registro) em ordem, dos registros que estão em memória: com repositório,
+        # os desta execução (o histórico gravado é lido dele, ver manutencoes_alteradas)
+        self._manutencoes_por_versao = []
         self._initialized = True
 
+    def conectar_repositorio(self, repositorio):
+        # A frota é carregada inteira (o conjunto de disponíveis depende dela);
+        # o histórico de manutenções de cada veículo continua preguiçoso.
+        self._repositorio = repositorio
+        self._indice_manutencoes = None # remontado a partir do repositório na próxima consulta
+        ja_gravados = set()
+        for veiculo in repositorio.carregar_veiculos():
+            ja_gravados.add(veiculo.placa)
+            if veiculo.placa not in self._veiculos:
+                self._indexar(veiculo)
+        with self._transacao():
+            for veiculo in self._veiculos.values():
+                if veiculo.placa in ja_gravados:
+                    continue
+                repositorio.salvar_veiculo(veiculo)
+                for registro in veiculo.manutencao:
+                    repositorio.salvar_manutencao(veiculo, registro)
+
+    @property
+    def veiculos(self):
+        with self._trava:
+            return list(self._veiculos.values())
+
     def __iter__(self) -> VeiculoIterator:
-        return VeiculoIterator(self.veiculos, filtro_disponivel=True)
+        # Copia apenas os disponíveis: custo O(disponíveis), não O(frota)
+        with self._trava:
+            return VeiculoIterator(list(self._disponiveis.values()), filtro_disponivel=True)
 
     def iter_todos_veiculos(self) -> VeiculoIterator:
         return VeiculoIterator(self.veiculos, filtro_disponivel=False)
 
+    def _indexar(self, veiculo):
+        self._veiculos[veiculo.placa] = veiculo
+        veiculo._observador = self
+        if self._indice_manutencoes is not None:
+            self._indice_manutencoes.adicionar_veiculo(veiculo.placa, veiculo.manutencao)
+        if isinstance(veiculo._manutencao, list): # registros criados antes do cadastro
+            for registro in veiculo._manutencao:
+                insort(self._manutencoes_por_versao, (registro.versao, veiculo.placa, registro))
+        if veiculo.disponivel:
+            self._disponiveis[veiculo.placa] = veiculo
+            self._posicionar([veiculo.placa])
+
+    def adicionar_veiculo(self, veiculo):
+        with self._trava:
+            if veiculo.placa in self._veiculos:
+                raise PlacaJaCadastradaError(f"A placa {veiculo.placa} já está cadastrada.")
+            self._indexar(veiculo)
+        if self._repositorio is not None:
+            self._repositorio.salvar_veiculo(veiculo)
+
+    def adicionar_veiculos(self, veiculos):
+        # Tudo ou nada: as placas são verificadas antes de alterar os índices
+        novos = {}
+        with self._trava:
+            for veiculo in veiculos:
+                if veiculo.placa in novos or veiculo.placa in self._veiculos:
+                    raise PlacaJaCadastradaError(f"A placa {veiculo.placa} já está cadastrada.")
+                novos[veiculo.placa] = veiculo
+            for veiculo in novos.values():
+                self._indexar(veiculo)
+        if self._repositorio is not None:
+            with self._transacao():
+                for veiculo in novos.values():
+                    self._repositorio.salvar_veiculo(veiculo)
+        return list(novos.values())
+
+    def remover_veiculo(self, placa):
+        with self._trava:
+            veiculo = self._veiculos.pop(placa, None)
+            if veiculo is None:
+                return None
+            self._disponiveis.pop(placa, None)
+            if self._indice_espacial is not None:
+                self._indice_espacial.remover(placa)
+            if self._indice_manutencoes is not None:
+                self._indice_manutencoes.remover_veiculo(placa)
+            if isinstance(veiculo._manutencao, list):
+                # No lugar: uma exportação em andamento continua na mesma lista
+                self._manutencoes_por_versao[:] = [e for e in self._manutencoes_por_versao if e[1] != placa]
+            veiculo._observador = None
+        if self._repositorio is not None:
+            self._repositorio.remover_veiculo(placa)
+        return veiculo
+
+    def buscar_por_placa(self, placa):
+        return self._veiculos.get(placa)
+
+    def existe_placa(self, placa):
+        return placa in self._veiculos
+
+    # Observer: chamado pelo Veiculo sempre que 'disponivel' muda de valor
+    def atualizar_disponibilidade(self, veiculo):
+        # O aviso chega depois da troca; relendo o valor sob a trava, o último
+        # aviso sempre deixa o índice com o estado final do veículo.
+        with self._trava:
+            if veiculo.placa not in self._veiculos:
+                return
+            if veiculo.disponivel:
+                self._disponiveis[veiculo.placa] = veiculo
+                self._posicionar([veiculo.placa])
+            else:
+                self._disponiveis.pop(veiculo.placa, None)
+                if self._indice_espacial is not None:
+                    self._indice_espacial.remover(veiculo.placa)
+        if self._repositorio is not None:
+            self._repositorio.salvar_veiculo(veiculo)
+
+    def manutencao_registrada(self, veiculo, registro):
+        with self._trava:
+            registro.versao = VERSOES.proxima()
+            if veiculo.placa in self._veiculos:
+                if self._indice_manutencoes is not None:
+                    self._indice_manutencoes.incluir(veiculo.placa, registro)
+                self._manutencoes_por_versao.append((registro.versao, veiculo.placa, registro)) # a mais nova
+        if self._repositorio is not None:
+            self._repositorio.salvar_manutencao(veiculo, registro)
+
+    def carregar_manutencoes(self, veiculo):
+        if self._repositorio is None:
+            return []
+        return self._repositorio.carregar_manutencoes(veiculo.placa)
+
+    def total_disponiveis(self):
+        return len(self._disponiveis)
+
+    # --- Busca por proximidade (somente veículos disponíveis) ---
+
+    def _posicionar(self, placas):
+        # Chamado sob self._trava; sem grade montada não há o que atualizar
+        if self._indice_espacial is None:
+            return
+        for placa, lat, lon in GPS_COMPARTILHADO._posicoes(placas):
+            self._indice_espacial.atualizar(placa, lat, lon)
+
+    def _garantir_indice_espacial(self):
+        if self._indice_espacial is not None:
+            return
+        with self._trava:
+            if self._indice_espacial is None:
+                self._indice_espacial = IndiceEspacial()
+                self._posicionar(list(self._disponiveis))
+        GPS_COMPARTILHADO.inscrever(self)
+
+    # Observer do GPS: mantém a grade em dia conforme os carros andam
+    def posicao_alterada(self, placa, lat, lon):
+        with self._trava:
+            if self._indice_espacial is not None and placa in self._disponiveis:
+                self._indice_espacial.atualizar(placa, lat, lon)
+
+    def frota_movida(self):
+        with self._trava:
+            self._posicionar(list(self._disponiveis))
+
+    def mais_proximos(self, lat, lon, k=1):
+        """Os k veículos disponíveis mais próximos de (lat, lon): [(Veiculo, distância em km)]."""
+        self._garantir_indice_espacial()
+        with self._trava:
+            return [(self._disponiveis[placa], distancia)
+                    for distancia, placa in self._indice_espacial.proximos(lat, lon, k)]
+
+    def disponiveis_no_raio(self, lat, lon, raio_km):
+        self._garantir_indice_espacial()
+        with self._trava:
+            return [(self._disponiveis[placa], distancia)
+                    for distancia, placa in self._indice_espacial.no_raio(lat, lon, raio_km)]
+
+    def atualizar_localizacoes(self, placas=None):
+        """Atualiza a posição da frota (ou das placas dadas) numa única chamada em lote.
+
+        Só consulta a API para os veículos cujo cache expirou; devolve {placa: coords}.
+        """
+        veiculos = self.veiculos if placas is None else [v for v in map(self.buscar_por_placa, placas) if v]
+        expirados = [v for v in veiculos if not v._rastreador().em_cache()]
+        if expirados:
+            lidas = GPS_COMPARTILHADO.fetch_coords_batch(v.placa for v in expirados)
+            for veiculo in expirados:
+                veiculo._rastreador().armazenar(lidas[veiculo.placa])
+        return {v.placa: v.coordenadas for v in veiculos}
+
+    # --- Manutenções da frota ---
+
+    def _garantir_indice_manutencoes(self):
+        if self._indice_manutencoes is not None:
+            return self._indice_manutencoes
+        # Uma leitura do histórico inteiro, em vez de uma por veículo; os veículos ainda não
+        # carregados passam a usar os mesmos registros. Lida fora da trava: as transações
+        # do repositório tomam a trava dos gerenciadores por dentro.
+        por_placa = {}
+        if self._repositorio is not None:
+            for placa, registro in self._repositorio.carregar_todas_manutencoes():
+                por_placa.setdefault(placa, []).append(registro)
+        with self._trava:
+            if self._indice_manutencoes is None:
+                indice = IndiceManutencoes()
+                for veiculo in self._veiculos.values():
+                    if veiculo._manutencao is NAO_CARREGADO:
+                        veiculo._manutencao = por_placa.get(veiculo.placa)
+                    indice.adicionar_veiculo(veiculo.placa, veiculo.manutencao)
+                self._indice_manutencoes = indice
+            return self._indice_manutencoes
+
+    def manutencoes_entre(self, inicio=None, fim=None, decrescente=False) -> list:
+        """[(placa, RegistroManutencao)] com data em [inicio, fim), em ordem de data."""
+        indice = self._garantir_indice_manutencoes()
+        with self._trava:
+            return list(indice.registros(inicio, fim, decrescente))
+
+    def manutencoes_alteradas(self, desde=None):
+        """Gerador de (placa, RegistroManutencao) registradas depois da versão 'desde' (todas, se None), em ordem de versão.
+
+        Não monta o índice de manutenções: o histórico gravado vem do repositório em blocos,
+        intercalado com os registros desta execução que ainda podem não ter sido gravados.
+        """
+        em_memoria = percorrer(self._manutencoes_por_versao, self._trava, depois_de=depois_da_versao(desde))
+        if self._repositorio is None:
+            return ((placa, registro) for _, placa, registro in em_memoria)
+        gravadas = ((r.versao, placa, r) for placa, r in self._repositorio.carregar_manutencoes_alteradas(desde))
+        return self._sem_repeticoes(heapq.merge(em_memoria, gravadas, key=lambda e: e[:2]))
+
+    @staticmethod
+    def _sem_repeticoes(entradas):
+        # Um registro desta execução já gravado vem dos dois lados, com a mesma (versão, placa)
+        anterior = None
+        for versao, placa, registro in entradas:
+            if (versao, placa) != anterior:
+                anterior = (versao, placa)
+                yield placa, registro
+
+    def paginar_manutencoes(self, limite=TAMANHO_PAGINA, depois_de=None) -> Pagina:
+        """Manutenções da frota, das mais recentes para as mais antigas, uma página por vez."""
+        indice = self._garantir_indice_manutencoes()
+        with self._trava:
+            return Pagina(*indice.pagina(limite, depois_de))
+
+    def custo_manutencoes(self, inicio=None, fim=None) -> float:
+        """Custo das manutenções da frota em [inicio, fim); sem período, o custo de todo o histórico."""
+        indice = self._garantir_indice_manutencoes()
+        with self._trava:
+            if inicio is None and fim is None:
+                return indice.custo_total
+            return indice.custo_periodo(inicio or date.min, fim or date.max)
+
+    def custo_manutencao_veiculo(self, placa) -> dict:
+        """{'quantidade', 'custo', 'ultima' (data da manutenção mais recente ou None)}."""
+        indice = self._garantir_indice_manutencoes()
+        with self._trava:
+            return indice.custo_veiculo(placa)
+
+    def veiculos_em_atraso(self, dias=INTERVALO_REVISAO_DIAS, hoje=None) -> list:
+        """Veículos sem manutenção há mais de 'dias' dias (ou que nunca tiveram), os mais atrasados primeiro."""
+        indice = self._garantir_indice_manutencoes()
+        with self._trava:
+            return [self._veiculos[placa] for placa in indice.em_atraso(limite_revisao(dias, hoje))]
+
+    def registrar_veiculo(self, modelo, placa, ano, valor):
+        """Valida os dados, monta o veículo pelo Builder e o cadastra."""
+        # Build
+        novo = (VeiculoBuilder()
+                .com_modelo(str(modelo).strip().title())
+                .com_placa(validar_placa(placa))
+                .com_ano(validar_ano(ano))
+                .com_valor(validar_valor(valor))
+                .build())
+        self.adicionar_veiculo(novo)
+        return novo
+
+    def resumo_utilizacao(self):
+        with self._trava:
+            total = len(self._veiculos)
+            disponiveis = len(self._disponiveis)
+        return {'total': total, 'disponiveis': disponiveis, 'alugados': total - disponiveis}
+
     def cadastrar_veiculo(self):
         modelo = input("Modelo: ").title()
         while True:
-            placa = input("Placa: ").upper()
-            if len(placa) == 7 and placa not in [v.placa for v in self.veiculos]:
-                break
+            try:
+                placa = validar_placa(input("Placa: "))
+                if not self.existe_placa(placa):
+                    break
+            except DadosInvalidosError:
+                pass
             print("Placa inválida ou já cadastrada!")
 
         while True:
             try:
-                ano = (input("Ano: "))
-                if len(ano) == 4 and ano.isdigit() and 1960 < int(ano) <= datetime.now().year + 1:
-                    break
-                else:
-                    print(f"O ano deve ser válido! (1961 - {datetime.now().year + 1})")
-            except ValueError:
-                print("Entrada inválida! Digite um número válido.")
+                ano = validar_ano(input("Ano: "))
+                break
+            except DadosInvalidosError as e:
+                print(e)
 
         while True:
             try:
-                valor = float(input("Valor por dia: "))
-                if valor > 0:
-                    break
-                else:
-                    print("O valor deve ser maior que zero.")
-            except ValueError:
-                print("Entrada inválida! Digite um número válido.")
+                valor = validar_valor(input("Valor por dia: "))
+                break
+            except DadosInvalidosError as e:
+                print(e)
 
-        # Build
-        novo = (VeiculoBuilder()
-                .com_modelo(modelo)
-                .com_placa(placa)
-                .com_ano(ano)
-                .com_valor(valor)
-                .build())
-        self.veiculos.append(novo)
+        self.registrar_veiculo(modelo, placa, ano, valor)
         print("Veículo cadastrado com sucesso! \n")
 
     def listar_veiculos(self):
@@ -222,24 +657,28 @@ class GerenciarVeiculo(Singleton, Iterable):
             print(f"{i} - Modelo: {v.modelo} | Placa: {v.placa} | Ano: {v.ano} | R${v.valor:.2f}/dia")
 
     def estatisticas_utilizacao(self):
-        total = len(self.veiculos)
-        if total == 0:
+        resumo = self.resumo_utilizacao()
+        if resumo['total'] == 0:
             print("\nNenhum veículo cadastrado na frota.")
             return
-        disponiveis = sum(1 for v in self)
-        alugados = total - disponiveis
-        print(f"\nTotal de veículos: {total}")
-        print(f"Disponíveis: {disponiveis}")
-        print(f"Alugados: {alugados}\n")
+        print(f"\nTotal de veículos: {resumo['total']}")
+        print(f"Disponíveis: {resumo['disponiveis']}")
+        print(f"Alugados: {resumo['alugados']}\n")
 
     def historico_manutencoes(self):
         print("\n=== HISTÓRICO GERAL DE MANUTENÇÕES ===")
-        manutencoes_existentes = False
-        for v in self.iter_todos_veiculos():
-            if v.manutencao:
-                manutencoes_existentes = True
-                print(f"\nVeículo: {v.modelo} ({v.placa})")
-                for m in v.manutencao:
-                    print(f"- Data: {m['data']} | Descrição: {m['descricao']} | Custo: R${m['custo']:.2f}")
-        if not manutencoes_existentes:
-            print("Nenhum registro de manutenção encontrado na frota.")
\ No newline at end of file
+        indice = self._garantir_indice_manutencoes()
+        if not len(indice):
+            print("Nenhum registro de manutenção encontrado na frota.")
+            return
+        inicio, fim = ultimo_trimestre()
+        print(f"Custo total: R${self.custo_manutencoes():.2f} | "
+              f"Último trimestre ({inicio.strftime('%d/%m/%Y')} a {(fim - timedelta(days=1)).strftime('%d/%m/%Y')}): "
+              f"R${self.custo_manutencoes(inicio, fim):.2f}")
+        print(f"Veículos com revisão atrasada (mais de {INTERVALO_REVISAO_DIAS} dias): {len(self.veiculos_em_atraso())}\n")
+
+        def formatar(_, entrada):
+            placa, m = entrada
+            return f"- {m.data_formatada} | {placa} | {m.descricao} | R${m.custo:.2f}"
+
+        exibir_paginado(lambda cursor: self.paginar_manutencoes(depois_de=cursor), formatar)
\ No newline at end of file
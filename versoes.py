@@ -0,0 +1,40 @@
+"""Números de versão para marcar alterações (usados pela exportação incremental).
+
+Cada reserva ou manutenção alterada recebe a próxima versão: um inteiro sempre
+crescente, derivado do relógio (microssegundos) para continuar crescendo entre
+execuções sem precisar gravar um contador à parte. "O que mudou desde a última
+exportação" vira "versão maior que a marca d'água guardada".
+"""
+import threading
+import time
+
+
+class RelogioVersoes:
+    def __init__(self):
+        self._ultima = 0
+        self._trava = threading.Lock()
+
+    def proxima(self) -> int:
+        with self._trava:
+            # Nunca repete nem volta, mesmo com duas chamadas no mesmo microssegundo
+            self._ultima = max(self._ultima + 1, time.time_ns() // 1000)
+            return self._ultima
+
+    def observar(self, versao):
+        """Garante que as próximas versões superem uma já gravada (ex: relógio atrasado após reinício)."""
+        with self._trava:
+            self._ultima = max(self._ultima, versao)
+
+    @property
+    def atual(self) -> int:
+        return self._ultima
+
+
+# Relógio compartilhado pelos gerenciadores
+VERSOES = RelogioVersoes()
+
+
+def depois_da_versao(desde):
+    """Cursor para percorrer (paginacao.py) chaves (versão, ...) a partir da versão seguinte a 'desde'."""
+    # As versões são inteiras: (desde + 1,) fica antes de toda chave com versão desde + 1
+    return None if desde is None else (desde + 1,)